@@ -0,0 +1,277 @@
+"""Local stand-in of the GitHub REST and GraphQL endpoints used by the Github client.
+
+Responses carry an ETag and are revalidated with If-None-Match. Point the
+client to it with GITHUB_API_URL=<MockGithub.url>, GraphQL is served on
+<MockGithub.url>/graphql.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+
+def _sha(value: str) -> str:
+    return hashlib.sha1(value.encode()).hexdigest()
+
+
+def _date(hours: int) -> str:
+    date = datetime(2026, 10, 1, tzinfo=timezone.utc) + timedelta(hours=hours)
+    return date.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body=None, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body).encode() if body is not None else b""
+        if status == 200:
+            # Like GitHub, a matching If-None-Match is answered 304 without body
+            etag = f'"{hashlib.sha1(data).hexdigest()}"'
+            headers = {**(headers or {}), "ETag": etag}
+            if self.headers.get("If-None-Match") == etag:
+                self.server.github.count_not_modified()
+                status, data = 304, b""
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _page(self, path: str, query: dict, items: list, per_page: int = 30):
+        """Answer one page of `items`, with a Link header to the next one."""
+        per_page = int(query.get("per_page", per_page))
+        page = int(query.get("page", 1))
+        headers = {}
+        if page * per_page < len(items):
+            host = self.headers.get("Host")
+            next_query = urlencode({**query, "page": page + 1})
+            headers["Link"] = f'<http://{host}{path}?{next_query}>; rel="next"'
+        return items[(page - 1) * per_page : page * per_page], headers
+
+    def do_GET(self):
+        github: MockGithub = self.server.github
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        github.count("GET", url.path)
+
+        prefix = f"/repos/{github.owner}/{github.repo}"
+        if not url.path.startswith(prefix):
+            return self._send(404, {"message": "Not Found"})
+        parts = url.path[len(prefix):].strip("/").split("/")
+
+        if parts == ["commits"]:
+            commits = [
+                commit
+                for commit in github.commits
+                if commit["commit"]["committer"]["date"] >= query.get("since", "")
+            ]
+            page, headers = self._page(url.path, query, commits)
+            return self._send(200, page, headers)
+
+        if len(parts) == 2 and parts[0] == "commits":
+            commit = github.commit(parts[1])
+            if commit is None:
+                return self._send(404, {"message": "No commit found"})
+            # The files of large commits are paginated, 300 per page on GitHub
+            files, headers = self._page(
+                url.path, query, commit["files"], github.files_per_page
+            )
+            return self._send(200, {**commit, "files": files}, headers)
+
+        if parts == ["pulls"]:
+            pulls = sorted(github.pulls, key=lambda pull: pull["created_at"])[::-1]
+            page, headers = self._page(url.path, query, pulls)
+            return self._send(200, page, headers)
+
+        if len(parts) >= 2 and parts[0] == "pulls":
+            pull = github.pull(int(parts[1]))
+            if pull is None:
+                return self._send(404, {"message": "Not Found"})
+            if parts[2:] == ["commits"]:
+                commits = github.pull_commits(pull)
+                page, headers = self._page(url.path, query, commits)
+                return self._send(200, page, headers)
+            return self._send(200, pull)
+
+        self._send(404, {"message": "Not Found"})
+
+
+    def do_POST(self):
+        github: MockGithub = self.server.github
+        github.count("POST", self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path != "/graphql":
+            return self._send(404, {"message": "Not Found"})
+        if github.graphql_status != 200:
+            return self._send(github.graphql_status, {"message": "Server Error"})
+        if github.graphql_errors:
+            return self._send(200, {"data": None, "errors": github.graphql_errors})
+
+        variables = body.get("variables", {})
+        repository = (variables.get("owner"), variables.get("name"))
+        if repository != (github.owner, github.repo):
+            errors = [{"type": "NOT_FOUND", "message": "Could not resolve repository"}]
+            return self._send(200, {"data": {"repository": None}, "errors": errors})
+        self._send(200, {"data": {"repository": github.graphql_repository()}})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, github: "MockGithub"):
+        self.github = github
+        super().__init__(address, _Handler)
+
+
+class MockGithub:
+    """In-process fake of a GitHub repository.
+
+    Commits are listed most recent first, pull requests are made of the
+    oldest commits.
+
+    Args:
+        commits (int): commits of the default branch.
+        files (int): files changed by each commit.
+        files_per_page (int): files per page of a commit detail.
+        pulls (int): open pull requests, of two commits each.
+        owner (str): owner of the repository.
+        repo (str): name of the repository.
+    """
+
+    def __init__(
+        self,
+        commits: int = 5,
+        files: int = 2,
+        files_per_page: int = 300,
+        pulls: int = 1,
+        owner: str = "owner",
+        repo: str = "repo",
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.owner = owner
+        self.repo = repo
+        self.files_per_page = files_per_page
+        self.commits: List[dict] = [
+            {
+                "sha": _sha(str(index)),
+                "commit": {
+                    "author": {"name": f"author-{index}"},
+                    "committer": {"date": _date(hours=index)},
+                    "message": f"commit {index}",
+                },
+                "files": [
+                    {
+                        "filename": f"file-{index}-{file}.py",
+                        "status": "modified",
+                        "patch": f"@@ -1 +1 @@\n-old {file}\n+new {file}",
+                    }
+                    for file in range(files)
+                ],
+            }
+            for index in reversed(range(commits))
+        ]
+        self.pulls: List[dict] = [
+            {
+                "number": number,
+                "title": f"pull request {number}",
+                "user": {"login": f"author-{number}"},
+                "state": "open",
+                "created_at": _date(hours=number),
+                "head": {"sha": _sha(str(2 * number - 1))},
+                "commits": 2,
+                "changed_files": 2 * files,
+                "additions": 2 * files,
+                "deletions": 2 * files,
+            }
+            for number in range(1, pulls + 1)
+        ]
+        self.requests: Counter = Counter()
+        self.not_modified = 0
+        # Failure of the GraphQL endpoint: an HTTP status or GraphQL errors
+        self.graphql_status = 200
+        self.graphql_errors: List[dict] = []
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, method: str, path: str) -> None:
+        # SHAs and numbers are grouped, so that counts are per endpoint
+        endpoint = re.sub(r"/(?=[0-9a-f]*[0-9])[0-9a-f]+\b", "/{id}", path)
+        endpoint = endpoint.replace(f"/repos/{self.owner}/{self.repo}", "")
+        with self._lock:
+            self.requests[f"{method} {endpoint}"] += 1
+
+    def count_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def commit(self, sha: str) -> Optional[dict]:
+        return next((c for c in self.commits if c["sha"] == sha), None)
+
+    def pull(self, number: int) -> Optional[dict]:
+        return next((pull for pull in self.pulls if pull["number"] == number), None)
+
+    def pull_commits(self, pull: dict) -> List[dict]:
+        """Commits of a pull request, oldest first."""
+        number = pull["number"]
+        indexes = (2 * number - 2, 2 * number - 1)
+        return [self.commit(_sha(str(index))) for index in indexes]
+
+    def graphql_repository(self) -> dict:
+        """Answer of the latest pull request query of the Github client."""
+        pulls = sorted(self.pulls, key=lambda pull: pull["created_at"])[-1:]
+        nodes = []
+        for pull in pulls:
+            head = self.commit(pull["head"]["sha"])
+            nodes.append({
+                "number": pull["number"],
+                "title": pull["title"],
+                "state": pull["state"].upper(),
+                "createdAt": pull["created_at"],
+                "changedFiles": pull["changed_files"],
+                "additions": pull["additions"],
+                "deletions": pull["deletions"],
+                "author": {"login": pull["user"]["login"]},
+                "commits": {
+                    "totalCount": pull["commits"],
+                    "nodes": [{"commit": {
+                        "oid": head["sha"],
+                        "message": head["commit"]["message"],
+                        "author": {"name": head["commit"]["author"]["name"]},
+                    }}],
+                },
+            })
+        return {"pullRequests": {"nodes": nodes}}
+
+    def start(self) -> "MockGithub":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockGithub":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,239 @@
+"""Local stand-in of the Inetum GenAI Hub endpoints used by the SDK and agents."""
+
+import base64
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+MODELS = [
+    {"id": "model-gpt35", "name": "inetum-gpt35turbo"},
+    {"id": "model-gpt4", "name": "inetum-gpt4"},
+    {"id": "model-gpt4-turbo", "name": "inetum-gpt4-turbo"},
+    {"id": "model-gpt4o", "name": "inetum-gpt4o"},
+]
+
+
+def parse_distribution(spec: str) -> Callable[[], float]:
+    """Sampler of durations in seconds from a spec.
+
+    "0.2" is a constant, "uniform:a:b" a uniform draw, "exp:mean" an
+    exponential draw and "lognormal:median:sigma" a log-normal draw.
+    """
+    name, _, params = spec.partition(":")
+    if not params:
+        value = float(name)
+        return lambda: value
+
+    args = [float(arg) for arg in params.split(":")]
+    if name == "uniform":
+        return lambda: random.uniform(args[0], args[1])
+    if name == "exp":
+        return lambda: random.expovariate(1 / args[0])
+    if name == "lognormal":
+        mu = math.log(args[0])
+        return lambda: random.lognormvariate(mu, args[1])
+    raise ValueError(f"Unknown distribution: {spec}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, do not let Nagle delay the body
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(
+        self, status: int, body=None, headers: Optional[Dict[str, str]] = None
+    ):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _route(self, method: str):
+        hub: MockHub = self.server.hub
+        path = self.path.split("?")[0]
+        hub.count(method, path)
+        time.sleep(hub.latency())
+        return hub, path
+
+    def do_GET(self):
+        hub, path = self._route("GET")
+
+        if path == "/settings/get-agent-settings":
+            return self._send(200, hub.settings)
+        if path.startswith("/agent/"):
+            return self._send(
+                200, {"id": hub.settings["agentId"], "generationModels": MODELS}
+            )
+        if path.startswith("/task/"):
+            return self._send(200, {"status": hub.task_status(path[len("/task/"):])})
+        if path.startswith("/Chat/"):
+            return self._send(200, {"messages": hub.messages(path[len("/Chat/"):])})
+        self._send(404, {"error": path})
+
+    def do_PUT(self):
+        hub, path = self._route("PUT")
+        if path.startswith("/settings/"):
+            hub.settings = self._body()
+            return self._send(200, hub.settings)
+        self._send(404, {"error": path})
+
+    def do_POST(self):
+        hub, path = self._route("POST")
+        body = self._body()
+
+        if path in ("/account/login", "/account/refresh-token"):
+            return self._send(200, hub.issue_tokens(path))
+        if path == "/Chat":
+            task_id = hub.submit(body["conversationId"], body["inputText"])
+            host = self.headers.get("Host")
+            return self._send(202, {}, {"Location": f"http://{host}/task/{task_id}"})
+        self._send(404, {"error": path})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, hub: "MockHub"):
+        self.hub = hub
+        super().__init__(address, _Handler)
+
+    def handle_error(self, request, client_address):
+        # Clients closing keep-alive connections are not benchmark errors
+        pass
+
+
+class MockHub:
+    """In-process mock of the Hub with configurable latency.
+
+    Args:
+        latency (str): distribution of the time taken by every request.
+        completion (str): distribution of the time a task takes to complete.
+        host (str): listening address.
+        port (int): listening port, 0 for any free port.
+    """
+
+    def __init__(
+        self,
+        latency: str = "0.005",
+        completion: str = "uniform:0.5:1.5",
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = parse_distribution(latency)
+        self.completion = parse_distribution(completion)
+        self.settings = {
+            "id": "settings-1",
+            "agentId": "agent-1",
+            "embeddingModelId": "embedding-1",
+            "generationModelId": "model-gpt4o",
+            "defaultPromptId": None,
+            "defaultPromptFlowId": None,
+            "knowledgeSimilarityThreshold": 0.5,
+            "maximumKnowledgeItemsForAnswer": 3,
+            "minimumKnowledgeItemsForAnswer": 1,
+            "knowledgePrompt": "",
+            "knowledgeLimitOverridePrompt": "",
+            "numberPreviousMessages": 10,
+            "generationPromptText": "",
+            "generationMaxTokens": 16000,
+            "generationTemperature": 0.16,
+            "generationTopP": None,
+        }
+        self.requests: Counter = Counter()
+        self.token_ttl = 3600.0
+        self.tokens_issued: Counter = Counter()
+        self._tasks: Dict[str, dict] = {}
+        self._conversations: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, method: str, path: str) -> None:
+        # Group ids so that counts are per endpoint
+        endpoint = "/".join(path.split("/")[:2]) or path
+        with self._lock:
+            self.requests[f"{method} {endpoint}"] += 1
+
+    def issue_tokens(self, path: str) -> dict:
+        """New tokens, the access token is a JWT expiring in `token_ttl` seconds."""
+        with self._lock:
+            self.tokens_issued[path] += 1
+            serial = sum(self.tokens_issued.values())
+        claims = {"sub": "mock", "exp": time.time() + self.token_ttl, "n": serial}
+        payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=")
+        return {
+            "accessToken": f"e30.{payload.decode()}.mock",
+            "refreshToken": f"mock-refresh-{serial}",
+        }
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.requests.clear()
+
+    def submit(self, conversation_id: str, text: str) -> str:
+        task_id = str(uuid.uuid4())
+        with self._lock:
+            conversation = self._conversations.setdefault(conversation_id, [])
+            conversation.append({"text": text})
+            self._tasks[task_id] = {
+                "done_at": time.monotonic() + self.completion(),
+                "conversation_id": conversation_id,
+                "answer": f"Réponse à : {text[-40:]}",
+                "answered": False,
+            }
+        return task_id
+
+    def task_status(self, task_id: str) -> str:
+        with self._lock:
+            task = self._tasks[task_id]
+            if time.monotonic() < task["done_at"]:
+                return "Running"
+            if not task["answered"]:
+                task["answered"] = True
+                self._conversations[task["conversation_id"]].append(
+                    {"text": task["answer"]}
+                )
+            return "Succeeded"
+
+    def messages(self, conversation_id: str) -> list:
+        with self._lock:
+            return list(self._conversations.get(conversation_id, []))
+
+    def start(self) -> "MockHub":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockHub":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
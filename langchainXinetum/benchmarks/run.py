@@ -0,0 +1,344 @@
+"""Benchmark the SDK, ChatInetum and AIAgent against the local mock Hub.
+
+Run from the langchainXinetum directory:
+
+    python -m benchmarks.run --requests 200 --concurrency 32 --polling backoff
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TypedDict
+
+from pydantic import SecretStr
+
+from benchmarks.mock_hub import MockHub
+from src.concurrency import AdaptiveConcurrencyLimiter
+from src.inetum_agent import InetumSDK
+from src.metrics import PHASES, InMemoryMetrics, Labels
+from src.model import ChatInetum
+from src.polling import (
+    AdaptivePolling,
+    ExponentialBackoffPolling,
+    FixedPolling,
+    PollingStrategy,
+)
+from src.settings_cache import SettingsCache
+
+SCENARIOS = ["generate", "generate_async", "invoke", "batch", "agent"]
+MODEL = "inetum-gpt4o"
+
+
+class BenchmarkResult(TypedDict):
+    scenario: str
+    requests: int
+    errors: int
+    seconds: float
+    throughput: float
+    p50: Optional[float]
+    p99: Optional[float]
+    hub_requests: int
+    hub_requests_per_call: float
+    by_endpoint: Dict[str, int]
+    # p99 of each generation phase, empty for the agent scenario
+    phase_p99: Dict[str, Optional[float]]
+
+
+def polling_strategy(spec: str) -> PollingStrategy:
+    """"fixed:0.8", "backoff" or "adaptive"."""
+    name, _, value = spec.partition(":")
+    if name == "fixed":
+        return FixedPolling(float(value or 0.8))
+    if name == "backoff":
+        return ExponentialBackoffPolling()
+    if name == "adaptive":
+        return AdaptivePolling()
+    raise ValueError(f"Unknown polling strategy: {spec}")
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]
+
+
+class SampledMetrics(InMemoryMetrics):
+    """Metrics also keeping every observed value.
+
+    The histogram quantiles are interpolated inside coarse buckets and can
+    put a phase above the whole generation, the phase percentiles of the
+    benchmark are computed from the samples, like the latency ones.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._samples: Dict[Tuple, List[float]] = defaultdict(list)
+        self._samples_lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Optional[Labels]) -> Tuple:
+        return (name, *sorted((labels or {}).items()))
+
+    def observe(self, name: str, value: float, labels: Optional[Labels] = None) -> None:
+        super().observe(name, value, labels)
+        with self._samples_lock:
+            self._samples[self._key(name, labels)].append(value)
+
+    def percentile(
+        self, name: str, q: float, labels: Optional[Labels] = None
+    ) -> Optional[float]:
+        """Exact `q` percentile (99 for p99) of the observed values."""
+        with self._samples_lock:
+            values = list(self._samples.get(self._key(name, labels), []))
+        return percentile(values, q)
+
+
+def run_threads(call: Callable[[int], None], requests: int, concurrency: int):
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(index: int) -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            call(index)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(requests)))
+
+    return latencies, errors
+
+
+async def run_tasks(call, requests: int, concurrency: int):
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(index: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call(index)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(timed(index) for index in range(requests)))
+    return latencies, errors
+
+
+def benchmark(scenario: str, args: argparse.Namespace) -> BenchmarkResult:
+    with MockHub(latency=args.latency, completion=args.completion) as hub:
+        limiter = AdaptiveConcurrencyLimiter(
+            initial_window=args.window,
+            max_window=args.window if args.fixed_window else args.max_window,
+            min_window=args.window if args.fixed_window else 1,
+        )
+        metrics = SampledMetrics()
+        common = dict(
+            api_key=SecretStr("benchmark"),
+            polling_strategy=polling_strategy(args.polling),
+            settings_cache=SettingsCache(),
+            concurrency_limiter=limiter,
+            metrics=metrics,
+        )
+        prompt = "Résume ce commit : " + "x" * args.prompt_size
+
+        start = time.perf_counter()
+        latencies: List[float] = []
+        errors = 0
+
+        if scenario in ("generate", "generate_async"):
+            sdk = InetumSDK(
+                base_url=hub.url,
+                model=MODEL,
+                temperature=0.16,
+                top_p=None,
+                max_tokens=16000,
+                **common,
+            )
+            hub.reset_counts()
+            start = time.perf_counter()
+
+            if scenario == "generate":
+                latencies, errors = run_threads(
+                    lambda i: sdk.generate(f"{prompt} {i}"),
+                    args.requests,
+                    args.concurrency,
+                )
+            else:
+
+                async def main():
+                    try:
+                        return await run_tasks(
+                            lambda i: sdk.generate_async(f"{prompt} {i}"),
+                            args.requests,
+                            args.concurrency,
+                        )
+                    finally:
+                        await sdk.aclose()
+
+                latencies, errors = asyncio.run(main())
+            sdk.close()
+
+        elif scenario in ("invoke", "batch"):
+            chat = ChatInetum(
+                api_url=hub.url,
+                max_concurrency=args.concurrency,
+                **common,
+            )
+            hub.reset_counts()
+            start = time.perf_counter()
+
+            if scenario == "invoke":
+                latencies, errors = run_threads(
+                    lambda i: chat.invoke(f"{prompt} {i}"),
+                    args.requests,
+                    args.concurrency,
+                )
+            else:
+                results = chat.batch(
+                    [f"{prompt} {i}" for i in range(args.requests)],
+                    config={"max_concurrency": args.concurrency},
+                    return_exceptions=True,
+                )
+                errors = sum(isinstance(result, Exception) for result in results)
+            chat.inetum_api.close()
+
+        elif scenario == "agent":
+            from src.inetum_genai_hub.agent import AIAgent
+
+            os.environ.update(
+                HUB_URL=hub.url, AUTH_USERNAME="benchmark", AUTH_PASSWORD="benchmark"
+            )
+            # One login, every call chats in its own conversation
+            agent = AIAgent(
+                "agent-1",
+                "organization-1",
+                model=MODEL,
+                polling_strategy=common["polling_strategy"],
+                concurrency_limiter=limiter,
+            )
+
+            def chat(index: int) -> None:
+                agent.open_conversation().chat(f"{prompt} {index}")
+
+            hub.reset_counts()
+            start = time.perf_counter()
+            latencies, errors = run_threads(chat, args.requests, args.concurrency)
+
+        else:
+            raise ValueError(f"Unknown scenario: {scenario}")
+
+        seconds = time.perf_counter() - start
+        hub_requests = sum(hub.requests.values())
+
+        return {
+            "scenario": scenario,
+            "requests": args.requests,
+            "errors": errors,
+            "seconds": seconds,
+            "throughput": args.requests / seconds,
+            "p50": percentile(latencies, 50),
+            "p99": percentile(latencies, 99),
+            "hub_requests": hub_requests,
+            "hub_requests_per_call": hub_requests / args.requests,
+            "by_endpoint": dict(hub.requests),
+            "phase_p99": {
+                phase: metrics.percentile(
+                    "inetum_generation_phase_seconds",
+                    99,
+                    {"model": MODEL, "phase": phase},
+                )
+                for phase in PHASES
+            },
+        }
+
+
+def print_results(results: List[BenchmarkResult]) -> None:
+    def seconds(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value:.3f}"
+
+    print(
+        f"{'scenario':<16}{'req/s':>9}{'p50 (s)':>10}{'p99 (s)':>10}"
+        f"{'errors':>8}{'hub req':>9}{'per call':>10}"
+    )
+    for result in results:
+        print(
+            f"{result['scenario']:<16}{result['throughput']:>9.1f}"
+            f"{seconds(result['p50']):>10}{seconds(result['p99']):>10}"
+            f"{result['errors']:>8}{result['hub_requests']:>9}"
+            f"{result['hub_requests_per_call']:>10.2f}"
+        )
+
+    print(f"\n{'p99 (s)':<16}" + "".join(f"{phase:>12}" for phase in PHASES))
+    for result in results:
+        if any(value is not None for value in result["phase_p99"].values()):
+            print(
+                f"{result['scenario']:<16}"
+                + "".join(
+                    f"{seconds(result['phase_p99'][phase]):>12}" for phase in PHASES
+                )
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenarios", default=",".join(SCENARIOS), help="Comma separated list"
+    )
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--latency",
+        default="0.005",
+        help='Per request latency, e.g. "uniform:0.01:0.05"',
+    )
+    parser.add_argument(
+        "--completion",
+        default="uniform:0.5:1.5",
+        help='Task completion time, e.g. "lognormal:1.0:0.5"',
+    )
+    parser.add_argument(
+        "--polling", default="backoff", help='"fixed:0.8", "backoff" or "adaptive"'
+    )
+    parser.add_argument("--window", type=int, default=8, help="Initial AIMD window")
+    parser.add_argument("--max-window", type=int, default=256)
+    parser.add_argument(
+        "--fixed-window", action="store_true", help="Keep the window at --window"
+    )
+    parser.add_argument("--prompt-size", type=int, default=200)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = [
+        benchmark(scenario.strip(), args)
+        for scenario in args.scenarios.split(",")
+        if scenario.strip()
+    ]
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Measure the import time of the package modules with `python -X importtime`.
+
+Run from the langchainXinetum directory:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --check --budget src.inetum_agent=400
+
+With --check, the run fails when a module loads a dependency it must not
+(e.g. aiohttp on the synchronous path) or exceeds its budget.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple, TypedDict
+
+# Module imported, and the dependencies its import must not load
+TARGETS: Dict[str, Tuple[str, ...]] = {
+    "src": ("requests", "aiohttp", "langchain_core", "dotenv"),
+    "src.config": ("requests", "aiohttp", "langchain_core", "dotenv"),
+    "src.inetum_agent": ("aiohttp", "langchain_core", "dotenv", "tiktoken"),
+    "src.Github": ("aiohttp", "langchain_core", "dotenv"),
+    "src.summarize": ("aiohttp", "langchain_core", "tiktoken"),
+    "src.sharding": ("aiohttp", "langchain_core", "dotenv", "tiktoken"),
+    "src.model": ("aiohttp", "dotenv", "tiktoken"),
+    "src.inetum_genai_hub.agent": ("aiohttp", "langchain_core", "dotenv"),
+}
+
+
+class StartupResult(TypedDict):
+    module: str
+    import_ms: float
+    process_ms: float
+    heaviest: List[Tuple[str, float]]
+    forbidden: List[str]
+
+
+def parse_importtime(stderr: str) -> List[Tuple[int, str, float]]:
+    """(depth, module, cumulative ms) of every line of -X importtime."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, name.strip(), int(cumulative) / 1000))
+    return entries
+
+
+def subtree(
+    entries: List[Tuple[int, str, float]], module: str
+) -> List[Tuple[int, str, float]]:
+    """Entries imported by `module`, leaving out the interpreter startup.
+
+    importtime prints the imports of a module right before the module itself.
+    """
+    start = 0
+    for index, (depth, name, _) in enumerate(entries):
+        if depth == 0:
+            if name == module:
+                return entries[start : index + 1]
+            start = index + 1
+    return []
+
+
+def run_once(module: str) -> Tuple[float, List[Tuple[int, str, float]]]:
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return (time.perf_counter() - start) * 1000, parse_importtime(process.stderr)
+
+
+def measure(module: str, repeat: int, baseline_ms: float) -> StartupResult:
+    runs = [run_once(module) for _ in range(repeat)]
+    process_ms = statistics.median(run[0] for run in runs) - baseline_ms
+
+    def import_ms(entries: List[Tuple[int, str, float]]) -> float:
+        return next(ms for depth, name, ms in entries if depth == 0 and name == module)
+
+    entries = subtree(runs[-1][1], module)
+    loaded = {name for _, name, _ in entries}
+    # Direct imports of the module, the ones to look at first
+    heaviest = sorted(
+        ((name, ms) for depth, name, ms in entries if depth == 1),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:5]
+
+    return {
+        "module": module,
+        "import_ms": statistics.median(import_ms(run[1]) for run in runs),
+        "process_ms": process_ms,
+        "heaviest": heaviest,
+        "forbidden": [
+            dependency for dependency in TARGETS.get(module, ()) if dependency in loaded
+        ],
+    }
+
+
+def baseline(repeat: int) -> float:
+    """Wall clock of an interpreter importing nothing."""
+    return statistics.median(run_once("sys")[0] for _ in range(repeat))
+
+
+def print_results(results: List[StartupResult]) -> None:
+    print(f"{'module':<30}{'import (ms)':>12}{'process (ms)':>14}  heaviest imports")
+    for result in results:
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in result["heaviest"][:3])
+        print(
+            f"{result['module']:<30}{result['import_ms']:>12.1f}"
+            f"{result['process_ms']:>14.1f}  {heaviest}"
+        )
+        if result["forbidden"]:
+            print(f"{'':<30}loads {', '.join(result['forbidden'])}")
+
+
+def check(results: List[StartupResult], budgets: Dict[str, float]) -> List[str]:
+    """Regressions of the results: forbidden dependencies and exceeded budgets."""
+    failures = []
+    for result in results:
+        for dependency in result["forbidden"]:
+            failures.append(f"{result['module']} imports {dependency}")
+
+        budget: Optional[float] = budgets.get(result["module"])
+        if budget is not None and result["import_ms"] > budget:
+            failures.append(
+                f"{result['module']} imports in {result['import_ms']:.0f} ms, "
+                f"budget {budget:.0f} ms"
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--modules", default=",".join(TARGETS), help="Comma separated list"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--budget",
+        action="append",
+        default=[],
+        metavar="MODULE=MS",
+        help="Maximum import time of a module, can be repeated",
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="Exit with 1 on a regression"
+    )
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    budgets = {
+        module: float(ms)
+        for module, ms in (budget.split("=", 1) for budget in args.budget)
+    }
+
+    interpreter_ms = baseline(args.repeat)
+    results = [
+        measure(module.strip(), args.repeat, interpreter_ms)
+        for module in args.modules.split(",")
+        if module.strip()
+    ]
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    failures = check(results, budgets)
+    if args.check and failures:
+        print("\n" + "\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
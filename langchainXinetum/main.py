@@ -1,12 +1,53 @@
-from dotenv import load_dotenv
-from langchain_inetum import ChatInetum
+import os
+import sys
+
 from prompt import prompt_1, prompt_2
 from src.Github import Github
+from src.summarize import CommitSummarizer
+from src.utils.env import load_env
+from src.webhook import WebhookReceiver
+
+load_env()
+
+
+def watch(chat):
+    """Summarize every commit pushed since the last run, oldest first."""
+    github = Github()
+    summarizer = CommitSummarizer(chat, final_prompt=prompt_2)
+    poll_interval = os.getenv("WATCH_POLL_INTERVAL")
+
+    for commit in github.watch_new_commits(
+        branch=os.getenv("REPO_BRANCH"),
+        poll_interval=float(poll_interval) if poll_interval else None,
+    ):
+        summary = summarizer.summarize(commit)
+        print("Commit:", commit['sha'])
+        print("model answer :\n", summary, "\n")
+
 
-load_dotenv()
+def webhook(chat):
+    """Summarize the commits and pull requests delivered by GitHub webhooks."""
+    receiver = WebhookReceiver(Github())
+    summarizer = CommitSummarizer(chat, final_prompt=prompt_2)
+
+    with receiver:
+        print("Listening for GitHub webhooks on %s:%s" % receiver.address)
+        while True:
+            event = receiver.events.get()
+            record = event['record']
+            if event['event'] == "pull_request":
+                print("Pull request:", record['pr_number'])
+                summary = summarizer.summarize(record['last_commit'])
+            else:
+                print("Commit:", record['sha'])
+                summary = summarizer.summarize(record)
+            print("model answer :\n", summary, "\n")
 
 
 def main():
+    # Imported here, it loads langchain_core which is slow to import
+    from src.model import ChatInetum
+
     try:
         chat = ChatInetum(
             model_name="inetum-gpt4o",
@@ -17,6 +58,14 @@ def main():
         print(f"Erreur lors de l'initialisation du modèle : {e}")
         return
 
+    if "--watch" in sys.argv:
+        watch(chat)
+        return
+
+    if "--webhook" in sys.argv:
+        webhook(chat)
+        return
+
     messages = prompt_2
 
     github = Github()
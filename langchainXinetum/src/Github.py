@@ -1,67 +1,213 @@
+import json
+import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, List, Optional
+
 import requests
 import urllib3
 import sys
-from dotenv import load_dotenv
+
+from src.github_cache import GithubResponseCache
+from src.session import create_session
+from src.utils.env import load_env
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+logger = logging.getLogger(__name__)
+
+# Commit dates are author-controlled and older commits land with merges, so
+# the watch re-lists a margin before its last date and skips what it has seen
+WATCH_SINCE_OVERLAP = timedelta(days=1)
+WATCH_SEEN_SIZE = 500
+
+LATEST_PR_QUERY = """
+query($owner: String!, $name: String!) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(states: OPEN, first: 1, orderBy: {field: CREATED_AT, direction: DESC}) {
+      nodes {
+        number
+        title
+        state
+        createdAt
+        changedFiles
+        additions
+        deletions
+        author { login }
+        commits(last: 1) {
+          totalCount
+          nodes { commit { oid message author { name } } }
+        }
+      }
+    }
+  }
+}
+"""
+
 class Github:
     
-    def __init__(self):
+    def __init__(
+        self,
+        max_workers: int = 8,
+        session: Optional[requests.Session] = None,
+        cache: Optional[GithubResponseCache] = None,
+        backend: Optional[str] = None,
+        token: Optional[str] = None,
+        repo_owner: Optional[str] = None,
+        repo_name: Optional[str] = None,
+    ):
         """
         Initialize the Github class with the GitHub token and repository details.
-        :param token: Personal access token for GitHub API
-        :param repo_owner: Owner of the repository
-        :param repo_name: Name of the repository
+        :param max_workers: Number of commit details fetched in parallel
+        :param session: Pooled HTTP session, one is created if not given
+        :param cache: ETag cache of the responses, defaults to an in-memory cache
+        persisted in the GITHUB_CACHE_DIR directory when it is set
+        :param backend: "rest" or "graphql", used to look up the latest pull
+        request, defaults to GITHUB_BACKEND or "rest". The API endpoints can be
+        pointed to a local server with GITHUB_API_URL and GITHUB_GRAPHQL_URL.
+        :param token: Personal access token for GitHub API, defaults to GITHUB_TOKEN
+        :param repo_owner: Owner of the repository, defaults to REPO_OWNER
+        :param repo_name: Name of the repository, defaults to REPO_NAME
         """
-        load_dotenv()
+        load_env()
 
-        self.token = os.getenv("GITHUB_TOKEN")
-        self.repo_owner = os.getenv("REPO_OWNER")
-        self.repo_name = os.getenv("REPO_NAME")
+        self.token = token or os.getenv("GITHUB_TOKEN")
+        self.repo_owner = repo_owner or os.getenv("REPO_OWNER")
+        self.repo_name = repo_name or os.getenv("REPO_NAME")
 
         if not self.token or not self.repo_owner or not self.repo_name:
             raise ValueError("Missing required parameters: token, repo_owner, or repo_name")
 
-        self.api_url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}"
+        self.backend = backend or os.getenv("GITHUB_BACKEND", "rest")
+        if self.backend not in ("rest", "graphql"):
+            raise ValueError(f"Unknown GitHub backend: {self.backend}")
 
-    def get_new_commit_content(self):
-        """
-        Retrieve the content of the latest commit in the repository.
-        :return: A dictionary containing commit information and file changes.
-        """
-        headers = {
+        api_base = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip('/')
+        self.api_url = f"{api_base}/repos/{self.repo_owner}/{self.repo_name}"
+        self.graphql_url = os.getenv("GITHUB_GRAPHQL_URL", f"{api_base}/graphql")
+        self.headers = {
             'Authorization': f'token {self.token}',
             'Accept': 'application/vnd.github.v3+json'
         }
 
-        # Get the latest commit
-        commits_url = f"{self.api_url}/commits"
-        response = requests.get(commits_url, headers=headers, verify=False)
-        if response.status_code != 200:
-            raise RuntimeError(f"Failed to fetch commits: {response.status_code} {response.text}")
+        # One keep-alive pool shared by all calls, sized for the parallel fetches
+        self.max_workers = max_workers
+        self.session = session or create_session(pool_maxsize=max_workers)
 
-        commits = response.json()
-        if not commits:
-            raise RuntimeError("No commits found in the repository.")
+        self.cache = cache or GithubResponseCache(os.getenv("GITHUB_CACHE_DIR"))
 
-        latest_commit = commits[0]
-        commit_sha = latest_commit['sha']
+    def _get(self, url, params=None):
+        """
+        GET a GitHub API URL through the ETag cache.
+        Cached entries are revalidated with a conditional request and served
+        on 304, commit details (immutable) are served without any request.
+        """
+        url = requests.Request('GET', url, params=params).prepare().url
 
-        # Get the details of the latest commit
+        cached = self.cache.get(url)
+        if cached and self.cache.is_immutable(url):
+            return self.cache.to_response(cached)
+
+        headers = self.headers
+        if cached:
+            headers = {**self.headers, **self.cache.conditional_headers(cached)}
+
+        response = self.session.get(url, headers=headers, verify=False)
+
+        if response.status_code == 304 and cached:
+            return self.cache.to_response(cached)
+        if response.status_code == 200:
+            self.cache.set(url, response)
+
+        return response
+
+    def _paginate(self, url, error_message, params=None, limit=None):
+        """
+        Fetch every page of a GitHub list endpoint by following the Link headers.
+        :param url: URL of the list endpoint
+        :param error_message: Prefix of the error raised on a failed request
+        :param params: Query parameters of the first page
+        :param limit: Maximum number of items to return, None for all
+        :return: The list of items
+        """
+        params = {'per_page': 100, **(params or {})}
+        if limit is not None:
+            params['per_page'] = min(limit, 100)
+
+        items = []
+        while url:
+            response = self._get(url, params=params)
+            if response.status_code != 200:
+                raise RuntimeError(f"{error_message}: {response.status_code} {response.text}")
+
+            items.extend(response.json())
+            if limit is not None and len(items) >= limit:
+                return items[:limit]
+
+            # The next URL already carries the query parameters
+            url = response.links.get('next', {}).get('url')
+            params = None
+
+        return items
+
+    def list_commits(self, limit=None, sha=None, since=None):
+        """
+        List the commits of the repository, most recent first.
+        :param limit: Maximum number of commits, None for all
+        :param sha: Branch name or SHA to start listing commits from
+        :param since: Only commits after this ISO 8601 date
+        :return: The list of commits as returned by the GitHub API
+        """
+        params = {}
+        if sha:
+            params['sha'] = sha
+        if since:
+            params['since'] = since
+
+        return self._paginate(
+            f"{self.api_url}/commits", "Failed to fetch commits", params=params, limit=limit
+        )
+
+    def list_pr_commits(self, pr_number):
+        """
+        List all the commits of a pull request, oldest first.
+        :param pr_number: Number of the pull request
+        :return: The list of commits as returned by the GitHub API
+        """
+        return self._paginate(
+            f"{self.api_url}/pulls/{pr_number}/commits",
+            "Erreur lors de la récupération des commits de la PR",
+        )
+
+    def get_commit_content(self, commit_sha):
+        """
+        Retrieve the content of a commit, including all its changed files.
+        :param commit_sha: SHA of the commit
+        :return: A dictionary containing commit information and file changes.
+        """
         commit_url = f"{self.api_url}/commits/{commit_sha}"
-        response = requests.get(commit_url, headers=headers, verify=False)
+        response = self._get(commit_url)
         if response.status_code != 200:
             raise RuntimeError(f"Failed to fetch commit details: {response.status_code} {response.text}")
 
         commit_details = response.json()
         files_changed = commit_details.get('files', [])
 
+        # Commits with many files are paginated as well
+        next_url = response.links.get('next', {}).get('url')
+        while next_url:
+            response = self._get(next_url)
+            if response.status_code != 200:
+                raise RuntimeError(f"Failed to fetch commit details: {response.status_code} {response.text}")
+            files_changed.extend(response.json().get('files', []))
+            next_url = response.links.get('next', {}).get('url')
+
         return {
-            'sha': commit_sha,
-            'author': latest_commit['commit']['author']['name'],
-            'message': latest_commit['commit']['message'],
+            'sha': commit_details['sha'],
+            'author': commit_details['commit']['author']['name'],
+            'message': commit_details['commit']['message'],
             'files': [
                 {
                     'filename': file['filename'],
@@ -70,6 +216,143 @@ class Github:
                 } for file in files_changed
             ]
         }
+
+    def get_commits_content(self, commit_shas: Iterable[str], max_workers=None) -> List[dict]:
+        """
+        Retrieve the content of several commits in parallel.
+        :param commit_shas: SHAs of the commits
+        :param max_workers: Number of parallel requests, defaults to self.max_workers
+        :return: The commit dictionaries, in the order of commit_shas
+        """
+        commit_shas = list(commit_shas)
+        if not commit_shas:
+            return []
+
+        workers = min(max_workers or self.max_workers, len(commit_shas))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.get_commit_content, commit_shas))
+
+    def get_new_commits_content(self, count, sha=None, since=None):
+        """
+        Retrieve the content of the latest commits of the repository.
+        :param count: Number of commits to retrieve
+        :param sha: Branch name or SHA to start listing commits from
+        :param since: Only commits after this ISO 8601 date
+        :return: The commit dictionaries, most recent first
+        """
+        commits = self.list_commits(limit=count, sha=sha, since=since)
+        return self.get_commits_content(commit['sha'] for commit in commits)
+
+    def get_pr_commits_content(self, pr_number):
+        """
+        Retrieve the content of all the commits of a pull request.
+        :param pr_number: Number of the pull request
+        :return: The commit dictionaries, oldest first
+        """
+        commits = self.list_pr_commits(pr_number)
+        return self.get_commits_content(commit['sha'] for commit in commits)
+
+    def get_new_commit_content(self):
+        """
+        Retrieve the content of the latest commit in the repository.
+        :return: A dictionary containing commit information and file changes.
+        """
+        # Get the latest commit
+        commits = self.list_commits(limit=1)
+        if not commits:
+            raise RuntimeError("No commits found in the repository.")
+
+        # Get the details of the latest commit
+        return self.get_commit_content(commits[0]['sha'])
+
+    def _load_watch_state(self, state_file):
+        try:
+            with open(state_file, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_watch_state(self, state_file, key, commit_sha, commit_date):
+        state = self._load_watch_state(state_file)
+        previous = state.get(key) or {}
+        seen = [*previous.get('seen', []), commit_sha][-WATCH_SEEN_SIZE:]
+        # The date only moves forward, a merged older commit must not rewind it
+        state[key] = {
+            'sha': commit_sha,
+            'date': max(previous.get('date', commit_date), commit_date),
+            'seen': seen,
+        }
+
+        tmp_path = f"{state_file}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(state, file, indent=2)
+        os.replace(tmp_path, state_file)
+
+    def _list_commits_since(self, branch, high_water_mark, initial_count):
+        """
+        List the commits not processed yet, most recent first.
+        Commits dated up to WATCH_SINCE_OVERLAP before the high-water mark
+        are listed again and filtered on the SHAs already processed, so that
+        older commits brought in by a merge are not skipped.
+        """
+        if not high_water_mark:
+            return self.list_commits(limit=initial_count, sha=branch)
+
+        since = datetime.fromisoformat(high_water_mark['date']) - WATCH_SINCE_OVERLAP
+        commits = self.list_commits(
+            sha=branch,
+            since=since.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        )
+
+        # States written before the SHA window only know the last commit
+        seen = set(high_water_mark.get('seen') or [high_water_mark['sha']])
+        return [commit for commit in commits if commit['sha'] not in seen]
+
+    def watch_new_commits(
+        self,
+        branch=None,
+        state_file=None,
+        poll_interval=None,
+        initial_count=1,
+    ) -> Iterator[dict]:
+        """
+        Yield the commits that were not processed yet, oldest first.
+        The date of the newest processed commit and the SHAs of the last
+        processed ones are persisted per repository and branch, so that only
+        the delta is fetched. A commit
+        is recorded as processed once the consumer asks for the next one
+        (at-least-once delivery).
+        :param branch: Branch to watch, defaults to the repository default branch
+        :param state_file: JSON file of the high-water marks, defaults to
+        GITHUB_WATCH_STATE or .github_watch_state.json
+        :param poll_interval: Seconds between two checks, None for a single pass
+        :param initial_count: Number of commits yielded on the very first run
+        :return: A generator of commit dictionaries
+        """
+        state_file = state_file or os.getenv("GITHUB_WATCH_STATE", ".github_watch_state.json")
+        key = f"{self.repo_owner}/{self.repo_name}@{branch or 'default'}"
+
+        while True:
+            high_water_mark = self._load_watch_state(state_file).get(key)
+            commits = self._list_commits_since(branch, high_water_mark, initial_count)
+
+            # Oldest first
+            commits.reverse()
+            contents = self.get_commits_content(commit['sha'] for commit in commits)
+
+            for commit, content in zip(commits, contents):
+                yield content
+
+                commit_date = (
+                    commit['commit'].get('committer') or commit['commit']['author']
+                )['date']
+                self._save_watch_state(state_file, key, commit['sha'], commit_date)
+
+            if poll_interval is None:
+                return
+
+            time.sleep(poll_interval)
+
     def test_github_api(self): 
         """
         Test the GitHub API by fetching the latest commit content.
@@ -93,19 +376,26 @@ class Github:
         """
         Récupère les informations principales de la dernière pull request ouverte,
         ainsi que les infos du dernier commit de cette PR.
+        Avec le backend graphql, l'API REST prend le relais si la requête GraphQL échoue.
         :return: Un dictionnaire structuré avec les infos principales
         ou None si aucune PR trouvée.
         """
-        headers = {
-            'Authorization': f'token {self.token}',
-            'Accept': 'application/vnd.github.v3+json'
-        }
+        if self.backend == "graphql":
+            try:
+                return self._get_latest_pr_commit_content_graphql()
+            except (RuntimeError, requests.RequestException) as error:
+                # Un jeton sans accès GraphQL ou une panne de l'endpoint ne doit pas
+                # bloquer le résumé, l'API REST donne le même résultat
+                logger.warning("GraphQL query failed, falling back to REST: %s", error)
+        return self._get_latest_pr_commit_content_rest()
 
+    def _get_latest_pr_commit_content_rest(self):
         # Récupérer la dernière pull request ouverte (triée par date de création)
-        prs_url = (
-            f"{self.api_url}/pulls?state=open&sort=created&direction=desc"
+        prs_url = f"{self.api_url}/pulls"
+        response = self._get(
+            prs_url,
+            params={'state': 'open', 'sort': 'created', 'direction': 'desc', 'per_page': 1},
         )
-        response = requests.get(prs_url, headers=headers, verify=False)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Erreur lors de la récupération des PRs: "
@@ -117,59 +407,94 @@ class Github:
             print("Aucune pull request ouverte trouvée.")
             return None
 
-        latest_pr = prs[0]
-        pr_number = latest_pr['number']
+        pr_number = prs[0]['number']
 
-        # Récupérer les commits de cette PR
-        commits_url = f"{self.api_url}/pulls/{pr_number}/commits"
-        response = requests.get(commits_url, headers=headers, verify=False)
+        # La liste ne contient pas les statistiques de la PR (commits, fichiers...),
+        # le détail de la PR les donne avec le SHA de son dernier commit (head)
+        response = self._get(f"{self.api_url}/pulls/{pr_number}")
         if response.status_code != 200:
             raise RuntimeError(
-                f"Erreur lors de la récupération des commits de la PR: "
+                f"Erreur lors de la récupération de la PR: "
                 f"{response.status_code} {response.text}"
             )
 
-        commits = response.json()
-        if not commits:
-            print("Aucun commit trouvé dans la PR.")
-            return None
+        return self.get_pr_content(response.json())
 
-        last_commit = commits[-1]
-        commit_sha = last_commit['sha']
+    def get_pr_content(self, pull_request):
+        """
+        Construit le dictionnaire d'une pull request à partir de son détail REST
+        (ou du champ pull_request d'un webhook), avec le contenu de son dernier commit.
+        :param pull_request: Le détail de la PR renvoyé par l'API REST
+        :return: Un dictionnaire structuré avec les infos principales
+        """
+        # Récupérer les détails du dernier commit (head) de la PR
+        last_commit = self.get_commit_content(pull_request['head']['sha'])
 
-        # Récupérer les détails du commit
-        commit_url = f"{self.api_url}/commits/{commit_sha}"
-        response = requests.get(commit_url, headers=headers, verify=False)
-        if response.status_code != 0:
+        # Construction du dictionnaire de retour avec les infos principales
+        return {
+            'pr_number': pull_request['number'],
+            'pr_title': pull_request['title'],
+            'pr_author': pull_request['user']['login'],
+            'pr_state': pull_request['state'],
+            'pr_created_at': pull_request['created_at'],
+            'pr_commits_count': pull_request['commits'],
+            'pr_changed_files': pull_request['changed_files'],
+            'pr_additions': pull_request['additions'],
+            'pr_deletions': pull_request['deletions'],
+            'last_commit': last_commit,
+        }
+
+    def _get_latest_pr_commit_content_graphql(self):
+        # Une seule requête GraphQL donne la PR, ses statistiques et son dernier commit
+        response = self.session.post(
+            self.graphql_url,
+            json={
+                'query': LATEST_PR_QUERY,
+                'variables': {'owner': self.repo_owner, 'name': self.repo_name},
+            },
+            headers=self.headers,
+            verify=False,
+        )
+        if response.status_code != 200:
             raise RuntimeError(
-                f"Erreur lors de la récupération du commit: "
+                f"Erreur lors de la requête GraphQL: "
                 f"{response.status_code} {response.text}"
             )
 
-        commit_details = response.json()
-        files_changed = commit_details.get('files', [])
+        result = response.json()
+        if result.get('errors'):
+            raise RuntimeError(f"Erreur lors de la requête GraphQL: {result['errors']}")
+
+        prs = result['data']['repository']['pullRequests']['nodes']
+        if not prs:
+            print("Aucune pull request ouverte trouvée.")
+            return None
+
+        latest_pr = prs[0]
+        commits = latest_pr['commits']['nodes']
+        if not commits:
+            print("Aucun commit trouvé dans la PR.")
+            return None
+
+        commit = commits[-1]['commit']
+
+        # Seuls les patchs nécessitent encore l'API REST
+        files = self.get_commit_content(commit['oid'])['files']
 
-        # Construction du dictionnaire de retour avec les infos principales
         return {
             'pr_number': latest_pr['number'],
             'pr_title': latest_pr['title'],
-            'pr_author': latest_pr['user']['login'],
-            'pr_state': latest_pr['state'],
-            'pr_created_at': latest_pr['created_at'],
-            'pr_commits_count': latest_pr['commits'],
-            'pr_changed_files': latest_pr['changed_files'],
+            'pr_author': (latest_pr.get('author') or {}).get('login'),
+            'pr_state': latest_pr['state'].lower(),
+            'pr_created_at': latest_pr['createdAt'],
+            'pr_commits_count': latest_pr['commits']['totalCount'],
+            'pr_changed_files': latest_pr['changedFiles'],
             'pr_additions': latest_pr['additions'],
             'pr_deletions': latest_pr['deletions'],
             'last_commit': {
-                'sha': commit_sha,
-                'author': last_commit['commit']['author']['name'],
-                'message': last_commit['commit']['message'],
-                'files': [
-                    {
-                        'filename': file['filename'],
-                        'status': file['status'],
-                        'patch': file.get('patch')
-                    } for file in files_changed
-                ]
-            }
+                'sha': commit['oid'],
+                'author': commit['author']['name'],
+                'message': commit['message'],
+                'files': files,
+            },
         }
@@ -1 +1,33 @@
 # Makes src a package
+
+# Public names, imported from their module on first access so that importing
+# one part of the package does not load the dependencies of the others
+# (langchain_core for the chat model, aiohttp for the async clients).
+_EXPORTS = {
+    "ChatInetum": "src.model",
+    "InetumSDK": "src.inetum_agent",
+    "ShardedInetumSDK": "src.sharding",
+    "CommitSummarizer": "src.summarize",
+    "WebhookReceiver": "src.webhook",
+    "AIAgent": "src.inetum_genai_hub.agent",
+    "AsyncAIAgent": "src.inetum_genai_hub.async_agent",
+    "ConversationPool": "src.inetum_genai_hub.conversation",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    import importlib
+
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_EXPORTS])
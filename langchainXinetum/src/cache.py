@@ -0,0 +1,191 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple, TypedDict
+
+from src.config import DEFAULT_CONFIG
+
+
+class CacheStats(TypedDict):
+    hits: int
+    misses: int
+    size: int
+
+
+def normalize_prompt(text: str) -> str:
+    """Normalize a prompt so that insignificant differences share a cache entry."""
+    text = unicodedata.normalize("NFC", text)
+    return "\n".join(line.rstrip() for line in text.strip().splitlines())
+
+
+def response_cache_key(
+    conversation: str,
+    system_prompt: Optional[str],
+    model_name: str,
+    temperature: Optional[float],
+    top_p: Optional[float],
+    max_tokens: Optional[int],
+) -> str:
+    """Cache key of a generation request."""
+    payload = json.dumps(
+        [
+            normalize_prompt(conversation),
+            normalize_prompt(system_prompt) if system_prompt else None,
+            model_name,
+            temperature,
+            top_p,
+            max_tokens,
+        ]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class BaseResponseCache:
+    """Cache of generated responses, see `response_cache_key` for the key."""
+
+    def __init__(self):
+        self._hits = 0
+        self._misses = 0
+        self._stats_lock = threading.Lock()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _store(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._lookup(key)
+        with self._stats_lock:
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self._store(key, value)
+
+    def stats(self) -> CacheStats:
+        with self._stats_lock:
+            return {"hits": self._hits, "misses": self._misses, "size": len(self)}
+
+
+class InMemoryResponseCache(BaseResponseCache):
+    """LRU response cache with size and TTL eviction.
+
+    Args:
+        max_size (int): maximum number of responses kept.
+        ttl (Optional[float]): seconds a response stays valid, None for ever.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_CONFIG["response_cache_size"],
+        ttl: Optional[float] = None,
+    ):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, stored_at = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def _store(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteResponseCache(BaseResponseCache):
+    """Persistent response cache stored in a SQLite file.
+
+    Args:
+        path (str): path of the SQLite database.
+        ttl (Optional[float]): seconds a response stays valid, None for ever.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def _lookup(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            value, stored_at = row
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                with self._connection:
+                    self._connection.execute(
+                        "DELETE FROM responses WHERE key = ?", (key,)
+                    )
+                return None
+
+            return value
+
+    def _store(self, key: str, value: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, stored_at) "
+                "VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,351 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Deque, Dict, Iterator, Optional, TypedDict
+
+import requests
+
+from src.config import DEFAULT_CONFIG
+
+
+class HubHTTPError(Exception):
+    """Error answer of the Hub, with what is needed to react to throttling.
+
+    Args:
+        message (str): the error message.
+        status_code (Optional[int]): HTTP status of the answer.
+        retry_after (Optional[float]): seconds to wait before retrying, from
+            the `Retry-After` header.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a `Retry-After` header (delay or HTTP date)."""
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """Whether an error is a failed or timed out connection to the Hub."""
+    return isinstance(
+        error, (requests.ConnectionError, requests.Timeout, asyncio.TimeoutError)
+    ) or type(error).__module__.startswith("aiohttp")
+
+
+class LimiterStats(TypedDict):
+    window: float
+    in_flight: int
+    queue_depth: int
+    throttled: int
+    errors: int
+
+
+class _Waiter:
+    """A request waiting for a slot of the limiter."""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.granted = False
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future: asyncio.Future = loop.create_future()
+
+    def grant(self) -> None:
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit of the generations in flight on the Hub.
+
+    The window starts at `initial_window` and grows by one slot per success
+    until the first congestion signal (slow start), then by one slot per
+    window of successes. Only successes of a full window (every slot taken)
+    grow it, so light traffic does not inflate it. A 429/503, a 5xx or a connection error halves it
+    (at most once per round trip), and so does a generation much slower than
+    the usual latency. A `Retry-After` holds every new request until it
+    expires. Sync and async callers share the same window, waiting requests
+    are served in arrival order.
+
+    Args:
+        initial_window (int): slots available at start.
+        min_window (int): the window never shrinks below this.
+        max_window (int): the window never grows above this.
+        decrease_factor (float): multiplier applied on congestion.
+        latency_tolerance (float): a generation slower than this many times
+            the average latency counts as congestion, None to ignore latency.
+    """
+
+    def __init__(
+        self,
+        initial_window: int = DEFAULT_CONFIG["concurrency_initial_window"],
+        min_window: int = DEFAULT_CONFIG["concurrency_min_window"],
+        max_window: int = DEFAULT_CONFIG["concurrency_max_window"],
+        decrease_factor: float = 0.5,
+        latency_tolerance: Optional[float] = DEFAULT_CONFIG[
+            "concurrency_latency_tolerance"
+        ],
+    ):
+        self.min_window = min_window
+        self.max_window = max_window
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+
+        self._lock = threading.Lock()
+        self._window = float(min(max(initial_window, min_window), max_window))
+        self._in_flight = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._slow_start = True
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._latency: Optional[float] = None
+        self._throttled = 0
+        self._errors = 0
+
+    @property
+    def window(self) -> float:
+        return self._window
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def blocked_for(self) -> float:
+        """Seconds new requests still wait for the last `Retry-After`."""
+        return self._blocked_for()
+
+    def stats(self) -> LimiterStats:
+        with self._lock:
+            return {
+                "window": self._window,
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "throttled": self._throttled,
+                "errors": self._errors,
+            }
+
+    def _try_acquire(self, waiter: _Waiter) -> bool:
+        """Take a slot or enqueue `waiter`. Must be called with the lock held."""
+        if not self._waiters and self._in_flight < int(self._window):
+            self._in_flight += 1
+            return True
+        self._waiters.append(waiter)
+        return False
+
+    def _dispatch(self) -> None:
+        """Grant free slots to the oldest waiters. Must be called with the lock held."""
+        while self._waiters and self._in_flight < int(self._window):
+            self._in_flight += 1
+            self._waiters.popleft().grant()
+
+    def _withdraw(self, waiter: _Waiter) -> bool:
+        """Remove a waiter that gave up. Returns False if it was already granted."""
+        with self._lock:
+            if waiter.granted:
+                return False
+            self._waiters.remove(waiter)
+            return True
+
+    def _decrease(self, now: float) -> None:
+        # One decrease per round trip, the requests in flight when the
+        # congestion started report it too
+        if now - self._last_decrease < (self._latency or 0.0):
+            return
+        self._last_decrease = now
+        self._slow_start = False
+        self._window = max(self.min_window, self._window * self.decrease_factor)
+
+    def _release(
+        self, latency: float, congested: bool, retry_after: Optional[float]
+    ) -> None:
+        now = time.monotonic()
+        with self._lock:
+            # The window only grows when it was the limit: every slot taken
+            # or requests waiting. Light traffic says nothing about how much
+            # more the Hub can take.
+            limited = bool(self._waiters) or self._in_flight >= int(self._window)
+            self._in_flight -= 1
+
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+
+            slow = (
+                not congested
+                and self.latency_tolerance is not None
+                and self._latency is not None
+                and latency > self._latency * self.latency_tolerance
+            )
+
+            if not congested:
+                self._latency = (
+                    latency
+                    if self._latency is None
+                    else 0.9 * self._latency + 0.1 * latency
+                )
+
+            if congested or slow:
+                self._decrease(now)
+            elif limited:
+                increase = 1.0 if self._slow_start else 1.0 / self._window
+                self._window = min(self.max_window, self._window + increase)
+
+            self._dispatch()
+
+    def _outcome(self, error: Optional[BaseException]) -> Optional[bool]:
+        """Whether a finished request signals congestion, None to ignore it."""
+        if error is None:
+            return False
+
+        if isinstance(error, HubHTTPError) and error.status_code is not None:
+            if error.status_code in (429, 503):
+                with self._lock:
+                    self._throttled += 1
+                return True
+            if error.status_code >= 500:
+                with self._lock:
+                    self._errors += 1
+                return True
+            return None
+
+        if is_connection_error(error):
+            with self._lock:
+                self._errors += 1
+            return True
+
+        # Failed tasks, bad requests... say nothing about the Hub load
+        return None
+
+    @staticmethod
+    def _retry_after(error: Optional[BaseException]) -> Optional[float]:
+        # Only the Hub's own Retry-After holds the whole window
+        if isinstance(error, HubHTTPError):
+            return error.retry_after
+        return None
+
+    def _finish(self, start: float, error: Optional[BaseException]) -> None:
+        congested = self._outcome(error)
+        retry_after = self._retry_after(error)
+
+        if congested is None:
+            # Give the slot back without touching the window
+            with self._lock:
+                self._in_flight -= 1
+                if retry_after:
+                    self._blocked_until = max(
+                        self._blocked_until, time.monotonic() + retry_after
+                    )
+                self._dispatch()
+            return
+
+        self._release(time.monotonic() - start, congested, retry_after)
+
+    def report(self, error: BaseException) -> None:
+        """Take into account an error that is retried inside a slot."""
+        if not self._outcome(error):
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            retry_after = self._retry_after(error)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+            self._decrease(now)
+
+    def _blocked_for(self) -> float:
+        return max(self._blocked_until - time.monotonic(), 0.0)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Run the body in a slot of the window, waiting for one if needed."""
+        while self._blocked_for() > 0:
+            time.sleep(self._blocked_for())
+
+        waiter = _Waiter()
+        with self._lock:
+            acquired = self._try_acquire(waiter)
+        if not acquired:
+            waiter.event.wait()
+
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as error:
+            self._finish(start, error)
+            raise
+        self._finish(start, None)
+
+    @asynccontextmanager
+    async def slot_async(self) -> AsyncIterator[None]:
+        """Asynchronous counterpart of `slot`."""
+        while self._blocked_for() > 0:
+            await asyncio.sleep(self._blocked_for())
+
+        waiter = _Waiter(asyncio.get_running_loop())
+        with self._lock:
+            acquired = self._try_acquire(waiter)
+        if not acquired:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if not self._withdraw(waiter):
+                    # Granted while being cancelled, hand the slot back
+                    self._finish(time.monotonic(), asyncio.CancelledError())
+                raise
+
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as error:
+            self._finish(start, error)
+            raise
+        self._finish(start, None)
+
+
+_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_concurrency_limiter(base_url: str) -> AdaptiveConcurrencyLimiter:
+    """Return the process-wide concurrency limiter of a Hub."""
+    with _limiters_lock:
+        limiter = _limiters.get(base_url)
+        if limiter is None:
+            limiter = AdaptiveConcurrencyLimiter()
+            _limiters[base_url] = limiter
+        return limiter
@@ -1,4 +1,3 @@
-import os
 from typing import TypedDict
 
 from src.interfaces import InetumGenerationModel
@@ -6,18 +5,82 @@ from src.interfaces import InetumGenerationModel
 
 class DefaultConfig(TypedDict):
     api_url: str
-    api_key: str
     model_name: InetumGenerationModel
     polling_interval: float
+    initial_polling_interval: float
+    max_polling_interval: float
+    polling_backoff_factor: float
+    polling_jitter: float
     max_retries: int
     timeout: int
+    pool_connections: int
+    pool_maxsize: int
+    connect_timeout: float
+    read_timeout: float
+    connection_retries: int
+    async_pool_limit: int
+    async_pool_limit_per_host: int
+    dns_cache_ttl: int
+    max_concurrency: int
+    settings_cache_ttl: float
+    response_cache_size: int
+    summary_chunk_tokens: int
+    summary_max_concurrency: int
+    summary_reduce_fan_in: int
+    conversation_cache_size: int
+    concurrency_initial_window: int
+    concurrency_min_window: int
+    concurrency_max_window: int
+    concurrency_latency_tolerance: float
+    retry_initial_backoff: float
+    retry_max_backoff: float
+    retry_deadline: float
+    circuit_failure_threshold: int
+    circuit_reset_timeout: float
+    token_refresh_margin: float
+    conversation_pool_size: int
+    shard_ring_replicas: int
+    github_cache_size: int
+    github_cache_max_age: float
 
 
 DEFAULT_CONFIG: DefaultConfig = {
     "api_url": "https://playground.inetum.group/api",
     "model_name": "inetum-gpt4o",
-    "api_key": os.getenv("INETUM_GENAI_API_KEY", ""),
     "polling_interval": 0.8,
+    "initial_polling_interval": 0.1,
+    "max_polling_interval": 2.0,
+    "polling_backoff_factor": 1.6,
+    "polling_jitter": 0.1,
     "max_retries": 3,
     "timeout": 30,
+    "pool_connections": 10,
+    "pool_maxsize": 32,
+    "connect_timeout": 5.0,
+    "read_timeout": 30.0,
+    "connection_retries": 3,
+    "async_pool_limit": 100,
+    "async_pool_limit_per_host": 0,
+    "dns_cache_ttl": 300,
+    "max_concurrency": 64,
+    "settings_cache_ttl": 3600,
+    "response_cache_size": 1024,
+    "summary_chunk_tokens": 3000,
+    "summary_max_concurrency": 8,
+    "summary_reduce_fan_in": 8,
+    "conversation_cache_size": 256,
+    "concurrency_initial_window": 8,
+    "concurrency_min_window": 1,
+    "concurrency_max_window": 256,
+    "concurrency_latency_tolerance": 4.0,
+    "retry_initial_backoff": 0.5,
+    "retry_max_backoff": 8.0,
+    "retry_deadline": 60.0,
+    "circuit_failure_threshold": 5,
+    "circuit_reset_timeout": 30.0,
+    "token_refresh_margin": 60.0,
+    "conversation_pool_size": 8,
+    "shard_ring_replicas": 64,
+    "github_cache_size": 2048,
+    "github_cache_max_age": 7 * 24 * 3600,
 }
@@ -0,0 +1,128 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, TypedDict
+
+from langchain_core.messages import BaseMessage
+
+from src.config import DEFAULT_CONFIG
+
+
+class HubConversation(TypedDict):
+    conversation_id: str
+    # Messages stored in the Hub conversation (inputs and answers)
+    hub_messages: int
+
+
+class ConversationPlan(TypedDict):
+    conversation_id: str
+    hub_messages: int
+    # Index of the first message the Hub has not seen yet
+    start: int
+
+
+def prefix_hashes(messages: Sequence[BaseMessage]) -> List[str]:
+    """Hashes of every prefix of a message history.
+
+    `prefix_hashes(messages)[i]` identifies `messages[: i + 1]`; each hash
+    chains the previous one, so the whole list costs one pass.
+    """
+    hashes = []
+    digest = b""
+    for message in messages:
+        digest = hashlib.sha256(
+            digest + f"{message.type}\0{message.content}".encode()
+        ).digest()
+        hashes.append(digest.hex())
+    return hashes
+
+
+class ConversationTracker:
+    """Map LangChain message histories to the Hub conversations holding them.
+
+    After a generation, the history sent plus the answer is recorded against
+    the Hub conversation. A later history that extends a recorded one only
+    needs its new messages sent to that conversation. Entries are claimed
+    when used, so two concurrent continuations of the same history never
+    write to the same conversation, and the least recently used entries are
+    dropped beyond `max_size`.
+
+    Args:
+        max_size (int): maximum number of histories remembered.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CONFIG["conversation_cache_size"]):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, HubConversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def claim(
+        self,
+        messages: Sequence[BaseMessage],
+        max_previous_messages: Optional[int] = None,
+    ) -> Optional[ConversationPlan]:
+        """Find the Hub conversation continued by `messages` and take it.
+
+        Args:
+            messages: the full LangChain history of the request.
+            max_previous_messages: number of previous messages the Hub puts
+                in the model context (`numberPreviousMessages`), None when
+                unlimited. Longer conversations are not continued, the model
+                would not see their beginning.
+
+        Returns:
+            Optional[ConversationPlan]: None when the whole history must be
+            sent to a new conversation.
+        """
+        hashes = prefix_hashes(messages)
+
+        with self._lock:
+            # The last message is always new, look for the longest known prefix
+            for end in range(len(messages) - 1, 0, -1):
+                entry = self._entries.pop(hashes[end - 1], None)
+                if entry is not None:
+                    break
+            else:
+                return None
+
+        if (
+            max_previous_messages is not None
+            and entry["hub_messages"] > max_previous_messages
+        ):
+            return None
+
+        # A new system prompt changes the whole context, start over
+        if any(message.type == "system" for message in messages[end:]):
+            return None
+
+        return {
+            "conversation_id": entry["conversation_id"],
+            "hub_messages": entry["hub_messages"],
+            "start": end,
+        }
+
+    def record(
+        self,
+        messages: Sequence[BaseMessage],
+        answer: BaseMessage,
+        conversation_id: str,
+        hub_messages: int,
+    ) -> None:
+        """Remember that the Hub conversation holds `messages` and `answer`."""
+        key = prefix_hashes([*messages, answer])[-1]
+
+        with self._lock:
+            self._entries[key] = {
+                "conversation_id": conversation_id,
+                "hub_messages": hub_messages,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
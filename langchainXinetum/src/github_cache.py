@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, TypedDict
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from src.config import DEFAULT_CONFIG
+
+# /commits/{sha} never changes once the SHA exists
+IMMUTABLE_URL = re.compile(r"/commits/[0-9a-f]{40}(\?|$)")
+
+# Query parameters of one-off requests, e.g. the `since=` of every watch poll,
+# whose responses would never be asked for again
+UNCACHED_PARAMS = ("since",)
+
+# Writes between two prunings of the on-disk cache
+PRUNE_EVERY = 64
+
+
+class CachedResponse(TypedDict):
+    url: str
+    content: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    link: Optional[str]
+    stored_at: float
+
+
+class GithubResponseCache:
+    """
+    Cache of GitHub API responses revalidated with ETag / Last-Modified.
+    Entries are kept in memory and, when a directory is given, on disk
+    (one JSON file per URL) so that they survive between runs. Both are
+    bounded to `max_entries` entries, the least recently used are evicted
+    first (the directory is pruned every few writes), and entries older
+    than `max_age` are dropped. Responses to one-off
+    queries (`since=`) are not cached.
+    :param directory: Directory of the on-disk cache, None for memory only
+    :param max_entries: Maximum number of entries, in memory and on disk
+    :param max_age: Seconds after which an entry is dropped
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_entries: int = DEFAULT_CONFIG["github_cache_size"],
+        max_age: float = DEFAULT_CONFIG["github_cache_max_age"],
+    ):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._prune_directory()
+
+    @staticmethod
+    def is_immutable(url: str) -> bool:
+        return bool(IMMUTABLE_URL.search(url))
+
+    @staticmethod
+    def is_cacheable(url: str) -> bool:
+        query = parse_qs(urlsplit(url).query)
+        return not any(param in query for param in UNCACHED_PARAMS)
+
+    def _expired(self, entry: CachedResponse) -> bool:
+        return time.time() - entry.get("stored_at", 0) > self.max_age
+
+    def _remember(self, url: str, entry: CachedResponse) -> None:
+        """Store an entry in memory as the most recent one. Hold the lock."""
+        self._entries[url] = entry
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _prune_directory(self) -> None:
+        """Remove the expired files and the least recently used beyond the limit."""
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                files.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+
+        files.sort(reverse=True)
+        now = time.time()
+        for index, (mtime, path) in enumerate(files):
+            if index >= self.max_entries or now - mtime > self.max_age:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        if not self.is_cacheable(url):
+            return None
+
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                if self._expired(entry):
+                    del self._entries[url]
+                    entry = None
+                else:
+                    self._entries.move_to_end(url)
+        if entry is not None or not self.directory:
+            return entry
+
+        path = self._path(url)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if self._expired(entry):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        try:
+            # The modification time orders the files for the LRU pruning
+            os.utime(path)
+        except OSError:
+            pass
+
+        with self._lock:
+            self._remember(url, entry)
+        return entry
+
+    def set(self, url: str, response: requests.Response) -> None:
+        if not self.is_cacheable(url):
+            return
+
+        entry: CachedResponse = {
+            "url": url,
+            "content": response.text,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "link": response.headers.get("Link"),
+            "stored_at": time.time(),
+        }
+
+        with self._lock:
+            self._remember(url, entry)
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+
+        if self.directory:
+            tmp_path = f"{self._path(url)}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(entry, file)
+            os.replace(tmp_path, self._path(url))
+            if prune:
+                self._prune_directory()
+
+    @staticmethod
+    def conditional_headers(entry: CachedResponse) -> Dict[str, str]:
+        """Headers revalidating a cached entry, a 304 answer costs no rate limit."""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    def to_response(entry: CachedResponse) -> requests.Response:
+        """Rebuild a 200 response from a cached entry."""
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry["url"]
+        response.encoding = "utf-8"
+        response._content = entry["content"].encode("utf-8")
+        if entry.get("link"):
+            response.headers["Link"] = entry["link"]
+        if entry.get("etag"):
+            response.headers["ETag"] = entry["etag"]
+        response.headers["X-From-Cache"] = "1"
+        return response
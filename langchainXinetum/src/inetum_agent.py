@@ -1,19 +1,75 @@
+import asyncio
 import json
+import logging
+import os
+import threading
 import time
-from typing import Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    Optional,
+    TypedDict,
+)
 import uuid
 
 from pydantic import SecretStr
 import requests
 
+from src.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    HubHTTPError,
+    get_concurrency_limiter,
+    parse_retry_after,
+)
 from src.config import DEFAULT_CONFIG
 from src.interfaces import InetumGenerationModel
-import aiohttp
-import asyncio
-
-from dotenv import load_dotenv
-
-load_dotenv()
+from src.metrics import (
+    GenerationTimer,
+    GenerationTimings,
+    MetricsSink,
+    default_metrics,
+)
+from src.retry import CircuitBreaker, RetryPolicy, get_circuit_breaker
+from src.polling import (
+    ExponentialBackoffPolling,
+    FixedPolling,
+    PollingStrategy,
+    PollStats,
+)
+from src.scheduler import get_settings_scheduler, settings_key
+from src.session import create_session
+from src.settings_cache import (
+    SettingsCache,
+    default_settings_cache,
+    settings_cache_key,
+)
+
+if TYPE_CHECKING:
+    # Only the async methods need aiohttp, it is imported on their first use
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+async def _close_when_cancelled(session: "aiohttp.ClientSession") -> None:
+    """Close `session` once its event loop cancels the remaining tasks."""
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        await session.close()
+
+
+class GenerationResult(TypedDict):
+    text: str
+    conversation_id: Optional[str]
+    message_count: int
+    polls: int
+    poll_wait_seconds: float
+    wasted_wait_seconds: float
+    timings: Optional[GenerationTimings]
 
 
 class InetumSDK:
@@ -25,10 +81,59 @@ class InetumSDK:
         temperature: Optional[float],
         top_p: Optional[float],
         max_tokens: Optional[int],
+        session: Optional[requests.Session] = None,
+        connect_timeout: float = DEFAULT_CONFIG["connect_timeout"],
+        read_timeout: float = DEFAULT_CONFIG["read_timeout"],
+        async_session: Optional["aiohttp.ClientSession"] = None,
+        async_pool_limit: int = DEFAULT_CONFIG["async_pool_limit"],
+        async_pool_limit_per_host: int = DEFAULT_CONFIG["async_pool_limit_per_host"],
+        polling_strategy: Optional[PollingStrategy] = None,
+        settings_cache: Optional[SettingsCache] = None,
+        lazy_init: bool = False,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        metrics: Optional[MetricsSink] = None,
     ) -> None:
-        print("Initializing Inetum SDK...")
+        logger.debug("Initializing Inetum SDK for %s", base_url)
         self.api_key = api_key
         self.base_url = base_url
+        self.model_name = model
+        self.polling_strategy = polling_strategy or ExponentialBackoffPolling()
+
+        # Generations in flight are limited by an AIMD window shared by every
+        # SDK of the process talking to this Hub, see `src.concurrency`.
+        self.concurrency_limiter = concurrency_limiter or get_concurrency_limiter(
+            base_url
+        )
+
+        # Transient errors are retried where it is safe (see `src.retry`), and
+        # calls fail fast while the Hub is down.
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker(base_url)
+
+        # Phase timings, poll and byte counts of every generation (see
+        # `src.metrics`).
+        self.metrics = metrics if metrics is not None else default_metrics
+
+        # Keep-alive connection pool shared by every call of this SDK.
+        # A session given by the caller may be shared with other SDKs and
+        # is not closed by this instance. The retry policy is the only retry
+        # layer, the transport does not retry underneath it.
+        self._owns_session = session is None
+        self.session = (
+            session if session is not None else create_session(connection_retries=0)
+        )
+        self.request_timeout = (connect_timeout, read_timeout)
+
+        # Long-lived aiohttp session used by the async methods, created on
+        # first use since it must be bound to a running event loop.
+        self._owns_async_session = async_session is None
+        self._async_session = async_session
+        self._async_session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_session_closer: Optional[asyncio.Task] = None
+        self.async_pool_limit = async_pool_limit
+        self.async_pool_limit_per_host = async_pool_limit_per_host
 
         self.headers = {
             "Authorization": f"Bearer {api_key.get_secret_value()}",
@@ -39,88 +144,546 @@ class InetumSDK:
             "Connection": "keep-alive",
         }
 
-        settings_response = self.__fetch_settings()
+        self.temperature = temperature
+        self.top_p = top_p
+        self.max_tokens = max_tokens
+
+        # Agent settings and model ids are cached, and fetched either now or
+        # on the first generation when `lazy_init` is set.
+        self.settings_cache = settings_cache or default_settings_cache
+        self._settings_cache_key = settings_cache_key(
+            base_url, api_key.get_secret_value()
+        )
+        self.settings: dict = {}
+        self.agent_id: Optional[str] = None
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+        if not lazy_init:
+            self._ensure_initialized()
+
+        logger.debug("Inetum SDK initialized")
+
+    def close(self) -> None:
+        """Close the HTTP session if it is owned by this SDK."""
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self) -> "InetumSDK":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
-        if settings_response.status_code == 401:
-            raise Exception("Invalid API key. Please check your credentials.")
-        elif settings_response.status_code != 200:
-            raise Exception(
-                f"Error fetching settings: {settings_response.status_code} - {settings_response.text}"
+    def _get_async_session(self) -> "aiohttp.ClientSession":
+        """Return the shared aiohttp session, creating it for the running loop."""
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+
+        if not self._owns_async_session:
+            return self._async_session
+
+        if (
+            self._async_session is None
+            or self._async_session.closed
+            or self._async_session_loop is not loop
+        ):
+            connector = aiohttp.TCPConnector(
+                limit=self.async_pool_limit,
+                limit_per_host=self.async_pool_limit_per_host,
+                ttl_dns_cache=DEFAULT_CONFIG["dns_cache_ttl"],
+            )
+            self._async_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=self.request_timeout[0],
+                    sock_read=self.request_timeout[1],
+                ),
             )
-        self.settings = settings_response.json()
-        self.agent_id = self.settings["agentId"]
+            self._async_session_loop = loop
+            # A session can only be closed on its own loop, and nothing can
+            # await it once that loop is closed. `asyncio.run` (and most
+            # runners) cancel the pending tasks first, the session is closed
+            # then, and the one of the next loop replaces it without leaking
+            # the connections of the previous one.
+            self._async_session_closer = loop.create_task(
+                _close_when_cancelled(self._async_session)
+            )
+
+        return self._async_session
+
+    async def aclose(self) -> None:
+        """Close the aiohttp session if it is owned by this SDK."""
+        if not self._owns_async_session:
+            return
+
+        if self._async_session_closer is not None:
+            self._async_session_closer.cancel()
+            self._async_session_closer = None
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
 
-        self.__initialize_model(model, temperature, top_p, max_tokens)
+    async def __aenter__(self) -> "InetumSDK":
+        return self
 
-        print("Inetum SDK initialized successfully. \n")
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def initialize(self) -> None:
+        """Resolve the agent settings now rather than on the first generation."""
+        self._ensure_initialized()
+
+    def new_conversation_id(self) -> str:
+        """Id of a new Hub conversation for this SDK."""
+        return str(uuid.uuid4())
+
+    def previous_messages_limit(
+        self, conversation_id: Optional[str] = None
+    ) -> Optional[int]:
+        """Previous messages the agent puts in the model context, None if unlimited.
+
+        Resolves the agent settings first when they are not yet.
+
+        Args:
+            conversation_id (Optional[str]): conversation continued. Unused
+                here, every conversation is on this agent; `ShardedInetumSDK`
+                takes it to answer for the agent holding the conversation,
+                so that `ChatInetum` calls both the same way.
+        """
+        self._ensure_initialized()
+        return self.settings.get("numberPreviousMessages")
+
+    async def previous_messages_limit_async(
+        self, conversation_id: Optional[str] = None
+    ) -> Optional[int]:
+        """Asynchronous counterpart of `previous_messages_limit`."""
+        await self._ensure_initialized_async()
+        return self.settings.get("numberPreviousMessages")
+
+    def _ensure_initialized(self) -> None:
+        """Resolve the agent settings and apply the model configuration once."""
+        if self._initialized:
+            return
+
+        with self._init_lock:
+            if not self._initialized:
+                self.__initialize()
+                self._initialized = True
+
+    async def _ensure_initialized_async(self) -> None:
+        if not self._initialized:
+            await asyncio.to_thread(self._ensure_initialized)
+
+    def _invalidate_settings(self) -> None:
+        """Drop the cached settings, they are refetched on the next generation."""
+        self.settings_cache.invalidate(self._settings_cache_key)
+        self._initialized = False
+
+    def __initialize(self) -> None:
+        cached = self.settings_cache.get(self._settings_cache_key)
+
+        if cached is not None:
+            self.settings = cached["settings"]
+            self.agent_id = self.settings["agentId"]
+            model_ids = cached["model_ids"]
+
+            if self.model_name not in model_ids:
+                # The agent may have gained models since the entry was stored
+                model_ids = self.__get_model_ids()
+        else:
+            settings_response = self.__fetch_settings()
+
+            if settings_response.status_code == 401:
+                raise Exception("Invalid API key. Please check your credentials.")
+            elif settings_response.status_code != 200:
+                raise Exception(
+                    f"Error fetching settings: {settings_response.status_code} - {settings_response.text}"
+                )
+            self.settings = settings_response.json()
+            self.agent_id = self.settings["agentId"]
+            model_ids = self.__get_model_ids()
+
+        self._model_ids = model_ids
+        self.__initialize_model(model_ids)
+
+        self.settings_cache.set(self._settings_cache_key, self.settings, model_ids)
 
     def __get_agent(self):
-        res = requests.get(
+        res = self.session.get(
             self.base_url + f"/agent/{self.agent_id}",
             headers=self.headers,
+            timeout=self.request_timeout,
         )
 
         return res.json()
 
+    def __get_model_ids(self) -> Dict[str, str]:
+        """Map the names and display names of the agent's models to their id."""
+        agent_settings = self.__get_agent()
+
+        model_ids = {}
+        for model in agent_settings.get("generationModels", []):
+            for name in (model.get("name"), model.get("displayName")):
+                if name:
+                    model_ids[name] = model.get("id")
+
+        return model_ids
+
     def __fetch_settings(self):
-        res = requests.get(
+        res = self.session.get(
             self.base_url + "/settings/get-agent-settings",
             headers=self.headers,
+            timeout=self.request_timeout,
         )
         return res
 
-    def __initialize_model(
-        self,
-        model_name: InetumGenerationModel,
-        temperature: Optional[float],
-        top_p: Optional[float],
-        max_tokens: Optional[int],
-    ):
-        agent_settings = self.__get_agent()
-
-        model_id = None
-        for model in agent_settings.get("generationModels", []):
-            if (
-                model.get("name") == model_name
-                or model.get("displayName") == model_name
-            ):
-                model_id = model.get("id")
+    def _desired_settings(self, model_ids: Dict[str, str]) -> dict:
+        """Settings fields this SDK needs on the agent."""
+        model_id = model_ids.get(self.model_name)
         if not model_id:
-            raise Exception(f"Model {model_name} not found.")
+            raise Exception(f"Model {self.model_name} not found.")
+
+        desired = {"generationModelId": model_id}
+
+        if self.temperature is not None:
+            desired["generationTemperature"] = self.temperature
 
-        self.settings["generationModelId"] = model_id
+        if self.top_p is not None:
+            desired["generationTopP"] = self.top_p
 
-        if temperature is not None:
-            self.settings["generationTemperature"] = temperature
+        if self.max_tokens is not None:
+            desired["generationMaxTokens"] = self.max_tokens
 
-        if top_p is not None:
-            self.settings["generationTopP"] = top_p
+        return desired
 
-        if max_tokens is not None:
-            self.settings["generationMaxTokens"] = max_tokens
+    def __initialize_model(self, model_ids: Dict[str, str]):
+        self._desired = self._desired_settings(model_ids)
+        self._settings_key = settings_key(self._desired)
 
-        self.__update_settings(self.settings)
+        # The settings are applied through the agent's scheduler, right before
+        # the first generation that needs them, and never while a generation
+        # that needs other settings is running.
+        self.scheduler = get_settings_scheduler(self.base_url, self.settings["id"])
+
+        if all(
+            self.settings.get(key) == value for key, value in self._desired.items()
+        ):
+            self.scheduler.observe(self._settings_key)
+
+    def _apply_settings(self) -> None:
+        settings = {**self.settings, **self._desired}
+        self.__update_settings(settings)
+        self.settings = settings
+        self.settings_cache.set(
+            self._settings_cache_key, self.settings, self._model_ids
+        )
+
+    async def _apply_settings_async(self) -> None:
+        await asyncio.to_thread(self._apply_settings)
+
+    def _hold_settings(self):
+        """Context manager running a generation under this SDK's settings."""
+        return self.scheduler.hold(self._settings_key, self._apply_settings)
+
+    def _hold_settings_async(self):
+        return self.scheduler.hold_async(
+            self._settings_key, self._apply_settings_async
+        )
 
     def __update_settings(self, settings: dict):
-        res = requests.put(
+        res = self.session.put(
             self.base_url + f"/settings/{self.settings['id']}",
             json=settings,
             headers=self.headers,
+            timeout=self.request_timeout,
         )
 
         if res.status_code != 200:
+            if 400 <= res.status_code < 500:
+                self._invalidate_settings()
             raise Exception(f"Error updating settings: {res.text}")
         return res.json()
 
+    def _polling_strategy(self, polling_interval: Optional[float]) -> PollingStrategy:
+        if polling_interval is not None:
+            return FixedPolling(polling_interval)
+        return self.polling_strategy
+
+    @staticmethod
+    def _new_payload(
+        user_prompt: str,
+        system_prompt: Optional[str],
+        conversation_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        # Continue the given conversation, or generate a new conversation ID
+        payload = {
+            "conversationId": conversation_id or str(uuid.uuid4()),
+            "inputText": user_prompt,
+        }
+
+        if system_prompt:
+            payload["userPrompt"] = system_prompt
+
+        return payload
+
+    @staticmethod
+    def _answer_text(data: dict, previous_messages: int = 0) -> Optional[str]:
+        """Return the answer of the last turn of a conversation, if already present."""
+        messages = data.get("messages") or []
+        # The turn starts with the user input, the answer comes after it.
+        if len(messages) < previous_messages + 2:
+            return None
+        return messages[-1].get("text")
+
+    def _retry(self, fn, *args, idempotent: bool = True):
+        return self.retry_policy.call(
+            fn,
+            *args,
+            idempotent=idempotent,
+            breaker=self.circuit_breaker,
+            on_retry=self.concurrency_limiter.report,
+        )
+
+    async def _retry_async(self, fn, *args, idempotent: bool = True):
+        return await self.retry_policy.call_async(
+            fn,
+            *args,
+            idempotent=idempotent,
+            breaker=self.circuit_breaker,
+            on_retry=self.concurrency_limiter.report,
+        )
+
+    def _submit(
+        self, payload: dict, timer: Optional[GenerationTimer] = None
+    ) -> str:
+        """Post a message to the Hub and return the task location.
+
+        Only retried when the Hub certainly did not receive it, a retried
+        post could otherwise add the message twice to the conversation.
+        """
+        return self._retry(self._submit_once, payload, timer, idempotent=False)
+
+    def _check_task(
+        self, task_location: str, timer: Optional[GenerationTimer] = None
+    ) -> bool:
+        done = self._retry(self._check_task_once, task_location, timer)
+        if timer:
+            timer.poll()
+        return done
+
+    def _fetch_conversation(
+        self, conversation_id: str, timer: Optional[GenerationTimer] = None
+    ) -> dict:
+        return self._retry(self._fetch_conversation_once, conversation_id, timer)
+
+    async def _submit_async(
+        self,
+        session: "aiohttp.ClientSession",
+        payload: dict,
+        timer: Optional[GenerationTimer] = None,
+    ) -> str:
+        return await self._retry_async(
+            self._submit_once_async, session, payload, timer, idempotent=False
+        )
+
+    async def _check_task_async(
+        self,
+        session: "aiohttp.ClientSession",
+        task_location: str,
+        timer: Optional[GenerationTimer] = None,
+    ) -> bool:
+        done = await self._retry_async(
+            self._check_task_once_async, session, task_location, timer
+        )
+        if timer:
+            timer.poll()
+        return done
+
+    async def _fetch_conversation_async(
+        self,
+        session: "aiohttp.ClientSession",
+        conversation_id: str,
+        timer: Optional[GenerationTimer] = None,
+    ) -> dict:
+        return await self._retry_async(
+            self._fetch_conversation_once_async, session, conversation_id, timer
+        )
+
+    def _submit_once(
+        self, payload: dict, timer: Optional[GenerationTimer] = None
+    ) -> str:
+        """Post a message to the Hub and return the task location."""
+        body = json.dumps(payload).encode()
+        res = self.session.post(
+            self.base_url + "/Chat",
+            data=body,
+            headers=self.headers,
+            timeout=self.request_timeout,
+        )
+        if timer:
+            timer.add_bytes(len(body), len(res.content))
+
+        if res.status_code != 202:
+            if 400 <= res.status_code < 500 and res.status_code != 429:
+                self._invalidate_settings()
+            raise HubHTTPError(
+                f"Error sending message: {res.text}",
+                res.status_code,
+                parse_retry_after(res.headers.get("Retry-After")),
+            )
+
+        task_location = res.headers.get("Location")
+
+        if not task_location:
+            raise Exception("No task location found in the response headers.")
+
+        return task_location
+
+    def _check_task_once(
+        self, task_location: str, timer: Optional[GenerationTimer] = None
+    ) -> bool:
+        """Return True when the task succeeded, False while it is running."""
+        res = self.session.get(
+            task_location, headers=self.headers, timeout=self.request_timeout
+        )
+        if timer:
+            timer.add_bytes(0, len(res.content))
+
+        if res.status_code != 200:
+            raise HubHTTPError(
+                f"Error checking task status: {res.text}",
+                res.status_code,
+                parse_retry_after(res.headers.get("Retry-After")),
+            )
+
+        data = res.json()
+
+        if data["status"] == "Failed":
+            raise Exception(f"Task failed: {data}")
+
+        return data["status"] == "Succeeded"
+
+    def _fetch_conversation_once(
+        self, conversation_id: str, timer: Optional[GenerationTimer] = None
+    ) -> dict:
+        res = self.session.get(
+            self.base_url + f"/Chat/{conversation_id}",
+            headers=self.headers,
+            timeout=self.request_timeout,
+        )
+        if timer:
+            timer.add_bytes(0, len(res.content))
+        if res.status_code != 200:
+            raise HubHTTPError(
+                f"Error getting conversation data: {res.text}",
+                res.status_code,
+                parse_retry_after(res.headers.get("Retry-After")),
+            )
+        return res.json()
+
+    async def _submit_once_async(
+        self,
+        session: "aiohttp.ClientSession",
+        payload: dict,
+        timer: Optional[GenerationTimer] = None,
+    ) -> str:
+        body = json.dumps(payload).encode()
+        async with session.post(
+            self.base_url + "/Chat",
+            data=body,
+            headers=self.headers,
+        ) as res:
+            if timer:
+                timer.add_bytes(len(body), len(await res.read()))
+            if res.status != 202:
+                if 400 <= res.status < 500 and res.status != 429:
+                    self._invalidate_settings()
+                raise HubHTTPError(
+                    f"Error sending message: {await res.text()}",
+                    res.status,
+                    parse_retry_after(res.headers.get("Retry-After")),
+                )
+
+            task_location = res.headers.get("Location")
+
+        if not task_location:
+            raise Exception("No task location found in the response headers.")
+
+        return task_location
+
+    async def _check_task_once_async(
+        self,
+        session: "aiohttp.ClientSession",
+        task_location: str,
+        timer: Optional[GenerationTimer] = None,
+    ) -> bool:
+        async with session.get(task_location, headers=self.headers) as res:
+            body = await res.read()
+            if timer:
+                timer.add_bytes(0, len(body))
+
+            if res.status != 200:
+                raise HubHTTPError(
+                    f"Error checking task status: {await res.text()}",
+                    res.status,
+                    parse_retry_after(res.headers.get("Retry-After")),
+                )
+
+            data = json.loads(body)
+
+        if data["status"] == "Failed":
+            raise Exception(f"Task failed: {data.get('error', data)}")
+
+        return data["status"] == "Succeeded"
+
+    async def _fetch_conversation_once_async(
+        self,
+        session: "aiohttp.ClientSession",
+        conversation_id: str,
+        timer: Optional[GenerationTimer] = None,
+    ) -> dict:
+        async with session.get(
+            self.base_url + f"/Chat/{conversation_id}",
+            headers=self.headers,
+        ) as res:
+            body = await res.read()
+            if timer:
+                timer.add_bytes(0, len(body))
+
+            if res.status != 200:
+                raise HubHTTPError(
+                    f"Error getting conversation data: {await res.text()}",
+                    res.status,
+                    parse_retry_after(res.headers.get("Retry-After")),
+                )
+            return json.loads(body)
+
     def wait_for_response(
         self,
         task_location: str,
-        polling_interval: float,
-        timeout: int,
-    ) -> None:
-        """Wait for the response from the Inetum GenAI Hub."""
+        polling_interval: Optional[float] = None,
+        timeout: int = DEFAULT_CONFIG["timeout"],
+        timer: Optional[GenerationTimer] = None,
+    ) -> PollStats:
+        """Wait for the response from the Inetum GenAI Hub.
+
+        Polls the task location following the SDK's polling strategy, or at a
+        fixed `polling_interval` when one is given. The polls and their bytes
+        are counted on `timer` when given.
+
+        Returns:
+            PollStats: number of polls and time spent sleeping between them.
+        """
+
+        strategy = self._polling_strategy(polling_interval)
+        delays = strategy.delays(self.model_name)
 
         start_time = time.time()
+        polls = 0
+        waited = 0.0
+        last_delay = 0.0
 
         while True:
             elapsed_time = time.time() - start_time
@@ -128,30 +691,44 @@ class InetumSDK:
             if elapsed_time > timeout:
                 raise Exception("Timeout waiting for response.")
 
-            res = requests.get(task_location, headers=self.headers)
+            polls += 1
+            if self._check_task(task_location, timer):
+                strategy.record(self.model_name, time.time() - start_time)
+                return {
+                    "polls": polls,
+                    "poll_wait_seconds": waited,
+                    "wasted_wait_seconds": last_delay,
+                }
 
-            if res.status_code != 200:
-                raise Exception(f"Error checking task status: {res.text}")
-
-            data = res.json()
-
-            if data["status"] == "Failed":
-                raise Exception(f"Task failed: {data}")
-            elif data["status"] == "Succeeded":
-                return
-
-            time.sleep(polling_interval)
+            last_delay = min(next(delays), max(timeout - elapsed_time, 0))
+            time.sleep(last_delay)
+            waited += last_delay
 
     async def wait_for_response_async(
         self,
-        session: aiohttp.ClientSession,
+        session: Optional["aiohttp.ClientSession"],
         task_location: str,
-        polling_interval: float = DEFAULT_CONFIG["polling_interval"],
+        polling_interval: Optional[float] = None,
         timeout: int = DEFAULT_CONFIG["timeout"],
-    ) -> None:
-        """Wait for the response from the Inetum GenAI Hub asynchronously."""
+        timer: Optional[GenerationTimer] = None,
+    ) -> PollStats:
+        """Wait for the response from the Inetum GenAI Hub asynchronously.
+
+        Returns:
+            PollStats: number of polls and time spent sleeping between them.
+        """
+
+        if session is None:
+            session = self._get_async_session()
+
+        strategy = self._polling_strategy(polling_interval)
+        delays = strategy.delays(self.model_name)
 
         start_time = time.time()
+        polls = 0
+        waited = 0.0
+        last_delay = 0.0
+
         while True:
             # Check if the timeout has been reached
             elapsed_time = time.time() - start_time
@@ -160,25 +737,26 @@ class InetumSDK:
                 raise Exception("Timeout waiting for response.")
 
             # Check the status of the task
-            async with session.get(task_location) as res:
-                if res.status != 200:
-                    raise Exception(f"Error checking task status: {await res.text()}")
-
-                data = await res.json()
-
-                if data["status"] == "Failed":
-                    raise Exception(f"Task failed: {data['error']}")
-                elif data["status"] == "Succeeded":
-                    return
-
-                await asyncio.sleep(polling_interval)
+            polls += 1
+            if await self._check_task_async(session, task_location, timer):
+                strategy.record(self.model_name, time.time() - start_time)
+                return {
+                    "polls": polls,
+                    "poll_wait_seconds": waited,
+                    "wasted_wait_seconds": last_delay,
+                }
+
+            last_delay = min(next(delays), max(timeout - elapsed_time, 0))
+            await asyncio.sleep(last_delay)
+            waited += last_delay
 
     def generate(
         self,
         user_prompt: str,
         system_prompt: Optional[str] = None,
-        polling_interval: float = DEFAULT_CONFIG["polling_interval"],
+        polling_interval: Optional[float] = None,
         timeout: int = DEFAULT_CONFIG["timeout"],
+        conversation_id: Optional[str] = None,
         **kwargs,
     ) -> str:
         """Generate a response from the Inetum GenAI Hub.
@@ -186,124 +764,372 @@ class InetumSDK:
         Args:
             user_prompt (str): the user prompt
             system_prompt (Optional[str], optional): system prompt. Defaults to None.
+            polling_interval (Optional[float], optional): fixed polling interval,
+                overrides the polling strategy. Defaults to None.
+            conversation_id (Optional[str], optional): Hub conversation to
+                continue, a new one is started when None. Defaults to None.
+            **kwargs: additional parameters for the request.
+
+        Returns:
+            str: the generated text
+        """
+        return self.generate_with_metadata(
+            user_prompt,
+            system_prompt,
+            polling_interval=polling_interval,
+            timeout=timeout,
+            conversation_id=conversation_id,
+            **kwargs,
+        )["text"]
+
+    def generate_with_metadata(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str] = None,
+        polling_interval: Optional[float] = None,
+        timeout: int = DEFAULT_CONFIG["timeout"],
+        conversation_id: Optional[str] = None,
+        **kwargs,
+    ) -> GenerationResult:
+        """Generate a response and return it with its polling statistics.
+
+        Args:
+            user_prompt (str): the user prompt
+            system_prompt (Optional[str], optional): system prompt. Defaults to None.
+            polling_interval (Optional[float], optional): fixed polling interval,
+                overrides the polling strategy. Defaults to None.
+            conversation_id (Optional[str], optional): Hub conversation to
+                continue, a new one is started when None. Defaults to None.
             **kwargs: additional parameters for the request.
 
         Raises:
-            Exception: _description_
-            Exception: _description_
-            Exception: _description_
-            Exception: _description_
+            Exception: if the message cannot be sent, the task fails or times
+                out, or the conversation cannot be fetched.
 
         Returns:
-            str: _description_
+            GenerationResult: the generated text and generation metadata,
+            including the duration of each phase (see `src.metrics.PHASES`).
         """
 
-        # Generate a new conversation ID
-        conversation_id = str(uuid.uuid4())
+        self._ensure_initialized()
 
-        payload = {
-            "conversationId": conversation_id,
-            "inputText": user_prompt,
-        }
+        payload = self._new_payload(user_prompt, system_prompt, conversation_id)
+        conversation_id = payload["conversationId"]
+        timer = GenerationTimer()
 
-        if system_prompt:
-            payload["userPrompt"] = system_prompt
+        try:
+            with self._hold_settings(), self.concurrency_limiter.slot():
+                timer.mark("queue")
+                task_location = self._submit(payload, timer)
+                timer.mark("submit")
 
-        res = requests.post(
-            self.base_url + "/Chat",
-            json=payload,
-            headers=self.headers,
-        )
+                # Wait for the response
+                poll_stats = self.wait_for_response(
+                    task_location,
+                    polling_interval=polling_interval,
+                    timeout=timeout,
+                    timer=timer,
+                )
+                timer.mark("completion")
+
+            # Get the conversation data
+            data = self._fetch_conversation(conversation_id, timer)
+            timer.mark("fetch")
+
+            if "messages" not in data:
+                raise Exception("No messages found in the conversation data.")
+        except Exception as error:
+            timer.record(self.metrics, self.model_name, error)
+            raise
+        timer.record(self.metrics, self.model_name)
 
-        if res.status_code != 202:
-            raise Exception(f"Error sending message: {res.text}")
+        # Check if the response contains the expected data
+        return {
+            "text": data["messages"][-1]["text"],
+            "conversation_id": conversation_id,
+            "message_count": len(data["messages"]),
+            **poll_stats,
+            "timings": timer.timings(),
+        }
+
+    async def generate_async(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str] = None,
+        polling_interval: Optional[float] = None,
+        timeout: int = DEFAULT_CONFIG["timeout"],
+        conversation_id: Optional[str] = None,
+        **kwargs,
+    ) -> str:
+        """Generate a response from the Inetum GenAI Hub asynchronously.
 
-        task_location = res.headers["Location"]
+        Uses the SDK's long-lived aiohttp session, so concurrent calls share
+        connections, DNS results and TLS sessions.
 
-        if not task_location:
-            raise Exception("No task location found in the response headers.")
+        Args:
+            user_prompt (str): the user prompt
+            system_prompt (Optional[str], optional): system prompt. Defaults to None.
+            polling_interval (Optional[float], optional): fixed polling interval,
+                overrides the polling strategy. Defaults to None.
+            conversation_id (Optional[str], optional): Hub conversation to
+                continue, a new one is started when None. Defaults to None.
+            **kwargs: additional parameters for the request.
 
-        # Wait for the response
-        self.wait_for_response(
-            task_location,
+        Returns:
+            str: the generated text
+        """
+        result = await self.generate_with_metadata_async(
+            user_prompt,
+            system_prompt,
             polling_interval=polling_interval,
             timeout=timeout,
+            conversation_id=conversation_id,
+            **kwargs,
         )
+        return result["text"]
 
-        # Get the conversation data
-        res = requests.get(
-            self.base_url + f"/Chat/{conversation_id}", headers=self.headers
-        )
-        if res.status_code != 200:
-            raise Exception(f"Error getting conversation data: {res.text}")
-        data = res.json()
+    async def generate_with_metadata_async(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str] = None,
+        polling_interval: Optional[float] = None,
+        timeout: int = DEFAULT_CONFIG["timeout"],
+        conversation_id: Optional[str] = None,
+        **kwargs,
+    ) -> GenerationResult:
+        """Asynchronous counterpart of `generate_with_metadata`."""
+
+        await self._ensure_initialized_async()
+
+        payload = self._new_payload(user_prompt, system_prompt, conversation_id)
+        conversation_id = payload["conversationId"]
+
+        session = self._get_async_session()
+        timer = GenerationTimer()
 
-        if "messages" not in data:
-            raise Exception("No messages found in the conversation data.")
+        try:
+            async with (
+                self._hold_settings_async(),
+                self.concurrency_limiter.slot_async(),
+            ):
+                timer.mark("queue")
+                task_location = await self._submit_async(session, payload, timer)
+                timer.mark("submit")
+
+                # Wait for the response
+                poll_stats = await self.wait_for_response_async(
+                    session,
+                    task_location,
+                    polling_interval=polling_interval,
+                    timeout=timeout,
+                    timer=timer,
+                )
+                timer.mark("completion")
+
+            # Get the conversation data
+            data = await self._fetch_conversation_async(
+                session, conversation_id, timer
+            )
+            timer.mark("fetch")
+
+            if "messages" not in data:
+                raise Exception("No messages found in the conversation data.")
+        except Exception as error:
+            timer.record(self.metrics, self.model_name, error)
+            raise
+        timer.record(self.metrics, self.model_name)
 
         # Check if the response contains the expected data
-        return data["messages"][-1]["text"]
+        return {
+            "text": data["messages"][-1]["text"],
+            "conversation_id": conversation_id,
+            "message_count": len(data["messages"]),
+            **poll_stats,
+            "timings": timer.timings(),
+        }
 
-    async def generate_async(
+    @staticmethod
+    def _next_delta(emitted: str, text: Optional[str], final: bool) -> str:
+        """Return the part of `text` that was not streamed yet.
+
+        Partial texts that do not extend what was already streamed are
+        skipped; for the final text the delta starts after the common prefix.
+        """
+        if not text:
+            return ""
+        if text.startswith(emitted):
+            return text[len(emitted):]
+        if final:
+            return text[len(os.path.commonprefix([emitted, text])):]
+        return ""
+
+    def generate_stream(
         self,
         user_prompt: str,
         system_prompt: Optional[str] = None,
-    ) -> str:
-        """Generate a response from the Inetum GenAI Hub asynchronously.
+        polling_interval: Optional[float] = None,
+        timeout: int = DEFAULT_CONFIG["timeout"],
+        poll_conversation: bool = True,
+        conversation_id: Optional[str] = None,
+        previous_messages: int = 0,
+        timer: Optional[GenerationTimer] = None,
+        **kwargs,
+    ) -> Iterator[str]:
+        """Stream a response from the Inetum GenAI Hub.
+
+        While the task is running, the conversation is fetched at every poll
+        and the new text of the answer is yielded as soon as it grows. When
+        the Hub exposes no partial text, the whole answer is yielded at once
+        on completion.
+
+        The settings of the agent and a slot of the concurrency window are
+        held while the task runs, including while a partial text is being
+        consumed. They are released as soon as the task completes, before the
+        rest of the answer is yielded, and when the generator is closed
+        early (`close()`, or garbage collection of an abandoned stream).
 
         Args:
             user_prompt (str): the user prompt
             system_prompt (Optional[str], optional): system prompt. Defaults to None.
-
-        Raises:
-            Exception: _description_
-            Exception: _description_
-            Exception: _description_
-            Exception: _description_
-
-        Returns:
-            str: _description_
+            polling_interval (Optional[float], optional): fixed polling interval,
+                overrides the polling strategy. Defaults to None.
+            poll_conversation (bool, optional): fetch the conversation while the
+                task is running. Defaults to True.
+            conversation_id (Optional[str], optional): Hub conversation to
+                continue, a new one is started when None. Defaults to None.
+            previous_messages (int, optional): number of messages already in
+                the continued conversation. Defaults to 0.
+            timer (Optional[GenerationTimer], optional): records the phase
+                timings of the stream, to be read once it is exhausted. A new
+                one is used when None. Defaults to None.
+
+        Yields:
+            str: the text deltas of the answer
         """
 
-        # Generate a new conversation ID
-        conversation_id = str(uuid.uuid4())
+        self._ensure_initialized()
 
-        payload = {
-            "conversationId": conversation_id,
-            "inputText": user_prompt,
-        }
+        payload = self._new_payload(user_prompt, system_prompt, conversation_id)
+        conversation_id = payload["conversationId"]
+        if timer is None:
+            timer = GenerationTimer()
 
-        if system_prompt:
-            payload["userPrompt"] = system_prompt
+        try:
+            with self._hold_settings(), self.concurrency_limiter.slot():
+                timer.mark("queue")
+                task_location = self._submit(payload, timer)
+                timer.mark("submit")
 
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.post(
-                self.base_url + "/Chat",
-                json=payload,
-            ) as res:
-                if res.status != 202:
-                    raise Exception(f"Error sending message: {await res.text()}")
+                strategy = self._polling_strategy(polling_interval)
+                delays = strategy.delays(self.model_name)
+                start_time = time.time()
+                emitted = delta = ""
 
-                task_location = res.headers.get("Location")
+                while True:
+                    elapsed_time = time.time() - start_time
 
-                if not task_location:
-                    raise Exception("No task location found in the response headers.")
+                    if elapsed_time > timeout:
+                        raise Exception("Timeout waiting for response.")
 
-                # Wait for the response
-                await self.wait_for_response_async(session, task_location)
-
-                # Get the conversation data
-                async with session.get(
-                    self.base_url + f"/Chat/{conversation_id}"
-                ) as res:
-                    if res.status != 200:
-                        raise Exception(
-                            f"Error getting conversation data: {await res.text()}"
+                    done = self._check_task(task_location, timer)
+                    if done:
+                        timer.mark("completion")
+
+                    if done or poll_conversation:
+                        data = self._fetch_conversation(conversation_id, timer)
+                        if done:
+                            timer.mark("fetch")
+                        delta = self._next_delta(
+                            emitted, self._answer_text(data, previous_messages), done
                         )
-                    data = await res.json()
+                        if done:
+                            strategy.record(self.model_name, time.time() - start_time)
+                            break
+                        if delta:
+                            emitted += delta
+                            yield delta
+
+                    time.sleep(min(next(delays), max(timeout - elapsed_time, 0)))
+        except Exception as error:
+            timer.record(self.metrics, self.model_name, error)
+            raise
+        timer.record(self.metrics, self.model_name)
+
+        # Out of the settings group and the window, the task is complete
+        if delta:
+            yield delta
+
+    async def generate_stream_async(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str] = None,
+        polling_interval: Optional[float] = None,
+        timeout: int = DEFAULT_CONFIG["timeout"],
+        poll_conversation: bool = True,
+        conversation_id: Optional[str] = None,
+        previous_messages: int = 0,
+        timer: Optional[GenerationTimer] = None,
+        **kwargs,
+    ) -> AsyncIterator[str]:
+        """Asynchronous counterpart of `generate_stream`."""
+
+        await self._ensure_initialized_async()
 
-                    if "messages" not in data:
-                        raise Exception("No messages found in the conversation data.")
+        payload = self._new_payload(user_prompt, system_prompt, conversation_id)
+        conversation_id = payload["conversationId"]
 
-                    # Check if the response contains the expected data
-                    return data["messages"][-1]["text"]
+        session = self._get_async_session()
+        if timer is None:
+            timer = GenerationTimer()
+
+        try:
+            async with (
+                self._hold_settings_async(),
+                self.concurrency_limiter.slot_async(),
+            ):
+                timer.mark("queue")
+                task_location = await self._submit_async(session, payload, timer)
+                timer.mark("submit")
+
+                strategy = self._polling_strategy(polling_interval)
+                delays = strategy.delays(self.model_name)
+                start_time = time.time()
+                emitted = delta = ""
+
+                while True:
+                    elapsed_time = time.time() - start_time
+
+                    if elapsed_time > timeout:
+                        raise Exception("Timeout waiting for response.")
+
+                    done = await self._check_task_async(session, task_location, timer)
+                    if done:
+                        timer.mark("completion")
+
+                    if done or poll_conversation:
+                        data = await self._fetch_conversation_async(
+                            session, conversation_id, timer
+                        )
+                        if done:
+                            timer.mark("fetch")
+                        delta = self._next_delta(
+                            emitted, self._answer_text(data, previous_messages), done
+                        )
+                        if done:
+                            strategy.record(self.model_name, time.time() - start_time)
+                            break
+                        if delta:
+                            emitted += delta
+                            yield delta
+
+                    await asyncio.sleep(
+                        min(next(delays), max(timeout - elapsed_time, 0))
+                    )
+        except Exception as error:
+            timer.record(self.metrics, self.model_name, error)
+            raise
+        timer.record(self.metrics, self.model_name)
+
+        # Out of the settings group and the window, the task is complete
+        if delta:
+            yield delta
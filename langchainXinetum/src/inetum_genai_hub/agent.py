@@ -1,10 +1,27 @@
 from typing import Literal, Optional, Union
 
-from src.inetum_genai_hub.base import BaseAgent, Model
+from src.concurrency import AdaptiveConcurrencyLimiter
+from src.inetum_genai_hub.auth import TokenManager
+from src.inetum_genai_hub.base import BaseAgent
+from src.inetum_genai_hub.conversation import Conversation
+from src.interfaces import InetumGenerationModel
+from src.polling import PollingStrategy
+from src.retry import CircuitBreaker, RetryPolicy
 
 
 class AIAgent(BaseAgent):
-    def __init__(self, agent_id: str, org_id: str, model: Optional[Model] = None, temperature: float = 0.16):
+    def __init__(
+        self,
+        agent_id: str,
+        org_id: str,
+        model: Optional[InetumGenerationModel] = None,
+        temperature: float = 0.16,
+        polling_strategy: Optional[PollingStrategy] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        token_manager: Optional[TokenManager] = None,
+    ):
 
         if not agent_id:
             raise ValueError("Agent ID is required")
@@ -12,7 +29,17 @@ class AIAgent(BaseAgent):
         if not org_id:
             raise ValueError("Organization ID is required")
 
-        super().__init__(agent_id, org_id, model, temperature)
+        super().__init__(
+            agent_id,
+            org_id,
+            model,
+            temperature,
+            polling_strategy,
+            concurrency_limiter,
+            retry_policy,
+            circuit_breaker,
+            token_manager,
+        )
 
     def create_agent(self, name: str):
         raise NotImplementedError(
@@ -80,20 +107,52 @@ class AIAgent(BaseAgent):
         data = self._get_conversation(conversation_id)
         return data["data"]
 
+    def open_conversation(self) -> Conversation:
+        """Open a new conversation that can chat concurrently with the others."""
+        return Conversation(self)
+
     def chat(
         self,
         user_prompt: str,
         system_prompt: Optional[str] = None,
         new_conversation: bool = False,
+        conversation_id: Optional[str] = None,
     ) -> Union[str, None]:
-
-        res = self._send_message(user_prompt, system_prompt, new_conversation)
-        
-        task_location = res["headers"]["Location"]
-        task_succeeded = self._wait_for_anwser(task_location)
+        """Send a message and return the answer, None if the task failed.
+
+        Without `conversation_id`, the message goes to the agent's current
+        conversation. Use `open_conversation` or a `ConversationPool` to chat
+        from several threads.
+        """
+
+        if new_conversation:
+            self._create_conversation()
+
+        # The current conversation may be switched by another thread meanwhile
+        conversation_id = conversation_id or self.conversation_uuid
+
+        with self._hold_settings(), self.concurrency_limiter.slot():
+            res = self._call_hub(
+                self._send_message,
+                202,
+                "Error sending message",
+                user_prompt,
+                system_prompt,
+                False,
+                conversation_id,
+                idempotent=False,
+            )
+
+            task_location = res["headers"]["Location"]
+            task_succeeded = self._wait_for_anwser(task_location)
 
         if task_succeeded:
-            data = self._get_conversation(self.conversation_uuid)["data"]
+            data = self._call_hub(
+                self._get_conversation,
+                200,
+                "Error getting conversation data",
+                conversation_id,
+            )["data"]
             return data["messages"][-1]["text"]
 
         return None
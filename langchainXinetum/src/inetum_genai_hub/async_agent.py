@@ -0,0 +1,447 @@
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Literal, Optional
+
+import aiohttp
+
+from src.concurrency import AdaptiveConcurrencyLimiter, get_concurrency_limiter
+from src.config import DEFAULT_CONFIG
+from src.inetum_genai_hub.auth import TokenManager
+from src.inetum_genai_hub.base import BaseAgent, ResponseDict
+from src.interfaces import InetumGenerationModel
+from src.polling import ExponentialBackoffPolling, PollingStrategy, PollStats
+from src.retry import CircuitBreaker, RetryPolicy, get_circuit_breaker
+from src.scheduler import get_settings_scheduler, settings_key
+from src.utils.env import load_env
+
+
+class AsyncAIAgent:
+    """Asynchronous counterpart of `AIAgent`, built on an aiohttp session.
+
+    Instances are created with the awaitable `create` factory, which logs in
+    and fetches the agent settings without blocking the event loop. Several
+    agents can share one session (and its connection pool) and one
+    `TokenManager`, so a single process can drive many conversations.
+
+        agent = await AsyncAIAgent.create(agent_id, org_id, model="inetum-gpt4o")
+        answer = await agent.chat("Bonjour")
+        await agent.aclose()
+
+    Use `create`, not the constructor, which does no request.
+    """
+
+    def __init__(
+        self,
+        agent_id: str,
+        org_id: str,
+        base_url: str,
+        session: aiohttp.ClientSession,
+        token_manager: TokenManager,
+        model: Optional[InetumGenerationModel] = None,
+        polling_strategy: Optional[PollingStrategy] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        owns_session: bool = False,
+        owns_token_manager: bool = False,
+    ):
+        self.agent_id = agent_id
+        self.organization_id = org_id
+        self.base_url = base_url
+        self.session = session
+        self.token_manager = token_manager
+        self.model_name = model
+        self.polling_strategy = polling_strategy or ExponentialBackoffPolling()
+        self.concurrency_limiter = concurrency_limiter or get_concurrency_limiter(
+            base_url
+        )
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker(base_url)
+        self.last_poll_stats: Optional[PollStats] = None
+
+        self.conversation_uuid = str(uuid.uuid4())  # Create a default conversation
+        self.agent_settings: Dict[str, Any] = {}
+        self._desired_settings: Dict[str, Any] = {}
+        self._owns_session = owns_session
+        self._owns_token_manager = owns_token_manager
+
+    @classmethod
+    async def create(
+        cls,
+        agent_id: str,
+        org_id: str,
+        model: Optional[InetumGenerationModel] = None,
+        temperature: float = 0.16,
+        polling_strategy: Optional[PollingStrategy] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        token_manager: Optional[TokenManager] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+    ) -> "AsyncAIAgent":
+        """Log in, fetch the agent settings and resolve the model.
+
+        Args:
+            agent_id (str): id of the agent.
+            org_id (str): id of the organization of the agent.
+            model (Optional[InetumGenerationModel]): generation model used by
+                the chats, the agent's current one when None.
+            token_manager (Optional[TokenManager]): tokens shared with other
+                agents of the account, not closed by `aclose`. A new one is
+                created when None.
+            session (Optional[aiohttp.ClientSession]): session shared with
+                other agents, not closed by `aclose`. A new one is created
+                when None.
+
+        Returns:
+            AsyncAIAgent: the initialized agent.
+        """
+        if not agent_id:
+            raise ValueError("Agent ID is required")
+
+        if not org_id:
+            raise ValueError("Organization ID is required")
+
+        load_env()
+        base_url = os.environ["HUB_URL"]
+
+        owns_token_manager = token_manager is None
+        if token_manager is None:
+            token_manager = TokenManager(
+                base_url,
+                {
+                    "username": os.environ["AUTH_USERNAME"],
+                    "password": os.environ["AUTH_PASSWORD"],
+                    "agentId": agent_id,
+                    "organizationId": org_id,
+                },
+            )
+
+        owns_session = session is None
+        if session is None:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=DEFAULT_CONFIG["async_pool_limit"],
+                    limit_per_host=DEFAULT_CONFIG["async_pool_limit_per_host"],
+                    ttl_dns_cache=DEFAULT_CONFIG["dns_cache_ttl"],
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=DEFAULT_CONFIG["connect_timeout"],
+                    sock_read=DEFAULT_CONFIG["read_timeout"],
+                ),
+            )
+
+        agent = cls(
+            agent_id,
+            org_id,
+            base_url,
+            session,
+            token_manager,
+            model=model,
+            polling_strategy=polling_strategy,
+            concurrency_limiter=concurrency_limiter,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            owns_session=owns_session,
+            owns_token_manager=owns_token_manager,
+        )
+
+        try:
+            await agent._initialize(temperature)
+        except BaseException:
+            await agent.aclose()
+            raise
+
+        return agent
+
+    async def _initialize(self, temperature: float) -> None:
+        # Logs in unless already done, a single login for the agents created
+        # concurrently on a shared manager
+        await self.token_manager.token_async()
+
+        settings = await self._get_settings()
+
+        if settings["status"] == 200:
+            self.agent_settings = BaseAgent._agent_settings(
+                settings["data"], temperature
+            )
+
+        if self.model_name:
+            await self._set_model(self.model_name)
+
+    async def _set_model(self, model_name: InetumGenerationModel) -> None:
+        res = await self._get_agent()
+        model_id = BaseAgent._model_id(res["data"], model_name)
+
+        # Same scheduler as the synchronous agents, see `BaseAgent`
+        self._desired_settings = {"generationModelId": model_id}
+        self._settings_key = settings_key(self._desired_settings)
+        self.scheduler = get_settings_scheduler(
+            self.base_url, self.agent_settings["id"]
+        )
+
+        if self.agent_settings.get("generationModelId") == model_id:
+            self.scheduler.observe(self._settings_key)
+
+    async def _apply_settings(self) -> None:
+        settings = {**self.agent_settings, **self._desired_settings}
+        res = await self._update_settings(settings)
+
+        if res["status"] != 200:
+            raise Exception(f"Error updating settings: {res['data']}")
+
+        self.agent_settings = settings
+
+    @asynccontextmanager
+    async def _hold_settings(self) -> AsyncIterator[None]:
+        """Run a chat under this agent's model."""
+        if not self._desired_settings:
+            yield
+            return
+
+        async with self.scheduler.hold_async(self._settings_key, self._apply_settings):
+            yield
+
+    async def aclose(self) -> None:
+        """Close the aiohttp session and token manager owned by this agent."""
+        if self._owns_token_manager:
+            self.token_manager.close()
+        if self._owns_session and not self.session.closed:
+            await self.session.close()
+
+    async def __aenter__(self) -> "AsyncAIAgent":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _request(
+        self, method: str, url: str, json: Optional[dict] = None
+    ) -> ResponseDict:
+        """Send a request with the access token, refreshed once after a 401."""
+        token = await self.token_manager.token_async()
+
+        for attempt in range(2):
+            async with self.session.request(
+                method,
+                url,
+                json=json,
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "Content-Type": "application/json",
+                },
+            ) as res:
+                text = await res.text()
+                if res.status == 401 and attempt == 0:
+                    # Only the first caller rejected with this token refreshes
+                    # it, the others wait for the new one
+                    token = await self.token_manager.refresh_async(token)
+                    continue
+
+                return {
+                    "data": await res.json(content_type=None) if text else None,
+                    "status": res.status,
+                    "headers": res.headers,
+                }
+
+    async def _call_hub(
+        self,
+        method: str,
+        url: str,
+        expected: int,
+        message: str,
+        json: Optional[dict] = None,
+        idempotent: bool = True,
+    ) -> ResponseDict:
+        """Send a request under the retry policy and circuit breaker."""
+
+        async def attempt() -> ResponseDict:
+            res = await self._request(method, url, json)
+            BaseAgent._raise_for_status(res, expected, message)
+            return res
+
+        return await self.retry_policy.call_async(
+            attempt,
+            idempotent=idempotent,
+            breaker=self.circuit_breaker,
+            on_retry=self.concurrency_limiter.report,
+        )
+
+    async def _get_agent(self) -> ResponseDict:
+        return await self._request("GET", self.base_url + f"/agent/{self.agent_id}")
+
+    async def _get_settings(self) -> ResponseDict:
+        return await self._request(
+            "GET", self.base_url + "/settings/get-agent-settings"
+        )
+
+    async def _update_settings(self, settings: dict) -> ResponseDict:
+        return await self._request(
+            "PUT",
+            self.base_url + f"/settings/{self.agent_settings['id']}",
+            json=settings,
+        )
+
+    async def _get_prompt(self, id: str) -> ResponseDict:
+        return await self._request("GET", self.base_url + f"/prompt/{id}")
+
+    def create_agent(self, name: str):
+        raise NotImplementedError(
+            "You cannot create agent while being logged in an agent"
+        )
+
+    def get_agents(self):
+        raise NotImplementedError(
+            "You cannot get agents while being logged in an agent"
+        )
+
+    async def get_current_prompt(self):
+        if not self.agent_settings["defaultPromptId"]:
+            return None
+
+        res = await self._get_prompt(self.agent_settings["defaultPromptId"])
+        return res["data"]
+
+    async def create_prompt(
+        self,
+        name: str,
+        text: str,
+        group: str = "Default",
+        type: Literal["System", "User"] = "System",
+    ):
+        if not name:
+            raise ValueError("Prompt name is required")
+
+        if not text:
+            raise ValueError("Prompt text is required")
+
+        if type not in ["System", "User"]:
+            raise ValueError("Invalid prompt type")
+
+        payload = {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "text": text,
+            "group": group,
+            "promptType": type,
+        }
+
+        res = await self._request("POST", self.base_url + "/prompt", json=payload)
+        return res["data"]
+
+    async def update_prompt(
+        self, prompt_id: str, name: str, text: str, group: str, type: str
+    ):
+        return await self._request(
+            "PUT",
+            self.base_url + f"/prompt/{prompt_id}",
+            json={"name": name, "text": text, "group": group, "promptType": type},
+        )
+
+    async def get_prompt(self, prompt_id: str):
+        return (await self._get_prompt(prompt_id))["data"]
+
+    async def get_prompts(self):
+        return (await self._request("GET", self.base_url + "/prompt"))["data"]
+
+    async def assign_prompt(self, prompt_id: str):
+        # Check if the prompt exists
+        prompt = await self.get_prompt(prompt_id)
+
+        self.agent_settings["defaultPromptId"] = prompt["id"]
+
+        await self._update_settings(self.agent_settings)
+
+    async def get_agent(self):
+        return (await self._get_agent())["data"]
+
+    async def get_settings(self):
+        return (await self._get_settings())["data"]
+
+    async def update_settings(self, settings: dict):
+        return await self._update_settings(settings)
+
+    def create_conversation(self):
+        self.conversation_uuid = str(uuid.uuid4())
+
+    async def get_conversation(self, conversation_id: Optional[str] = None):
+        res = await self._request(
+            "GET",
+            self.base_url + f"/Chat/{conversation_id or self.conversation_uuid}",
+        )
+        return res["data"]
+
+    async def _wait_for_answer(self, task_location: str) -> bool:
+        delays = self.polling_strategy.delays(self.model_name)
+        start_time = time.time()
+        polls = 0
+        waited = 0.0
+        last_delay = 0.0
+
+        while True:
+            res = await self._call_hub(
+                "GET", task_location, 200, "Error checking task status"
+            )
+            polls += 1
+            status = res["data"]["status"]
+            if status in ("Failed", "Succeeded"):
+                break
+
+            last_delay = next(delays)
+            await asyncio.sleep(last_delay)
+            waited += last_delay
+
+        self.last_poll_stats = {
+            "polls": polls,
+            "poll_wait_seconds": waited,
+            "wasted_wait_seconds": last_delay,
+        }
+
+        if status == "Failed":
+            return False
+
+        self.polling_strategy.record(self.model_name, time.time() - start_time)
+        return True
+
+    async def chat(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str] = None,
+        new_conversation: bool = False,
+        conversation_id: Optional[str] = None,
+    ) -> Optional[str]:
+        if new_conversation:
+            self.create_conversation()
+
+        # Concurrent chats of one agent may switch its conversation, keep ours
+        conversation_id = conversation_id or self.conversation_uuid
+
+        payload = {"conversationId": conversation_id, "inputText": user_prompt}
+        if system_prompt:
+            payload["userPrompt"] = system_prompt
+
+        async with self._hold_settings(), self.concurrency_limiter.slot_async():
+            res = await self._call_hub(
+                "POST",
+                self.base_url + "/Chat",
+                202,
+                "Error sending message",
+                json=payload,
+                idempotent=False,
+            )
+
+            task_succeeded = await self._wait_for_answer(res["headers"]["Location"])
+
+        if task_succeeded:
+            res = await self._call_hub(
+                "GET",
+                self.base_url + f"/Chat/{conversation_id}",
+                200,
+                "Error getting conversation data",
+            )
+            return res["data"]["messages"][-1]["text"]
+
+        return None
@@ -0,0 +1,219 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+from src.config import DEFAULT_CONFIG
+
+
+def jwt_expiry(token: Optional[str]) -> Optional[float]:
+    """Expiry (epoch seconds) of a JWT, None if it is not a JWT or has no `exp`.
+
+    The signature is not checked, the Hub does it; the expiry is only used
+    to refresh the token before the Hub rejects it.
+    """
+    if not token:
+        return None
+
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+
+    try:
+        payload = base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4))
+        exp = json.loads(payload).get("exp")
+    except (ValueError, AttributeError):
+        return None
+
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+class TokenManager:
+    """Access and refresh tokens of a Hub account, kept valid for every thread.
+
+    The access token is refreshed in the background `refresh_margin` seconds
+    before its expiry (read from the JWT `exp` claim). Concurrent refreshes
+    are coalesced: a single `/account/refresh-token` call is in flight and
+    the other callers wait for its result. A refresh only happens when the
+    token the caller saw rejected is still the current one, so a burst of
+    401s after an expiry triggers one refresh. The first login goes through
+    the same single flight, and so does a new login when the refresh token
+    is rejected too.
+
+    Args:
+        base_url (str): URL of the Hub.
+        credentials (Dict[str, str]): payload of `/account/login`.
+        refresh_margin (float): seconds before the expiry at which the
+            token is refreshed.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        credentials: Dict[str, str],
+        refresh_margin: float = DEFAULT_CONFIG["token_refresh_margin"],
+    ):
+        self.base_url = base_url
+        self.refresh_margin = refresh_margin
+        self._credentials = credentials
+
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.expires_at: Optional[float] = None
+
+        self._condition = threading.Condition()
+        self._refreshing = False
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+
+    def login(self) -> str:
+        """Log in with the credentials and return the new access token."""
+        res = requests.post(self.base_url + "/account/login", json=self._credentials)
+        if res.status_code != 200:
+            raise Exception(f"Error logging in: {res.status_code} - {res.text}")
+
+        return self.set_tokens(res.json())
+
+    @property
+    def credentials(self) -> Dict[str, str]:
+        return dict(self._credentials)
+
+    def set_tokens(self, data: dict) -> str:
+        """Store the tokens of a login made by the caller, return the access token."""
+        with self._condition:
+            self._set_tokens(data)
+            return self.access_token
+
+    def _set_tokens(self, data: dict) -> None:
+        """Store new tokens and schedule their refresh. Hold the condition."""
+        self.access_token = data.get("accessToken")
+        self.refresh_token = data.get("refreshToken") or self.refresh_token
+        self.expires_at = jwt_expiry(self.access_token)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if self._closed or self.expires_at is None:
+            return
+
+        delay = max(self.expires_at - self.refresh_margin - time.time(), 0.0)
+        self._timer = threading.Timer(
+            delay, self._refresh_in_background, args=(self.access_token,)
+        )
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh_in_background(self, token: Optional[str]) -> None:
+        try:
+            self.refresh(token)
+        except Exception:
+            # The token is still valid for `refresh_margin` seconds, callers
+            # retry the refresh themselves if it lapses
+            pass
+
+    def _request_tokens(self) -> dict:
+        """New tokens from the refresh token, or from a new login."""
+        if self.refresh_token:
+            try:
+                res = requests.post(
+                    self.base_url + "/account/refresh-token",
+                    json={
+                        "accessToken": self.access_token,
+                        "refreshToken": self.refresh_token,
+                    },
+                )
+                if res.status_code == 200:
+                    data = res.json()
+                    if data.get("accessToken"):
+                        return data
+            except (requests.RequestException, ValueError):
+                pass
+
+        res = requests.post(self.base_url + "/account/login", json=self._credentials)
+        if res.status_code != 200:
+            raise Exception(f"Error logging in: {res.status_code} - {res.text}")
+        return res.json()
+
+    def refresh(self, stale_token: Optional[str] = None) -> str:
+        """Refresh the access token, once for all concurrent callers.
+
+        Args:
+            stale_token: the token that was rejected or is about to expire,
+                the current one when None. Nothing is refreshed if it was
+                already replaced.
+
+        Returns:
+            str: the new access token.
+        """
+        with self._condition:
+            if stale_token is None:
+                stale_token = self.access_token
+
+        return self._replace(stale_token)
+
+    def _replace(self, stale_token: Optional[str]) -> str:
+        """Replace `stale_token` (None: no token yet), once for all callers."""
+        with self._condition:
+            while self._refreshing:
+                self._condition.wait()
+
+            if self.access_token != stale_token:
+                # Refreshed by someone else meanwhile
+                return self.access_token
+
+            self._refreshing = True
+
+        try:
+            data = self._request_tokens()
+        except BaseException:
+            with self._condition:
+                self._refreshing = False
+                self._condition.notify_all()
+            raise
+
+        with self._condition:
+            self._set_tokens(data)
+            self._refreshing = False
+            self._condition.notify_all()
+            return self.access_token
+
+    def token(self) -> str:
+        """Return a valid access token, refreshing it first if it expired."""
+        with self._condition:
+            token, expires_at = self.access_token, self.expires_at
+
+        # No token yet (first login), or the background refresh did not
+        # happen in time
+        if token is None or (expires_at is not None and time.time() >= expires_at):
+            return self._replace(token)
+
+        return token
+
+    async def token_async(self) -> str:
+        """Asynchronous counterpart of `token`, only leaves the loop to refresh."""
+        with self._condition:
+            token, expires_at = self.access_token, self.expires_at
+
+        if token is None or (expires_at is not None and time.time() >= expires_at):
+            return await asyncio.to_thread(self.token)
+
+        return token
+
+    async def refresh_async(self, stale_token: Optional[str] = None) -> str:
+        """Asynchronous counterpart of `refresh`, shares its single flight."""
+        return await asyncio.to_thread(self.refresh, stale_token)
+
+    def close(self) -> None:
+        """Stop the background refresh."""
+        with self._condition:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
@@ -1,3 +1,5 @@
+from contextlib import nullcontext
+import logging
 import os
 import time
 from typing import Any, Dict, Literal, Optional, TypedDict
@@ -5,7 +7,20 @@ import uuid
 import requests
 from requests import Response
 
-from interfaces import InetumGenerationModel
+from src.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    HubHTTPError,
+    get_concurrency_limiter,
+    parse_retry_after,
+)
+from src.inetum_genai_hub.auth import TokenManager
+from src.interfaces import InetumGenerationModel
+from src.polling import ExponentialBackoffPolling, PollingStrategy, PollStats
+from src.retry import CircuitBreaker, RetryPolicy, get_circuit_breaker
+from src.scheduler import get_settings_scheduler, settings_key
+from src.utils.env import load_env
+
+logger = logging.getLogger(__name__)
 
 
 class ResponseDict(TypedDict):
@@ -16,13 +31,12 @@ class ResponseDict(TypedDict):
 
 def ai_operation(func):
     def wrapper(self, *args, **kwargs) -> ResponseDict:
+        token = self.token_manager.token()
         response = func(self, *args, **kwargs)
         if response.status_code == 401:
-            tokens = self.refresh_tokens()
-
-            setattr(self, "access_token", tokens["accessToken"])
-            setattr(self, "refresh_token", tokens["refreshToken"])
-            self.headers["Authorization"] = f"Bearer {self.access_token}"
+            # Only the first caller rejected with this token refreshes it,
+            # the others wait for the new one
+            self.token_manager.refresh(token)
             # Retry the request with the new token
             response = func(self, *args, **kwargs)
 
@@ -44,71 +58,84 @@ class BaseAgent:
         org_id: Optional[str],
         model: Optional[InetumGenerationModel] = None,
         temperature: float = 0.16,
+        polling_strategy: Optional[PollingStrategy] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        token_manager: Optional[TokenManager] = None,
     ):
         self.agent_id = agent_id
         self.organization_id = org_id
+        self.model_name = model
+        self.polling_strategy = polling_strategy or ExponentialBackoffPolling()
+        self.last_poll_stats: Optional[PollStats] = None
+        self._desired_settings: Dict[str, Any] = {}
 
         self.conversation_uuid = str(uuid.uuid4())  # Create a default conversation
         self.agent_settings = {}
+        load_env()
         self.base_url = os.environ["HUB_URL"]
+        self.concurrency_limiter = concurrency_limiter or get_concurrency_limiter(
+            self.base_url
+        )
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker(self.base_url)
 
-        payload = {
-            "username": os.environ["AUTH_USERNAME"],
-            "password": os.environ["AUTH_PASSWORD"],
-        }
-
-        if agent_id and org_id:
-            payload["agentId"] = agent_id
-            payload["organizationId"] = org_id
+        # The tokens are refreshed before they expire, see `TokenManager`.
+        # A manager given by the caller may be shared with other agents of
+        # the same account.
+        if token_manager is None:
+            payload = {
+                "username": os.environ["AUTH_USERNAME"],
+                "password": os.environ["AUTH_PASSWORD"],
+            }
 
-        res = requests.post(self.base_url + "/account/login", json=payload)
-        data = res.json()
+            if agent_id and org_id:
+                payload["agentId"] = agent_id
+                payload["organizationId"] = org_id
 
-        self.access_token = data.get("accessToken")
-        self.refresh_token = data.get("refreshToken")
+            token_manager = TokenManager(self.base_url, payload)
 
-        self.headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json",
-        }
+        self.token_manager = token_manager
+        # Logs in unless the token manager is shared and already logged in
+        self.token_manager.token()
 
         settings = self._get_settings()
 
         if settings["status"] == 200:
-            data = settings["data"]
-            self.agent_settings = {
-                "id": data["id"],
-                "agentId": data["agentId"],
-                "embeddingModelId": data["embeddingModelId"],
-                "generationModelId": data["generationModelId"],
-                "defaultPromptId": data["defaultPromptId"],
-                "defaultPromptFlowId": data["defaultPromptFlowId"],
-                "knowledgeSimilarityThreshold": data["knowledgeSimilarityThreshold"],
-                "maximumKnowledgeItemsForAnswer": data[
-                    "maximumKnowledgeItemsForAnswer"
-                ],
-                "minimumKnowledgeItemsForAnswer": data[
-                    "minimumKnowledgeItemsForAnswer"
-                ],
-                "knowledgePrompt": data["knowledgePrompt"],
-                "knowledgeLimitOverridePrompt": data["knowledgeLimitOverridePrompt"],
-                "numberPreviousMessages": data["numberPreviousMessages"],
-                "generationPromptText": data["generationPromptText"],
-                "generationMaxTokens": data["generationMaxTokens"],
-                "generationTemperature": data["generationTemperature"],
-                "generationTopP": data["generationTopP"],
-                "temperature": temperature,
-            }
+            self.agent_settings = self._agent_settings(settings["data"], temperature)
 
         if model:
             self.__set_model(model)
 
-    def __set_model(self, model_name: InetumGenerationModel):
-        res = self._get_agent()
-        data = res["data"]
+    @staticmethod
+    def _agent_settings(data: dict, temperature: float) -> Dict[str, Any]:
+        """Settings of the agent kept from the Hub answer, sent back on update."""
+        return {
+            "id": data["id"],
+            "agentId": data["agentId"],
+            "embeddingModelId": data["embeddingModelId"],
+            "generationModelId": data["generationModelId"],
+            "defaultPromptId": data["defaultPromptId"],
+            "defaultPromptFlowId": data["defaultPromptFlowId"],
+            "knowledgeSimilarityThreshold": data["knowledgeSimilarityThreshold"],
+            "maximumKnowledgeItemsForAnswer": data["maximumKnowledgeItemsForAnswer"],
+            "minimumKnowledgeItemsForAnswer": data["minimumKnowledgeItemsForAnswer"],
+            "knowledgePrompt": data["knowledgePrompt"],
+            "knowledgeLimitOverridePrompt": data["knowledgeLimitOverridePrompt"],
+            "numberPreviousMessages": data["numberPreviousMessages"],
+            "generationPromptText": data["generationPromptText"],
+            "generationMaxTokens": data["generationMaxTokens"],
+            "generationTemperature": data["generationTemperature"],
+            "generationTopP": data["generationTopP"],
+            "temperature": temperature,
+        }
 
+    @staticmethod
+    def _model_id(agent: dict, model_name: InetumGenerationModel) -> str:
+        """Id of a generation model of the agent, from its name or display name."""
         model_id = None
-        for model in data.get("generationModels", []):
+        for model in agent.get("generationModels", []):
             if (
                 model.get("name") == model_name
                 or model.get("displayName") == model_name
@@ -118,35 +145,74 @@ class BaseAgent:
         if not model_id:
             raise ValueError("Model not found")
 
-        self.agent_settings["generationModelId"] = model_id
-        self._update_settings(self.agent_settings)
+        return model_id
+
+    def __set_model(self, model_name: InetumGenerationModel):
+        res = self._get_agent()
+        model_id = self._model_id(res["data"], model_name)
+
+        # The model is applied by the agent's settings scheduler right before
+        # a chat needs it, so that agents sharing the settings do not race.
+        self._desired_settings = {"generationModelId": model_id}
+        self._settings_key = settings_key(self._desired_settings)
+        self.scheduler = get_settings_scheduler(
+            self.base_url, self.agent_settings["id"]
+        )
+
+        if self.agent_settings.get("generationModelId") == model_id:
+            self.scheduler.observe(self._settings_key)
 
         return
 
+    def _apply_settings(self) -> None:
+        settings = {**self.agent_settings, **self._desired_settings}
+        res = self._update_settings(settings)
+
+        if res["status"] != 200:
+            raise Exception(f"Error updating settings: {res['data']}")
+
+        self.agent_settings = settings
+
+    def _hold_settings(self):
+        """Context manager running a chat under this agent's model."""
+        if not self._desired_settings:
+            return nullcontext()
+        return self.scheduler.hold(self._settings_key, self._apply_settings)
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.token_manager.access_token
+
+    @property
+    def refresh_token(self) -> Optional[str]:
+        return self.token_manager.refresh_token
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.token_manager.token()}",
+            "Content-Type": "application/json",
+        }
+
     def refresh_tokens(self):
         """Refresh the access token.
 
         Returns:
-            bool: operation status
+            dict: the new access and refresh tokens, False on error
         """
 
         try:
-            payload = {
-                "accessToken": self.access_token,
-                "refreshToken": self.refresh_token,
-            }
-
-            res = requests.post(
-                self.base_url + "/account/refresh-token",
-                json=payload,
-            )
-
-            return res.json()
-
+            self.token_manager.refresh()
         except Exception as e:
-            print(f"Error: {e}")
+            logger.error("Error refreshing the tokens: %s", e)
             return False
 
+        return {"accessToken": self.access_token, "refreshToken": self.refresh_token}
+
+    def close(self) -> None:
+        """Stop the background token refresh."""
+        self.token_manager.close()
+
     @ai_operation
     def create_agent(self, name: str) -> Response:
         payload = {"name": name}
@@ -306,12 +372,13 @@ class BaseAgent:
         user_prompt: str,
         system_prompt: Optional[str] = None,
         new_conversation: bool = False,
+        conversation_id: Optional[str] = None,
     ) -> Response:
         if new_conversation:
             self._create_conversation()
 
         payload = {
-            "conversationId": self.conversation_uuid,
+            "conversationId": conversation_id or self.conversation_uuid,
             "inputText": user_prompt,
         }
 
@@ -326,17 +393,72 @@ class BaseAgent:
 
         return res
 
+    @staticmethod
+    def _raise_for_status(res: ResponseDict, expected: int, message: str) -> None:
+        if res["status"] != expected:
+            raise HubHTTPError(
+                f"{message}: {res['data']}",
+                res["status"],
+                parse_retry_after(res["headers"].get("Retry-After")),
+            )
+
+    def _call_hub(
+        self,
+        operation,
+        expected: int,
+        message: str,
+        *args,
+        idempotent: bool = True,
+    ) -> ResponseDict:
+        """Run a Hub operation under the retry policy and circuit breaker."""
+
+        def attempt() -> ResponseDict:
+            res = operation(*args)
+            self._raise_for_status(res, expected, message)
+            return res
+
+        return self.retry_policy.call(
+            attempt,
+            idempotent=idempotent,
+            breaker=self.circuit_breaker,
+            on_retry=self.concurrency_limiter.report,
+        )
+
     def _wait_for_anwser(self, task_location: str):
-        res = self.__check_task_status(task_location)
+        delays = self.polling_strategy.delays(self.model_name)
+        start_time = time.time()
+        polls = 1
+        waited = 0.0
+        last_delay = 0.0
+
+        res = self._call_hub(
+            self.__check_task_status, 200, "Error checking task status", task_location
+        )
         data = res["data"]
 
         while data["status"] != "Failed" and data["status"] != "Succeeded":
-            res = self.__check_task_status(task_location)
+            last_delay = next(delays)
+            time.sleep(last_delay)
+            waited += last_delay
+
+            res = self._call_hub(
+                self.__check_task_status,
+                200,
+                "Error checking task status",
+                task_location,
+            )
             data = res["data"]
-            time.sleep(0.8)
+            polls += 1
+
+        self.last_poll_stats = {
+            "polls": polls,
+            "poll_wait_seconds": waited,
+            "wasted_wait_seconds": last_delay,
+        }
 
         if data["status"] == "Failed":
-            print("There was an error with the task")
+            logger.error("Task %s failed: %s", task_location, data)
             return False
 
+        self.polling_strategy.record(self.model_name, time.time() - start_time)
         return True
@@ -0,0 +1,123 @@
+import queue
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable, List, Optional
+
+from src.config import DEFAULT_CONFIG
+
+if TYPE_CHECKING:
+    from src.inetum_genai_hub.agent import AIAgent
+
+
+class Conversation:
+    """A Hub conversation of an agent, with its own id and state.
+
+    Several conversations opened from the same agent share its login,
+    settings and connection limits, and chat concurrently. The turns of one
+    conversation are sent one at a time, the Hub answers them in order.
+
+    Args:
+        agent (AIAgent): the logged-in agent.
+        conversation_id (Optional[str]): Hub conversation to continue, a new
+            one is started when None.
+    """
+
+    def __init__(self, agent: "AIAgent", conversation_id: Optional[str] = None):
+        self.agent = agent
+        self.conversation_id = conversation_id or str(uuid.uuid4())
+        self.turns = 0
+        self.last_answer: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def chat(
+        self, user_prompt: str, system_prompt: Optional[str] = None
+    ) -> Optional[str]:
+        """Send a message to this conversation and return the answer."""
+        with self._lock:
+            answer = self.agent.chat(
+                user_prompt, system_prompt, conversation_id=self.conversation_id
+            )
+            self.turns += 1
+            self.last_answer = answer
+            return answer
+
+    def reset(self) -> None:
+        """Continue in a new, empty Hub conversation."""
+        with self._lock:
+            self.conversation_id = str(uuid.uuid4())
+            self.turns = 0
+            self.last_answer = None
+
+    def history(self) -> dict:
+        """The messages of the conversation, as stored by the Hub."""
+        return self.agent.get_conversation(self.conversation_id)
+
+
+class ConversationPool:
+    """Dispatch chats of one agent across a bounded set of conversations.
+
+    Each of the `size` worker threads owns a conversation of the pool while
+    it runs a chat, so no two chats write to the same conversation, and a
+    single login serves every worker.
+
+        with ConversationPool(agent, size=16) as pool:
+            answers = pool.map(prompts)
+
+    Args:
+        agent (AIAgent): the logged-in agent.
+        size (int): number of conversations and worker threads.
+        fresh (bool): start every chat in a new conversation, so that
+            unrelated prompts do not share a context. With False, each
+            conversation accumulates the turns it is given.
+    """
+
+    def __init__(
+        self,
+        agent: "AIAgent",
+        size: int = DEFAULT_CONFIG["conversation_pool_size"],
+        fresh: bool = True,
+    ):
+        self.agent = agent
+        self.fresh = fresh
+        self.conversations = [agent.open_conversation() for _ in range(size)]
+
+        self._idle: "queue.SimpleQueue[Conversation]" = queue.SimpleQueue()
+        for conversation in self.conversations:
+            self._idle.put(conversation)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=size, thread_name_prefix="conversation-pool"
+        )
+
+    def _run(self, user_prompt: str, system_prompt: Optional[str]) -> Optional[str]:
+        # As many conversations as workers, one is always idle here
+        conversation = self._idle.get()
+        try:
+            if self.fresh:
+                conversation.reset()
+            return conversation.chat(user_prompt, system_prompt)
+        finally:
+            self._idle.put(conversation)
+
+    def submit(
+        self, user_prompt: str, system_prompt: Optional[str] = None
+    ) -> "Future[Optional[str]]":
+        """Schedule a chat on the next free conversation."""
+        return self._executor.submit(self._run, user_prompt, system_prompt)
+
+    def map(
+        self, user_prompts: Iterable[str], system_prompt: Optional[str] = None
+    ) -> List[Optional[str]]:
+        """Chat every prompt in parallel and return the answers in order."""
+        futures = [self.submit(prompt, system_prompt) for prompt in user_prompts]
+        return [future.result() for future in futures]
+
+    def close(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "ConversationPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,355 @@
+import bisect
+import math
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple, TypedDict
+
+# Consecutive phases of a generation, their durations add up to the total:
+# waiting for the settings and a concurrency slot, posting the message, until
+# the first status answer, until the completion is detected, fetching the
+# conversation.
+PHASES = ("queue", "submit", "first_poll", "completion", "fetch")
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+METRIC_HELP = {
+    "inetum_generations_total": "Generations sent to the Hub, by outcome.",
+    "inetum_generation_seconds": "Wall clock duration of the generations.",
+    "inetum_generation_phase_seconds": "Duration of each phase of the generations.",
+    "inetum_polls_total": "Task status checks.",
+    "inetum_bytes_sent_total": "Request bytes sent to the Hub.",
+    "inetum_bytes_received_total": "Response bytes received from the Hub.",
+}
+
+Labels = Dict[str, str]
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class GenerationTimings(TypedDict):
+    queue_seconds: float
+    submit_seconds: float
+    first_poll_seconds: float
+    completion_seconds: float
+    fetch_seconds: float
+    total_seconds: float
+    polls: int
+    bytes_sent: int
+    bytes_received: int
+
+
+class GenerationTimer:
+    """Phase breakdown of a single generation.
+
+    The SDK marks the end of each phase (see `PHASES`) as the generation
+    goes; a phase that was not reached lasts 0.
+    """
+
+    def __init__(self):
+        self._start = self._last = time.perf_counter()
+        self._end: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.polls = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def mark(self, phase: str) -> None:
+        """End `phase`, the next one starts now."""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def poll(self) -> None:
+        """Count a status answer, the first one ends the first_poll phase."""
+        self.polls += 1
+        if self.polls == 1:
+            self.mark("first_poll")
+
+    def add_bytes(self, sent: int, received: int) -> None:
+        self.bytes_sent += sent
+        self.bytes_received += received
+
+    def stop(self) -> None:
+        if self._end is None:
+            self._end = time.perf_counter()
+
+    @property
+    def total(self) -> float:
+        return (self._end or time.perf_counter()) - self._start
+
+    def timings(self) -> GenerationTimings:
+        return {
+            "queue_seconds": self.phases.get("queue", 0.0),
+            "submit_seconds": self.phases.get("submit", 0.0),
+            "first_poll_seconds": self.phases.get("first_poll", 0.0),
+            "completion_seconds": self.phases.get("completion", 0.0),
+            "fetch_seconds": self.phases.get("fetch", 0.0),
+            "total_seconds": self.total,
+            "polls": self.polls,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+        }
+
+    def record(
+        self,
+        sink: "MetricsSink",
+        model_name: str,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """Send the generation to `sink`, as a success unless `error` is set."""
+        self.stop()
+        labels = {"model": model_name}
+
+        sink.increment(
+            "inetum_generations_total",
+            labels={**labels, "outcome": "success" if error is None else "error"},
+        )
+        sink.observe("inetum_generation_seconds", self.total, labels)
+        for phase in PHASES:
+            if phase in self.phases:
+                sink.observe(
+                    "inetum_generation_phase_seconds",
+                    self.phases[phase],
+                    {**labels, "phase": phase},
+                )
+        sink.increment("inetum_polls_total", self.polls, labels)
+        sink.increment("inetum_bytes_sent_total", self.bytes_sent, labels)
+        sink.increment("inetum_bytes_received_total", self.bytes_received, labels)
+
+
+class MetricsSink:
+    """Destination of the SDK metrics.
+
+    Subclasses forward counters and observations to a monitoring system.
+    Both methods are no-ops by default.
+    """
+
+    def increment(
+        self, name: str, value: float = 1, labels: Optional[Labels] = None
+    ) -> None:
+        return
+
+    def observe(self, name: str, value: float, labels: Optional[Labels] = None) -> None:
+        return
+
+
+class LabelledMetrics(MetricsSink):
+    """Forward the metrics to `sink` with `labels` added to every series.
+
+    Args:
+        sink (MetricsSink): destination of the metrics.
+        labels (Labels): labels added, e.g. the shard of a sharded client.
+    """
+
+    def __init__(self, sink: MetricsSink, labels: Labels):
+        self.sink = sink
+        self.labels = dict(labels)
+
+    def increment(
+        self, name: str, value: float = 1, labels: Optional[Labels] = None
+    ) -> None:
+        self.sink.increment(name, value, {**(labels or {}), **self.labels})
+
+    def observe(self, name: str, value: float, labels: Optional[Labels] = None) -> None:
+        self.sink.observe(name, value, {**(labels or {}), **self.labels})
+
+
+def _label_key(labels: Optional[Labels]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = [*key, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate like Prometheus' histogram_quantile, interpolating in a bucket."""
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    # Above the last bucket, its bound is the best guess
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class InMemoryMetrics(MetricsSink):
+    """Counters and histograms aggregated in memory.
+
+    `render()` returns them in the Prometheus text format, which can be
+    written for the node_exporter textfile collector (`write_textfile`) or
+    served on an HTTP endpoint (`serve`).
+
+    Args:
+        buckets (Sequence[float]): upper bounds of the histogram buckets.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def increment(
+        self, name: str, value: float = 1, labels: Optional[Labels] = None
+    ) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[Labels] = None) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def counter(self, name: str, labels: Optional[Labels] = None) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def quantile(
+        self, name: str, q: float, labels: Optional[Labels] = None
+    ) -> Optional[float]:
+        """Estimated `q` quantile (0.99 for p99) of a histogram, None if empty.
+
+        The estimate is interpolated inside the bucket holding the quantile,
+        so it is only as precise as the buckets: with the default ones a p99
+        between 1 and 2.5 seconds can be off by most of a second. Compute
+        exact quantiles from the raw durations (`response_metadata["timings"]`
+        or a sink keeping the samples) when they matter.
+        """
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_label_key(labels))
+            return histogram.quantile(q) if histogram else None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """All the metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+            for name, series in sorted(self._histograms.items()):
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    bounds = [*histogram.buckets, math.inf]
+                    for bound, count in zip(bounds, histogram.counts):
+                        cumulative += count
+                        labels = _format_labels(key, [("le", _format_value(bound))])
+                        lines.append(f"{name}_bucket{labels} {cumulative}")
+                    labels = _format_labels(key)
+                    lines.append(f"{name}_sum{labels} {histogram.sum!r}")
+                    lines.append(f"{name}_count{labels} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Atomically write the metrics to a .prom file."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9464) -> "MetricsServer":
+        """Serve the metrics on http://host:port/metrics from a daemon thread."""
+        server = MetricsServer((host, port), self)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    server: "MetricsServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, metrics: InMemoryMetrics):
+        self.metrics = metrics
+        super().__init__(address, _MetricsHandler)
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+# Metrics of every SDK that is not given its own sink
+default_metrics = InMemoryMetrics()
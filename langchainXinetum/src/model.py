@@ -1,21 +1,51 @@
+import asyncio
 import time
-from typing import Any, Dict, Iterator, List, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Literal,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
     CallbackManagerForLLMRun,
 )
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import (
     AIMessage,
+    AIMessageChunk,
     BaseMessage,
 )
 from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
-from pydantic import SecretStr
+from pydantic import PrivateAttr, SecretStr
+import requests
 
 
+from src.cache import BaseResponseCache, response_cache_key
+from src.concurrency import AdaptiveConcurrencyLimiter
 from src.config import DEFAULT_CONFIG
-from src.inetum_agent import InetumSDK
+from src.conversations import ConversationPlan, ConversationTracker
+from src.inetum_agent import GenerationResult, InetumSDK
 from src.interfaces import InetumGenerationModel
+from src.metrics import GenerationTimer, GenerationTimings, MetricsSink
+from src.polling import PollingStrategy
+from src.retry import RetryPolicy
+from src.settings_cache import SettingsCache
+from src.sharding import ShardedInetumSDK
+from src.tokens import (
+    ContextOverflowError,
+    context_size,
+    count_tokens,
+    truncate_to_tokens,
+)
 from src.utils.env import get_env_variable
 
 
@@ -29,11 +59,53 @@ class ChatInetum(BaseChatModel):
         max_tokens: The maximum number of tokens to generate.
         timeout: The timeout for the generation request.
         stop: A list of strings on which the model should stop generating.
-        max_retries: The maximum number of retries for the generation request.
+        max_retries: The maximum number of retries of each Hub call of a
+            generation (see `src.retry.RetryPolicy`).
+        http_session: A pooled HTTP session (see `src.session.create_session`)
+            that can be shared between several ChatInetum instances.
+        max_concurrency: The maximum number of async generations in flight.
+        polling_interval: A fixed interval between two task status checks.
+            When not set, `polling_strategy` schedules the checks.
+        polling_strategy: The poll schedule (see `src.polling`), defaults to
+            an exponential backoff with fast initial probes.
+        stream_poll_conversation: Whether streaming fetches the conversation
+            at every poll to yield partial text, or only once at the end.
+
+    The agent settings are resolved through a `SettingsCache` (in memory by
+    default, optionally persisted to a file). With `lazy_init=True` they are
+    only resolved on the first generation.
+
+    With a `response_cache` (see `src.cache`), identical requests are served
+    from the cache and flagged with `cache_hit` in the response metadata.
+    Pass `bypass_cache=True` to `invoke` to force a new generation.
+
+    Token usage is counted with tiktoken when installed (`src.tokens`), with
+    an estimate otherwise. `context_overflow` checks the prompt against the
+    model context before any request: "ignore" sends it anyway, "raise"
+    raises `ContextOverflowError` and "truncate" drops the oldest part of
+    the conversation. Up to half of the context is kept for the answer
+    (`max_tokens`).
+
+    With `reuse_conversation=True`, a history that extends a previous call's
+    history and answer continues the same Hub conversation and only sends its
+    new messages. The whole history is sent to a new conversation when it
+    diverges, or when the Hub would not keep it in context
+    (`numberPreviousMessages` of the agent settings).
+
+    The response metadata of a generation holds its `timings`: the duration
+    of each phase (queue, submit, first_poll, completion, fetch), the number
+    of polls and the bytes exchanged. They are also aggregated in `metrics`
+    (see `src.metrics`), `src.metrics.default_metrics` when not given.
+
+    With several API keys (a list, or comma separated in
+    INETUM_GENAI_API_KEY), the generations are spread over their agents by a
+    `ShardedInetumSDK` (see `src.sharding`). A prebuilt SDK, sharded or
+    not, can also be given as `inetum_api`.
     """
 
-    inetum_api: Optional[InetumSDK] = None
-    polling_interval: float = DEFAULT_CONFIG["polling_interval"]
+    inetum_api: Optional[Union[InetumSDK, ShardedInetumSDK]] = None
+    polling_interval: Optional[float] = None
+    polling_strategy: Optional[PollingStrategy] = None
 
     model_name: InetumGenerationModel = DEFAULT_CONFIG["model_name"]
 
@@ -46,21 +118,51 @@ class ChatInetum(BaseChatModel):
     timeout: int = DEFAULT_CONFIG["timeout"]
     max_retries: int = 2
 
+    http_session: Optional[requests.Session] = None
+    max_concurrency: int = DEFAULT_CONFIG["max_concurrency"]
+    stream_poll_conversation: bool = True
+    response_cache: Optional[BaseResponseCache] = None
+    context_overflow: Literal["ignore", "raise", "truncate"] = "ignore"
+    reuse_conversation: bool = False
+
+    _semaphore: Optional[asyncio.Semaphore] = PrivateAttr(default=None)
+    _semaphore_loop: Optional[asyncio.AbstractEventLoop] = PrivateAttr(default=None)
+    _conversations: ConversationTracker = PrivateAttr(
+        default_factory=ConversationTracker
+    )
+
     def __init__(
         self,
-        api_key: Optional[SecretStr] = None,
+        api_key: Optional[Union[SecretStr, Sequence[SecretStr]]] = None,
         api_url: Optional[str] = None,
         polling_interval: Optional[float] = None,
+        polling_strategy: Optional[PollingStrategy] = None,
         model_name: InetumGenerationModel = DEFAULT_CONFIG["model_name"],
         temperature: Optional[float] = 0.16,
         max_tokens: Optional[int] = 16_000,
         top_p: Optional[float] = None,
+        http_session: Optional[requests.Session] = None,
+        max_concurrency: int = DEFAULT_CONFIG["max_concurrency"],
+        stream_poll_conversation: bool = True,
+        lazy_init: bool = False,
+        settings_cache: Optional[SettingsCache] = None,
+        response_cache: Optional[BaseResponseCache] = None,
+        context_overflow: Literal["ignore", "raise", "truncate"] = "ignore",
+        reuse_conversation: bool = False,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        max_retries: int = 2,
+        retry_policy: Optional[RetryPolicy] = None,
+        metrics: Optional[MetricsSink] = None,
+        inetum_api: Optional[Union[InetumSDK, ShardedInetumSDK]] = None,
         **kwargs: Any,
     ):
         super().__init__()
 
-        if api_key is None:
-            api_key = SecretStr(get_env_variable("INETUM_GENAI_API_KEY"))
+        if api_key is None and inetum_api is None:
+            keys = get_env_variable("INETUM_GENAI_API_KEY").split(",")
+            api_key = [SecretStr(key.strip()) for key in keys if key.strip()]
+            if len(api_key) == 1:
+                api_key = api_key[0]
 
         if api_url is None:
             api_url = DEFAULT_CONFIG["api_url"]
@@ -70,20 +172,236 @@ class ChatInetum(BaseChatModel):
         self.temperature = temperature
         self.top_p = top_p
 
-        self.polling_interval = polling_interval or DEFAULT_CONFIG["polling_interval"]
+        self.polling_interval = polling_interval
+        self.polling_strategy = polling_strategy
         self.timeout = kwargs.get("timeout", DEFAULT_CONFIG["timeout"])
 
-        self.max_tokens = max_tokens or DEFAULT_CONFIG["max_retries"]
+        self.max_tokens = max_tokens
+        self.max_retries = max_retries
         self.stop = kwargs.get("stop", None)
-        
-        self.inetum_api = InetumSDK(
-            api_key=api_key,
+        self.http_session = http_session
+        self.max_concurrency = max_concurrency
+        self.stream_poll_conversation = stream_poll_conversation
+        self.response_cache = response_cache
+        self.context_overflow = context_overflow
+        self.reuse_conversation = reuse_conversation
+
+        if inetum_api is not None:
+            self.inetum_api = inetum_api
+            return
+
+        sdk_kwargs = dict(
             base_url=api_url,
             model=model_name,
             temperature=temperature,
             top_p=top_p,
             max_tokens=max_tokens,
+            session=http_session,
+            connect_timeout=kwargs.get(
+                "connect_timeout", DEFAULT_CONFIG["connect_timeout"]
+            ),
+            read_timeout=kwargs.get("read_timeout", DEFAULT_CONFIG["read_timeout"]),
+            polling_strategy=polling_strategy,
+            settings_cache=settings_cache,
+            lazy_init=lazy_init,
+            retry_policy=retry_policy or RetryPolicy(max_retries=max_retries),
+            metrics=metrics,
+        )
+
+        if isinstance(api_key, SecretStr):
+            self.inetum_api = InetumSDK(
+                api_key=api_key,
+                concurrency_limiter=concurrency_limiter,
+                **sdk_kwargs,
+            )
+        else:
+            # Each shard gets its own concurrency window and circuit breaker
+            if concurrency_limiter is not None:
+                raise ValueError(
+                    "concurrency_limiter cannot be used with several API keys, "
+                    "each agent has its own concurrency window."
+                )
+            self.inetum_api = ShardedInetumSDK.from_api_keys(
+                api_key, **sdk_kwargs
+            )
+
+    def _build_prompt(
+        self, messages: List[BaseMessage]
+    ) -> Tuple[str, Optional[str]]:
+        """Flatten the messages into the user prompt and system prompt sent to the Hub."""
+        system_prompt = None
+        turns: List[str] = []
+
+        for message in messages:
+            if message.type == "system":
+                system_prompt = str(message.content)
+            else:
+                turns.append(f"{message.type}: {message.content}\n---\n")
+
+        user_prompt = ""
+        if turns:
+            user_prompt = "".join(turns)
+        else:
+            user_prompt = str(messages[0].content)
+
+        return user_prompt, system_prompt
+
+    def _claim_conversation(
+        self, messages: List[BaseMessage], user_prompt: str
+    ) -> Tuple[Optional[ConversationPlan], str]:
+        """Return the Hub conversation to continue and the prompt to send to it."""
+        if not self.reuse_conversation:
+            return None, user_prompt
+
+        plan = self._conversations.claim(messages)
+        if plan is None:
+            return None, user_prompt
+
+        # The limit of the agent holding the conversation, once its settings
+        # are resolved (they are not yet with `lazy_init`)
+        limit = self.inetum_api.previous_messages_limit(plan["conversation_id"])
+        return self._continue_conversation(messages, user_prompt, plan, limit)
+
+    async def _aclaim_conversation(
+        self, messages: List[BaseMessage], user_prompt: str
+    ) -> Tuple[Optional[ConversationPlan], str]:
+        """Asynchronous counterpart of `_claim_conversation`."""
+        if not self.reuse_conversation:
+            return None, user_prompt
+
+        plan = self._conversations.claim(messages)
+        if plan is None:
+            return None, user_prompt
+
+        limit = await self.inetum_api.previous_messages_limit_async(
+            plan["conversation_id"]
+        )
+        return self._continue_conversation(messages, user_prompt, plan, limit)
+
+    def _continue_conversation(
+        self,
+        messages: List[BaseMessage],
+        user_prompt: str,
+        plan: ConversationPlan,
+        limit: Optional[int],
+    ) -> Tuple[Optional[ConversationPlan], str]:
+        # A longer conversation would not be fully in the model context
+        if limit is not None and plan["hub_messages"] > limit:
+            return None, user_prompt
+
+        return plan, self._build_prompt(messages[plan["start"] :])[0]
+
+    def _record_conversation(
+        self,
+        messages: List[BaseMessage],
+        text: str,
+        conversation_id: Optional[str],
+        hub_messages: int,
+    ) -> None:
+        if self.reuse_conversation and conversation_id:
+            self._conversations.record(
+                messages, AIMessage(content=text), conversation_id, hub_messages
+            )
+
+    def _prompt_budget(self) -> Optional[int]:
+        """Tokens available to the prompt, None when the context is unknown."""
+        size = context_size(self.model_name)
+        if size is None:
+            return None
+        return size - min(self.max_tokens or 0, size // 2)
+
+    def _prepare_prompt(
+        self, messages: List[BaseMessage]
+    ) -> Tuple[str, Optional[str]]:
+        """Build the prompts and enforce `context_overflow` before any request."""
+        user_prompt, system_prompt = self._build_prompt(messages)
+
+        budget = self._prompt_budget()
+        if self.context_overflow == "ignore" or budget is None:
+            return user_prompt, system_prompt
+
+        system_tokens = count_tokens(system_prompt or "", self.model_name)
+        prompt_tokens = system_tokens + count_tokens(user_prompt, self.model_name)
+        if prompt_tokens <= budget:
+            return user_prompt, system_prompt
+
+        if self.context_overflow == "raise" or system_tokens >= budget:
+            raise ContextOverflowError(prompt_tokens, budget, self.model_name)
+
+        return (
+            truncate_to_tokens(user_prompt, budget - system_tokens, self.model_name),
+            system_prompt,
+        )
+
+    def _usage(
+        self, user_prompt: str, system_prompt: Optional[str], response_text: str
+    ) -> Dict[str, int]:
+        """Token usage of the prompts sent to the Hub and of the answer."""
+        input_tokens = count_tokens(user_prompt, self.model_name) + count_tokens(
+            system_prompt or "", self.model_name
         )
+        output_tokens = count_tokens(response_text, self.model_name)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _build_result(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str],
+        result: GenerationResult,
+        generation_time: float,
+        cache_hit: bool = False,
+    ) -> ChatResult:
+        response_text = result["text"]
+
+        message = AIMessage(
+            content=response_text,
+            additional_kwargs={},  # Used to add additional payload to the message
+            response_metadata={  # Use for response metadataversation_id
+                "time_in_seconds": generation_time,
+                "model_name": self.model_name,
+                "conversation_id": result["conversation_id"],
+                "polls": result["polls"],
+                "poll_wait_seconds": result["poll_wait_seconds"],
+                "wasted_wait_seconds": result["wasted_wait_seconds"],
+                "timings": result["timings"],
+                "cache_hit": cache_hit,
+            },
+            usage_metadata=self._usage(user_prompt, system_prompt, response_text),
+        )
+
+        generation = ChatGeneration(message=message)
+        return ChatResult(generations=[generation])
+
+    def _cache_key(
+        self, user_prompt: str, system_prompt: Optional[str]
+    ) -> Optional[str]:
+        if self.response_cache is None:
+            return None
+
+        return response_cache_key(
+            user_prompt,
+            system_prompt,
+            self.model_name,
+            self.temperature,
+            self.top_p,
+            self.max_tokens,
+        )
+
+    @staticmethod
+    def _cached_generation(text: str) -> GenerationResult:
+        return {
+            "text": text,
+            "conversation_id": None,
+            "message_count": 0,
+            "polls": 0,
+            "poll_wait_seconds": 0.0,
+            "wasted_wait_seconds": 0.0,
+            "timings": None,
+        }
 
     def _generate(
         self,
@@ -108,59 +426,136 @@ class ChatInetum(BaseChatModel):
         if not self.inetum_api:
             raise ValueError("InetumSDK instance could not be initialized.")
 
-        system_prompt = None
-        conversation: str = ""
-
-        for message in messages:
-            if message.type == "system":
-                system_prompt = str(message.content)
-            else:
-                conversation += f"{message.type}: {message.content}\n---\n"
+        bypass_cache = kwargs.pop("bypass_cache", False)
 
         # Call the hub API to get the response
-        user_prompt = ""
-        if len(conversation) > 0:
-            user_prompt = conversation
-        else:
-            user_prompt = str(messages[0].content)
+        user_prompt, system_prompt = self._prepare_prompt(messages)
+        cache_key = self._cache_key(user_prompt, system_prompt)
 
         start_time = time.time()
 
+        if cache_key and not bypass_cache:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return self._build_result(
+                    user_prompt,
+                    system_prompt,
+                    self._cached_generation(cached),
+                    time.time() - start_time,
+                    cache_hit=True,
+                )
+
+        plan, sent_prompt = self._claim_conversation(messages, user_prompt)
+
         # Call the Inetum API to generate a response
-        response_text = self.inetum_api.generate(
-            user_prompt,
+        result = self.inetum_api.generate_with_metadata(
+            sent_prompt,
             system_prompt,
             timeout=self.timeout,
             stop=stop,
             polling_interval=self.polling_interval,
+            conversation_id=plan["conversation_id"] if plan else None,
             **kwargs,
         )
 
         generation_time = time.time() - start_time
 
-        last_message = messages[-1]
-        tokens = last_message.content
+        if cache_key:
+            self.response_cache.set(cache_key, result["text"])
 
-        # Count the number of tokens in the input and output
-        ct_input_tokens = sum(len(message.content) for message in messages)
-        ct_output_tokens = len(tokens)
+        self._record_conversation(
+            messages,
+            result["text"],
+            result["conversation_id"],
+            result["message_count"],
+        )
 
-        message = AIMessage(
-            content=response_text,
-            additional_kwargs={},  # Used to add additional payload to the message
-            response_metadata={  # Use for response metadataversation_id
-                "time_in_seconds": generation_time,
-                "model_name": self.model_name,
-            },
-            usage_metadata={
-                "input_tokens": ct_input_tokens,
-                "output_tokens": ct_output_tokens,
-                "total_tokens": ct_input_tokens + ct_output_tokens,
-            },
+        return self._build_result(
+            sent_prompt, system_prompt, result, generation_time
         )
 
-        generation = ChatGeneration(message=message)
-        return ChatResult(generations=[generation])
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Return the max-in-flight semaphore of the running event loop."""
+        loop = asyncio.get_running_loop()
+
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+
+        return self._semaphore
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Native async generation through the SDK's aiohttp session.
+
+        At most `max_concurrency` generations of this model are in flight on
+        the event loop at once, the others wait on a semaphore.
+
+        Args:
+            messages: the prompt composed of a list of messages.
+            stop: a list of strings on which the model should stop generating.
+            run_manager: A run manager with callbacks for the LLM.
+        """
+
+        if not self.inetum_api:
+            raise ValueError("InetumSDK instance could not be initialized.")
+
+        bypass_cache = kwargs.pop("bypass_cache", False)
+
+        user_prompt, system_prompt = self._prepare_prompt(messages)
+        cache_key = self._cache_key(user_prompt, system_prompt)
+
+        if cache_key and not bypass_cache:
+            start_time = time.time()
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return self._build_result(
+                    user_prompt,
+                    system_prompt,
+                    self._cached_generation(cached),
+                    time.time() - start_time,
+                    cache_hit=True,
+                )
+
+        async with self._get_semaphore():
+            start_time = time.time()
+            plan, sent_prompt = await self._aclaim_conversation(messages, user_prompt)
+
+            result = await self.inetum_api.generate_with_metadata_async(
+                sent_prompt,
+                system_prompt,
+                timeout=self.timeout,
+                stop=stop,
+                polling_interval=self.polling_interval,
+                conversation_id=plan["conversation_id"] if plan else None,
+                **kwargs,
+            )
+
+            generation_time = time.time() - start_time
+
+        if cache_key:
+            self.response_cache.set(cache_key, result["text"])
+
+        self._record_conversation(
+            messages,
+            result["text"],
+            result["conversation_id"],
+            result["message_count"],
+        )
+
+        return self._build_result(
+            sent_prompt, system_prompt, result, generation_time
+        )
+
+    async def aclose(self) -> None:
+        """Release the async HTTP resources of the underlying SDK."""
+        if self.inetum_api:
+            await self.inetum_api.aclose()
 
     def _stream(
         self,
@@ -169,8 +564,193 @@ class ChatInetum(BaseChatModel):
         run_manager: Optional[CallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> Iterator[ChatGenerationChunk]:
-        """Override the _stream method to implement the chat model logic."""
-        raise NotImplementedError("Streaming is not supported yet.")
+        """Stream the answer by polling the conversation while the task runs.
+
+        Yields one chunk per text delta observed on the Hub, or a single
+        chunk with the whole answer when no partial text is available.
+        """
+
+        if not self.inetum_api:
+            raise ValueError("InetumSDK instance could not be initialized.")
+
+        bypass_cache = kwargs.pop("bypass_cache", False)
+
+        user_prompt, system_prompt = self._prepare_prompt(messages)
+        cache_key = self._cache_key(user_prompt, system_prompt)
+
+        start_time = time.time()
+
+        cached = None
+        if cache_key and not bypass_cache:
+            cached = self.response_cache.get(cache_key)
+
+        plan: Optional[ConversationPlan] = None
+        sent_prompt = user_prompt
+        timer: Optional[GenerationTimer] = None
+        if cached is not None:
+            deltas: Iterable[str] = [cached]
+        else:
+            plan, sent_prompt = self._claim_conversation(messages, user_prompt)
+            conversation_id = (
+                plan["conversation_id"]
+                if plan
+                else self.inetum_api.new_conversation_id()
+            )
+            timer = GenerationTimer()
+            deltas = self.inetum_api.generate_stream(
+                sent_prompt,
+                system_prompt,
+                timeout=self.timeout,
+                stop=stop,
+                polling_interval=self.polling_interval,
+                poll_conversation=self.stream_poll_conversation,
+                conversation_id=conversation_id,
+                previous_messages=plan["hub_messages"] if plan else 0,
+                timer=timer,
+                **kwargs,
+            )
+
+        text = ""
+        for delta in deltas:
+            text += delta
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=delta))
+            if run_manager:
+                run_manager.on_llm_new_token(delta, chunk=chunk)
+            yield chunk
+
+        if cache_key and cached is None:
+            self.response_cache.set(cache_key, text)
+
+        if cached is None:
+            # The turn adds its input and its answer to the conversation
+            self._record_conversation(
+                messages,
+                text,
+                conversation_id,
+                (plan["hub_messages"] if plan else 0) + 2,
+            )
+
+        yield self._final_chunk(
+            sent_prompt,
+            system_prompt,
+            text,
+            time.time() - start_time,
+            cache_hit=cached is not None,
+            conversation_id=conversation_id if cached is None else None,
+            timings=timer.timings() if timer else None,
+        )
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Asynchronous counterpart of `_stream`."""
+
+        if not self.inetum_api:
+            raise ValueError("InetumSDK instance could not be initialized.")
+
+        bypass_cache = kwargs.pop("bypass_cache", False)
+
+        user_prompt, system_prompt = self._prepare_prompt(messages)
+        cache_key = self._cache_key(user_prompt, system_prompt)
+
+        if cache_key and not bypass_cache:
+            start_time = time.time()
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=cached))
+                if run_manager:
+                    await run_manager.on_llm_new_token(cached, chunk=chunk)
+                yield chunk
+                yield self._final_chunk(
+                    user_prompt,
+                    system_prompt,
+                    cached,
+                    time.time() - start_time,
+                    cache_hit=True,
+                )
+                return
+
+        async with self._get_semaphore():
+            start_time = time.time()
+            text = ""
+            plan, sent_prompt = await self._aclaim_conversation(messages, user_prompt)
+            conversation_id = (
+                plan["conversation_id"]
+                if plan
+                else self.inetum_api.new_conversation_id()
+            )
+
+            timer = GenerationTimer()
+            async for delta in self.inetum_api.generate_stream_async(
+                sent_prompt,
+                system_prompt,
+                timeout=self.timeout,
+                stop=stop,
+                polling_interval=self.polling_interval,
+                poll_conversation=self.stream_poll_conversation,
+                conversation_id=conversation_id,
+                previous_messages=plan["hub_messages"] if plan else 0,
+                timer=timer,
+                **kwargs,
+            ):
+                text += delta
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=delta))
+                if run_manager:
+                    await run_manager.on_llm_new_token(delta, chunk=chunk)
+                yield chunk
+
+            if cache_key:
+                self.response_cache.set(cache_key, text)
+
+            self._record_conversation(
+                messages,
+                text,
+                conversation_id,
+                (plan["hub_messages"] if plan else 0) + 2,
+            )
+
+            yield self._final_chunk(
+                sent_prompt,
+                system_prompt,
+                text,
+                time.time() - start_time,
+                conversation_id=conversation_id,
+                timings=timer.timings(),
+            )
+
+    def _final_chunk(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str],
+        text: str,
+        generation_time: float,
+        cache_hit: bool = False,
+        conversation_id: Optional[str] = None,
+        timings: Optional[GenerationTimings] = None,
+    ) -> ChatGenerationChunk:
+        """Empty closing chunk carrying the response metadata and usage.
+
+        The metadata matches the one of `invoke`, but for the poll waits
+        that streaming does not measure.
+        """
+        return ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="",
+                usage_metadata=self._usage(user_prompt, system_prompt, text),
+                response_metadata={
+                    "time_in_seconds": generation_time,
+                    "model_name": self.model_name,
+                    "conversation_id": conversation_id,
+                    "polls": timings["polls"] if timings else 0,
+                    "timings": timings,
+                    "cache_hit": cache_hit,
+                },
+            )
+        )
 
     @property
     def _llm_type(self) -> str:
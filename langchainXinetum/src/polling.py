@@ -0,0 +1,129 @@
+import random
+import statistics
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterator, Optional, TypedDict
+
+from src.config import DEFAULT_CONFIG
+
+
+class PollStats(TypedDict):
+    polls: int
+    poll_wait_seconds: float
+    # Upper bound of the time lost between task completion and its detection:
+    # the task finished somewhere during the last sleep.
+    wasted_wait_seconds: float
+
+
+class PollingStrategy:
+    """Schedule of the delays between two polls of a Hub task.
+
+    Subclasses yield the successive delays (in seconds) to sleep between
+    status checks. The first check is always made right after submission.
+    """
+
+    def delays(self, model_name: Optional[str] = None) -> Iterator[float]:
+        raise NotImplementedError
+
+    def record(self, model_name: Optional[str], completion_time: float) -> None:
+        """Record how long a task took to complete. No-op by default."""
+        return
+
+
+class FixedPolling(PollingStrategy):
+    """Poll at a constant interval (the historical behaviour)."""
+
+    def __init__(self, interval: float = DEFAULT_CONFIG["polling_interval"]):
+        self.interval = interval
+
+    def delays(self, model_name: Optional[str] = None) -> Iterator[float]:
+        while True:
+            yield self.interval
+
+
+class ExponentialBackoffPolling(PollingStrategy):
+    """Fast initial probes followed by an exponential backoff with jitter.
+
+    Args:
+        initial_interval (float): delay of the fast initial probes.
+        fast_probes (int): number of probes made at `initial_interval`.
+        factor (float): multiplier applied to the delay after the fast probes.
+        max_interval (float): cap of the delay.
+        jitter (float): relative jitter, 0.1 means +/- 10%.
+    """
+
+    def __init__(
+        self,
+        initial_interval: float = DEFAULT_CONFIG["initial_polling_interval"],
+        fast_probes: int = 3,
+        factor: float = DEFAULT_CONFIG["polling_backoff_factor"],
+        max_interval: float = DEFAULT_CONFIG["max_polling_interval"],
+        jitter: float = DEFAULT_CONFIG["polling_jitter"],
+    ):
+        self.initial_interval = initial_interval
+        self.fast_probes = fast_probes
+        self.factor = factor
+        self.max_interval = max_interval
+        self.jitter = jitter
+
+    def _jittered(self, delay: float) -> float:
+        if not self.jitter:
+            return delay
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _backoff(self) -> Iterator[float]:
+        for _ in range(self.fast_probes):
+            yield self._jittered(self.initial_interval)
+
+        delay = self.initial_interval
+        while True:
+            delay = min(delay * self.factor, self.max_interval)
+            yield self._jittered(delay)
+
+    def delays(self, model_name: Optional[str] = None) -> Iterator[float]:
+        return self._backoff()
+
+
+class AdaptivePolling(ExponentialBackoffPolling):
+    """Exponential backoff that learns the expected completion time per model.
+
+    The first sleep lasts a fraction of the median completion time of the
+    last `history_size` tasks of the model, then the usual fast probes and
+    backoff take over. Instances are thread-safe and can be shared between
+    several SDKs so that they learn from the same history.
+
+    Args:
+        history_size (int): number of completion times kept per model.
+        head_start (float): fraction of the expected completion time slept
+            before the first probe.
+        **kwargs: see ExponentialBackoffPolling.
+    """
+
+    def __init__(self, history_size: int = 20, head_start: float = 0.8, **kwargs):
+        super().__init__(**kwargs)
+        self.head_start = head_start
+        self.history_size = history_size
+        self._history: Dict[Optional[str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def expected_completion_time(self, model_name: Optional[str]) -> Optional[float]:
+        with self._lock:
+            history = self._history.get(model_name)
+            if not history:
+                return None
+            return statistics.median(history)
+
+    def record(self, model_name: Optional[str], completion_time: float) -> None:
+        with self._lock:
+            history = self._history.setdefault(
+                model_name, deque(maxlen=self.history_size)
+            )
+            history.append(completion_time)
+
+    def delays(self, model_name: Optional[str] = None) -> Iterator[float]:
+        expected = self.expected_completion_time(model_name)
+
+        if expected is not None and expected * self.head_start > self.initial_interval:
+            yield expected * self.head_start
+
+        yield from self._backoff()
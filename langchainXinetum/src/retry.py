@@ -0,0 +1,285 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Literal, Optional, TypeVar
+
+import requests
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from src.concurrency import HubHTTPError, is_connection_error
+from src.config import DEFAULT_CONFIG
+
+T = TypeVar("T")
+
+# Answers telling that the request was not processed and can be sent again
+RETRYABLE_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+NOT_PROCESSED_STATUSES = (425, 429, 503)
+
+
+class CircuitOpenError(Exception):
+    """Raised without any request while the Hub is considered down.
+
+    Args:
+        retry_after (float): seconds until the next probe is allowed.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            f"The Inetum GenAI Hub is unavailable, retry in {retry_after:.1f}s"
+        )
+        self.retry_after = retry_after
+
+
+def is_outage_error(error: BaseException) -> bool:
+    """Whether an error means the Hub is down, rather than busy or refusing."""
+    if isinstance(error, HubHTTPError):
+        return error.status_code is not None and error.status_code >= 500
+    return is_connection_error(error)
+
+
+def is_connect_failure(error: BaseException) -> bool:
+    """Whether a request failed before it was sent, while connecting."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+
+    if isinstance(error, requests.ConnectionError):
+        # requests wraps the urllib3 error, itself wrapped in a MaxRetryError
+        reason = error.args[0] if error.args else None
+        reason = getattr(reason, "reason", reason)
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+    return type(error).__name__ == "ClientConnectorError"
+
+
+class CircuitBreaker:
+    """Fail fast while the Hub is down.
+
+    After `failure_threshold` consecutive outage errors (5xx, connection
+    errors, timeouts) the circuit opens and every call fails immediately
+    with `CircuitOpenError`. After `reset_timeout` a single probe is let
+    through (half-open): its success closes the circuit, its failure opens
+    it again.
+
+    Args:
+        failure_threshold (int): consecutive failures opening the circuit.
+        reset_timeout (float): seconds the circuit stays open.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_CONFIG["circuit_failure_threshold"],
+        reset_timeout: float = DEFAULT_CONFIG["circuit_reset_timeout"],
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> Literal["closed", "open", "half-open"]:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return "open"
+            return "half-open"
+
+    def before_call(self) -> None:
+        """Raise `CircuitOpenError` if the call must not be sent."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(remaining)
+
+            # Half-open, a single probe at a time
+            if self._probing:
+                raise CircuitOpenError(self.reset_timeout)
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release(self) -> None:
+        """Forget a call that was cancelled, whatever its outcome would be."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self, error: BaseException) -> None:
+        with self._lock:
+            if not is_outage_error(error):
+                # The Hub answered, it is up
+                self._failures = 0
+                self._probing = False
+                return
+
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class RetryPolicy:
+    """Retries of the Hub calls with exponential backoff and full jitter.
+
+    Idempotent calls (task status, conversation fetch) are retried on any
+    transient error. Non-idempotent calls (posting a message) are only
+    retried when the Hub certainly did not process them: a 425/429/503
+    answer or a failure to connect.
+
+    Args:
+        max_retries (int): retries after the first attempt.
+        initial_backoff (float): upper bound of the first delay, in seconds.
+        max_backoff (float): upper bound of any delay, in seconds.
+        deadline (Optional[float]): seconds after which a call is not retried
+            anymore, counted from its first attempt. None for no deadline.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = DEFAULT_CONFIG["max_retries"],
+        initial_backoff: float = DEFAULT_CONFIG["retry_initial_backoff"],
+        max_backoff: float = DEFAULT_CONFIG["retry_max_backoff"],
+        deadline: Optional[float] = DEFAULT_CONFIG["retry_deadline"],
+    ):
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+
+    @staticmethod
+    def is_retryable(error: BaseException, idempotent: bool) -> bool:
+        if isinstance(error, HubHTTPError):
+            statuses = RETRYABLE_STATUSES if idempotent else NOT_PROCESSED_STATUSES
+            return error.status_code in statuses
+
+        if idempotent:
+            return is_connection_error(error)
+
+        # The request may have reached the Hub unless the connection failed
+        return is_connect_failure(error)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before the retry number `attempt` (starting at 1)."""
+        delay = random.uniform(
+            0, min(self.max_backoff, self.initial_backoff * 2 ** (attempt - 1))
+        )
+        return max(delay, retry_after or 0.0)
+
+    def _next_delay(
+        self, error: BaseException, attempt: int, idempotent: bool, started: float
+    ) -> Optional[float]:
+        """Delay before retrying after `error`, None to give up."""
+        if attempt > self.max_retries or not self.is_retryable(error, idempotent):
+            return None
+
+        delay = self.backoff(attempt, getattr(error, "retry_after", None))
+        if (
+            self.deadline is not None
+            and time.monotonic() + delay - started > self.deadline
+        ):
+            return None
+        return delay
+
+    def call(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        idempotent: bool = True,
+        breaker: Optional[CircuitBreaker] = None,
+        on_retry: Optional[Callable[[BaseException], None]] = None,
+        **kwargs: Any,
+    ) -> T:
+        """Call `fn`, retrying transient errors.
+
+        Args:
+            fn: the call to make.
+            idempotent: whether `fn` can safely be sent twice.
+            breaker: circuit breaker checked before every attempt.
+            on_retry: called with each error that is retried.
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            if breaker:
+                breaker.before_call()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as error:
+                if breaker:
+                    breaker.record_failure(error)
+                delay = self._next_delay(error, attempt, idempotent, started)
+                if delay is None:
+                    raise
+                if on_retry:
+                    on_retry(error)
+                time.sleep(delay)
+                continue
+            except BaseException:
+                if breaker:
+                    breaker.release()
+                raise
+
+            if breaker:
+                breaker.record_success()
+            return result
+
+    async def call_async(
+        self,
+        fn: Callable[..., Awaitable[T]],
+        *args: Any,
+        idempotent: bool = True,
+        breaker: Optional[CircuitBreaker] = None,
+        on_retry: Optional[Callable[[BaseException], None]] = None,
+        **kwargs: Any,
+    ) -> T:
+        """Asynchronous counterpart of `call`."""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            if breaker:
+                breaker.before_call()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as error:
+                if breaker:
+                    breaker.record_failure(error)
+                delay = self._next_delay(error, attempt, idempotent, started)
+                if delay is None:
+                    raise
+                if on_retry:
+                    on_retry(error)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                if breaker:
+                    breaker.release()
+                raise
+
+            if breaker:
+                breaker.record_success()
+            return result
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(base_url: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker of a Hub."""
+    with _breakers_lock:
+        breaker = _breakers.get(base_url)
+        if breaker is None:
+            breaker = CircuitBreaker()
+            _breakers[base_url] = breaker
+        return breaker
@@ -0,0 +1,247 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+
+def settings_key(settings: dict) -> Tuple:
+    """Hashable key of the effective settings a request needs."""
+    return tuple(sorted(settings.items()))
+
+
+class _Waiter:
+    """A request waiting for its settings group to be scheduled."""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.must_apply = False
+        self.granted = False
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future: asyncio.Future = loop.create_future()
+
+    def grant(self, must_apply: bool) -> None:
+        self.granted = True
+        self.must_apply = must_apply
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve, must_apply)
+
+    def _resolve(self, must_apply: bool) -> None:
+        if not self.future.done():
+            self.future.set_result(must_apply)
+
+
+class SettingsScheduler:
+    """Schedule generations of an agent by effective settings.
+
+    Model, temperature, top_p and max tokens are agent-wide, so a request
+    must only run while its own settings are applied. Requests needing the
+    applied settings run concurrently; requests needing other settings are
+    grouped by settings and wait until the running group drains. Then the
+    oldest waiting group is switched to, with a single settings update, and
+    drained in turn.
+
+    Args:
+        current (Optional[Hashable]): key of the settings known to be applied.
+    """
+
+    def __init__(self, current: Optional[Hashable] = None):
+        self._lock = threading.Lock()
+        self._current = current
+        self._active = 0
+        self._switching_to: Optional[Hashable] = None
+        self._switch_waiters: List[_Waiter] = []
+        self._pending: "OrderedDict[Hashable, List[_Waiter]]" = OrderedDict()
+
+    @property
+    def current(self) -> Optional[Hashable]:
+        return self._current
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(len(waiters) for waiters in self._pending.values()) + len(
+                self._switch_waiters
+            )
+
+    def observe(self, key: Hashable) -> None:
+        """Record settings found on the agent, if nothing is known yet."""
+        with self._lock:
+            if (
+                self._current is None
+                and self._active == 0
+                and self._switching_to is None
+            ):
+                self._current = key
+
+    def _try_acquire(self, key: Hashable, waiter: _Waiter) -> Optional[bool]:
+        """Acquire a slot or enqueue `waiter`. Must be called with the lock held.
+
+        Returns whether the caller must apply the settings, or None when the
+        waiter was enqueued.
+        """
+        if self._switching_to is None and not self._pending:
+            if self._current == key:
+                self._active += 1
+                return False
+
+            if self._active == 0:
+                self._switching_to = key
+                return True
+
+        if self._switching_to == key:
+            self._switch_waiters.append(waiter)
+        else:
+            self._pending.setdefault(key, []).append(waiter)
+        return None
+
+    def _dispatch(self) -> None:
+        """Schedule the oldest pending group. Must be called with the lock held."""
+        if self._active or self._switching_to is not None or not self._pending:
+            return
+
+        key, waiters = self._pending.popitem(last=False)
+
+        if key == self._current:
+            self._active += len(waiters)
+            for waiter in waiters:
+                waiter.grant(False)
+            return
+
+        self._switching_to = key
+        self._switch_waiters = waiters[1:]
+        waiters[0].grant(True)
+
+    def _applied(self, key: Hashable) -> None:
+        with self._lock:
+            self._current = key
+            self._switching_to = None
+            waiters, self._switch_waiters = self._switch_waiters, []
+            self._active += 1 + len(waiters)
+            for waiter in waiters:
+                waiter.grant(False)
+
+    def _apply_failed(self, key: Hashable) -> None:
+        with self._lock:
+            # The agent state is unknown, the next request of the group retries
+            self._current = None
+            self._switching_to = None
+            waiters, self._switch_waiters = self._switch_waiters, []
+            if waiters:
+                self._pending[key] = waiters + self._pending.get(key, [])
+                self._pending.move_to_end(key, last=False)
+            self._dispatch()
+
+    def _release(self) -> None:
+        with self._lock:
+            self._active -= 1
+            self._dispatch()
+
+    def _withdraw(self, key: Hashable, waiter: _Waiter) -> bool:
+        """Remove a waiter that gave up. Returns False if it was already granted."""
+        with self._lock:
+            if waiter.granted:
+                return False
+            if waiter in self._switch_waiters:
+                self._switch_waiters.remove(waiter)
+            elif waiter in self._pending.get(key, []):
+                self._pending[key].remove(waiter)
+                if not self._pending[key]:
+                    del self._pending[key]
+            return True
+
+    @contextmanager
+    def hold(self, key: Hashable, apply: Callable[[], None]) -> Iterator[None]:
+        """Run the body while the settings identified by `key` are applied.
+
+        Args:
+            key (Hashable): key of the settings, see `settings_key`.
+            apply (Callable[[], None]): applies the settings on the agent,
+                called at most once per settings switch.
+        """
+        waiter = _Waiter()
+        with self._lock:
+            must_apply = self._try_acquire(key, waiter)
+
+        if must_apply is None:
+            waiter.event.wait()
+            must_apply = waiter.must_apply
+
+        if must_apply:
+            try:
+                apply()
+            except BaseException:
+                self._apply_failed(key)
+                raise
+            self._applied(key)
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def hold_async(
+        self, key: Hashable, apply: Callable[[], Awaitable[None]]
+    ) -> AsyncIterator[None]:
+        """Asynchronous counterpart of `hold`."""
+        waiter = _Waiter(asyncio.get_running_loop())
+        with self._lock:
+            must_apply = self._try_acquire(key, waiter)
+
+        if must_apply is None:
+            try:
+                must_apply = await waiter.future
+            except asyncio.CancelledError:
+                if not self._withdraw(key, waiter):
+                    # Granted while being cancelled, hand the slot back
+                    if waiter.must_apply:
+                        self._apply_failed(key)
+                    else:
+                        self._release()
+                raise
+
+        if must_apply:
+            try:
+                await apply()
+            except BaseException:
+                self._apply_failed(key)
+                raise
+            self._applied(key)
+
+        try:
+            yield
+        finally:
+            self._release()
+
+
+_schedulers: Dict[Tuple[str, str], SettingsScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_settings_scheduler(base_url: str, settings_id: str) -> SettingsScheduler:
+    """Return the process-wide scheduler of an agent's settings."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get((base_url, settings_id))
+        if scheduler is None:
+            scheduler = SettingsScheduler()
+            _schedulers[(base_url, settings_id)] = scheduler
+        return scheduler
@@ -0,0 +1,50 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.config import DEFAULT_CONFIG
+
+
+def create_session(
+    pool_connections: int = DEFAULT_CONFIG["pool_connections"],
+    pool_maxsize: int = DEFAULT_CONFIG["pool_maxsize"],
+    connection_retries: int = DEFAULT_CONFIG["connection_retries"],
+) -> requests.Session:
+    """Create a pooled keep-alive HTTP session for the Inetum GenAI Hub.
+
+    The session can be shared between several InetumSDK (and so ChatInetum)
+    instances: authentication headers are sent per request, not stored on
+    the session.
+
+    Args:
+        pool_connections (int): number of per-host connection pools to cache.
+        pool_maxsize (int): maximum number of connections kept alive per host.
+        connection_retries (int): retries on connection errors or resets.
+            Read errors are only retried for idempotent methods, so a POST
+            to /Chat is never sent twice once it reached the Hub. Use 0 for
+            a session given to InetumSDK or ChatInetum, whose `RetryPolicy`
+            already retries every call.
+
+    Returns:
+        requests.Session: the configured session.
+    """
+    retries = Retry(
+        total=connection_retries,
+        connect=connection_retries,
+        read=connection_retries,
+        status=0,
+        backoff_factor=0.1,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retries,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
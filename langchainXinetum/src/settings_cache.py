@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, TypedDict
+
+from src.config import DEFAULT_CONFIG
+
+
+class CachedAgent(TypedDict):
+    settings: dict
+    model_ids: Dict[str, str]
+    stored_at: float
+
+
+def settings_cache_key(base_url: str, api_key: str) -> str:
+    """Cache key of an agent, derived without storing the API key itself."""
+    return hashlib.sha256(f"{base_url}\n{api_key}".encode()).hexdigest()
+
+
+class SettingsCache:
+    """Cache of agent settings and model ids used by InetumSDK initialization.
+
+    Entries live in memory and, when `path` is given, in a JSON file so
+    that short-lived processes can start without any round trip.
+
+    Args:
+        path (Optional[str]): JSON file persisting the cache. Defaults to None.
+        ttl (float): seconds after which an entry is refetched.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = DEFAULT_CONFIG["settings_cache_ttl"],
+    ):
+        self.path = path
+        self.ttl = ttl
+        self._entries: Dict[str, CachedAgent] = {}
+        self._loaded = path is None
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                self._entries.update(json.load(file))
+        except (OSError, ValueError):
+            # A missing or corrupted file is just an empty cache
+            pass
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self._entries, file)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str) -> Optional[CachedAgent]:
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            if time.time() - entry["stored_at"] > self.ttl:
+                del self._entries[key]
+                return None
+
+            return {
+                "settings": dict(entry["settings"]),
+                "model_ids": dict(entry["model_ids"]),
+                "stored_at": entry["stored_at"],
+            }
+
+    def set(self, key: str, settings: dict, model_ids: Dict[str, str]) -> None:
+        with self._lock:
+            self._load()
+            self._entries[key] = {
+                "settings": dict(settings),
+                "model_ids": dict(model_ids),
+                "stored_at": time.time(),
+            }
+            self._save()
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._load()
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+
+# Process-wide in-memory cache used when none is given to the SDK
+default_settings_cache = SettingsCache()
@@ -0,0 +1,479 @@
+import bisect
+import hashlib
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterator,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    TypedDict,
+)
+
+from pydantic import SecretStr
+
+from src.concurrency import AdaptiveConcurrencyLimiter
+from src.config import DEFAULT_CONFIG
+from src.inetum_agent import GenerationResult, InetumSDK
+from src.interfaces import InetumGenerationModel
+from src.metrics import LabelledMetrics, MetricsSink, default_metrics
+from src.retry import CircuitBreaker
+from src.settings_cache import settings_cache_key
+
+# Draws of a conversation id per shard before giving up on placing it on the
+# chosen shard. A shard owns about 1/n of the ring, a few draws are enough.
+_MAX_DRAWS_PER_SHARD = 32
+
+
+def _ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class ShardStats(TypedDict):
+    name: str
+    agent_id: Optional[str]
+    health: Literal["healthy", "throttled", "half-open", "open"]
+    active: int
+    window: float
+    load: float
+    generations: int
+    errors: int
+
+
+class _Shard:
+    """An SDK of the sharded client and the generations routed to it."""
+
+    def __init__(self, name: str, sdk: InetumSDK):
+        self.name = name
+        self.sdk = sdk
+        self.active = 0
+        self.generations = 0
+        self.errors = 0
+
+    @property
+    def health(self) -> Literal["healthy", "throttled", "half-open", "open"]:
+        state = self.sdk.circuit_breaker.state
+        if state != "closed":
+            return state
+        if self.sdk.concurrency_limiter.blocked_for > 0:
+            return "throttled"
+        return "healthy"
+
+    @property
+    def load(self) -> float:
+        """Generations in progress per slot of the concurrency window."""
+        return self.active / max(self.sdk.concurrency_limiter.window, 1.0)
+
+
+# Lower is preferred when placing a new conversation
+_HEALTH_RANK = {"healthy": 0, "throttled": 1, "half-open": 2, "open": 3}
+
+
+class HashRing:
+    """Consistent hash ring mapping conversation ids to shard names.
+
+    Each shard is placed `replicas` times on the ring, so adding or removing
+    a shard only moves the conversations of about 1/n of the ring.
+
+    Args:
+        names (Sequence[str]): names of the shards.
+        replicas (int): points of each shard on the ring.
+    """
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        replicas: int = DEFAULT_CONFIG["shard_ring_replicas"],
+    ):
+        points = sorted(
+            (_ring_hash(f"{name}#{replica}"), name)
+            for name in names
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._names = [name for _, name in points]
+
+    def owner(self, key: str) -> str:
+        """Name of the shard owning `key`."""
+        index = bisect.bisect(self._hashes, _ring_hash(key)) % len(self._hashes)
+        return self._names[index]
+
+
+class ShardedInetumSDK:
+    """Spread the generations over several Hub agents (one API key each).
+
+    Every shard is an `InetumSDK` with its own concurrency window and
+    circuit breaker, so the throughput adds up across agents and a
+    throttled or failing agent does not slow down the others.
+
+    Conversations are routed with a consistent hash ring: a Hub conversation
+    lives on one agent, so every turn of a conversation goes to the shard
+    owning its id. A new conversation gets an id owned by the least-loaded
+    healthy shard (closed circuit, no pending `Retry-After`, fewest
+    generations in progress per slot of its window).
+
+    It has the generation interface of `InetumSDK` and can be given to
+    `ChatInetum` as `inetum_api`, or built by `ChatInetum` from a list of
+    API keys.
+
+    Args:
+        sdks (Sequence[InetumSDK]): the shards, one per agent. They should
+            use the same model and generation parameters.
+        names (Optional[Sequence[str]]): stable names of the shards, used
+            on the ring and as the `shard` label of the statistics.
+            Defaults to shard-0, shard-1, ...
+        replicas (int): points of each shard on the ring.
+    """
+
+    def __init__(
+        self,
+        sdks: Sequence[InetumSDK],
+        names: Optional[Sequence[str]] = None,
+        replicas: int = DEFAULT_CONFIG["shard_ring_replicas"],
+    ):
+        if not sdks:
+            raise ValueError("At least one shard is required.")
+
+        names = list(names) if names is not None else [
+            f"shard-{index}" for index in range(len(sdks))
+        ]
+        if len(names) != len(sdks) or len(set(names)) != len(names):
+            raise ValueError("Shard names must be unique, one per SDK.")
+
+        self.shards = [_Shard(name, sdk) for name, sdk in zip(names, sdks)]
+        self._by_name = {shard.name: shard for shard in self.shards}
+        self.ring = HashRing(names, replicas)
+        self._lock = threading.Lock()
+        self._next = 0
+
+    @classmethod
+    def from_api_keys(
+        cls,
+        api_keys: Sequence[SecretStr],
+        base_url: str,
+        model: InetumGenerationModel,
+        temperature: Optional[float],
+        top_p: Optional[float],
+        max_tokens: Optional[int],
+        metrics: Optional[MetricsSink] = None,
+        lazy_init: bool = False,
+        replicas: int = DEFAULT_CONFIG["shard_ring_replicas"],
+        **kwargs: Any,
+    ) -> "ShardedInetumSDK":
+        """Build one shard per API key.
+
+        The shards are named after a hash of their key, so a conversation
+        keeps its shard when keys are added, removed or reordered. Their
+        metrics go to `metrics` (`src.metrics.default_metrics` when not
+        given) with a `shard` label. The agents settings are resolved in
+        parallel unless `lazy_init` is set.
+
+        Args:
+            api_keys (Sequence[SecretStr]): one API key per agent.
+            **kwargs: other `InetumSDK` arguments, shared by every shard.
+        """
+        sink = metrics if metrics is not None else default_metrics
+        names = [
+            settings_cache_key(base_url, key.get_secret_value())[:12]
+            for key in api_keys
+        ]
+
+        sdks = [
+            InetumSDK(
+                api_key=key,
+                base_url=base_url,
+                model=model,
+                temperature=temperature,
+                top_p=top_p,
+                max_tokens=max_tokens,
+                lazy_init=True,
+                concurrency_limiter=AdaptiveConcurrencyLimiter(),
+                circuit_breaker=CircuitBreaker(),
+                metrics=LabelledMetrics(sink, {"shard": name}),
+                **kwargs,
+            )
+            for key, name in zip(api_keys, names)
+        ]
+
+        sharded = cls(sdks, names=names, replicas=replicas)
+        if not lazy_init:
+            sharded.initialize()
+        return sharded
+
+    def initialize(self) -> None:
+        """Resolve the settings of every agent, in parallel."""
+        with ThreadPoolExecutor(max_workers=len(self.shards)) as executor:
+            list(executor.map(lambda shard: shard.sdk.initialize(), self.shards))
+
+    @property
+    def model_name(self) -> InetumGenerationModel:
+        return self.shards[0].sdk.model_name
+
+    @property
+    def settings(self) -> dict:
+        """Settings of the first agent, the shards are expected to match."""
+        return self.shards[0].sdk.settings
+
+    def shard_for(self, conversation_id: str) -> InetumSDK:
+        """SDK of the agent holding a conversation."""
+        return self._by_name[self.ring.owner(conversation_id)].sdk
+
+    def previous_messages_limit(
+        self, conversation_id: Optional[str] = None
+    ) -> Optional[int]:
+        """`numberPreviousMessages` of the agent holding the conversation."""
+        sdk = self.shard_for(conversation_id) if conversation_id else self.shards[0].sdk
+        return sdk.previous_messages_limit()
+
+    async def previous_messages_limit_async(
+        self, conversation_id: Optional[str] = None
+    ) -> Optional[int]:
+        sdk = self.shard_for(conversation_id) if conversation_id else self.shards[0].sdk
+        return await sdk.previous_messages_limit_async()
+
+    def _pick(self) -> _Shard:
+        """Least-loaded shard of the best health. Hold the lock."""
+        count = len(self.shards)
+        start = self._next
+        self._next = (self._next + 1) % count
+
+        # Scanned from a rotating start, so that ties are spread evenly
+        return min(
+            (self.shards[(start + offset) % count] for offset in range(count)),
+            key=lambda shard: (_HEALTH_RANK[shard.health], shard.load),
+        )
+
+    def _draw_id(self, shard: _Shard) -> str:
+        """A new conversation id owned by `shard` on the ring."""
+        for _ in range(_MAX_DRAWS_PER_SHARD * len(self.shards)):
+            conversation_id = str(uuid.uuid4())
+            if self.ring.owner(conversation_id) == shard.name:
+                return conversation_id
+        # Placed elsewhere, it is still routed consistently by the ring
+        return conversation_id
+
+    def new_conversation_id(self) -> str:
+        """Id of a new conversation, placed on the least-loaded healthy shard."""
+        with self._lock:
+            shard = self._pick()
+        return self._draw_id(shard)
+
+    def _acquire(self, conversation_id: Optional[str]) -> Tuple[_Shard, str]:
+        """Shard and id of a generation, counted as in progress on the shard."""
+        with self._lock:
+            if conversation_id is None:
+                shard = self._pick()
+            else:
+                shard = self._by_name[self.ring.owner(conversation_id)]
+            shard.active += 1
+
+        if conversation_id is None:
+            conversation_id = self._draw_id(shard)
+        return shard, conversation_id
+
+    def _release(self, shard: _Shard, error: Optional[BaseException]) -> None:
+        with self._lock:
+            shard.active -= 1
+            shard.generations += 1
+            if error is not None:
+                shard.errors += 1
+
+    def generate(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str] = None,
+        polling_interval: Optional[float] = None,
+        timeout: int = DEFAULT_CONFIG["timeout"],
+        conversation_id: Optional[str] = None,
+        **kwargs,
+    ) -> str:
+        """See `InetumSDK.generate`."""
+        return self.generate_with_metadata(
+            user_prompt,
+            system_prompt,
+            polling_interval=polling_interval,
+            timeout=timeout,
+            conversation_id=conversation_id,
+            **kwargs,
+        )["text"]
+
+    def generate_with_metadata(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str] = None,
+        polling_interval: Optional[float] = None,
+        timeout: int = DEFAULT_CONFIG["timeout"],
+        conversation_id: Optional[str] = None,
+        **kwargs,
+    ) -> GenerationResult:
+        """See `InetumSDK.generate_with_metadata`."""
+        shard, conversation_id = self._acquire(conversation_id)
+        error: Optional[BaseException] = None
+        try:
+            result = shard.sdk.generate_with_metadata(
+                user_prompt,
+                system_prompt,
+                polling_interval=polling_interval,
+                timeout=timeout,
+                conversation_id=conversation_id,
+                **kwargs,
+            )
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self._release(shard, error)
+        return result
+
+    async def generate_async(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str] = None,
+        polling_interval: Optional[float] = None,
+        timeout: int = DEFAULT_CONFIG["timeout"],
+        conversation_id: Optional[str] = None,
+        **kwargs,
+    ) -> str:
+        """See `InetumSDK.generate_async`."""
+        result = await self.generate_with_metadata_async(
+            user_prompt,
+            system_prompt,
+            polling_interval=polling_interval,
+            timeout=timeout,
+            conversation_id=conversation_id,
+            **kwargs,
+        )
+        return result["text"]
+
+    async def generate_with_metadata_async(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str] = None,
+        polling_interval: Optional[float] = None,
+        timeout: int = DEFAULT_CONFIG["timeout"],
+        conversation_id: Optional[str] = None,
+        **kwargs,
+    ) -> GenerationResult:
+        """See `InetumSDK.generate_with_metadata_async`."""
+        shard, conversation_id = self._acquire(conversation_id)
+        error: Optional[BaseException] = None
+        try:
+            result = await shard.sdk.generate_with_metadata_async(
+                user_prompt,
+                system_prompt,
+                polling_interval=polling_interval,
+                timeout=timeout,
+                conversation_id=conversation_id,
+                **kwargs,
+            )
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self._release(shard, error)
+        return result
+
+    def generate_stream(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str] = None,
+        polling_interval: Optional[float] = None,
+        timeout: int = DEFAULT_CONFIG["timeout"],
+        poll_conversation: bool = True,
+        conversation_id: Optional[str] = None,
+        previous_messages: int = 0,
+        **kwargs,
+    ) -> Iterator[str]:
+        """See `InetumSDK.generate_stream`."""
+        shard, conversation_id = self._acquire(conversation_id)
+        error: Optional[BaseException] = None
+        try:
+            yield from shard.sdk.generate_stream(
+                user_prompt,
+                system_prompt,
+                polling_interval=polling_interval,
+                timeout=timeout,
+                poll_conversation=poll_conversation,
+                conversation_id=conversation_id,
+                previous_messages=previous_messages,
+                **kwargs,
+            )
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self._release(shard, error)
+
+    async def generate_stream_async(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str] = None,
+        polling_interval: Optional[float] = None,
+        timeout: int = DEFAULT_CONFIG["timeout"],
+        poll_conversation: bool = True,
+        conversation_id: Optional[str] = None,
+        previous_messages: int = 0,
+        **kwargs,
+    ) -> AsyncIterator[str]:
+        """See `InetumSDK.generate_stream_async`."""
+        shard, conversation_id = self._acquire(conversation_id)
+        error: Optional[BaseException] = None
+        try:
+            async for delta in shard.sdk.generate_stream_async(
+                user_prompt,
+                system_prompt,
+                polling_interval=polling_interval,
+                timeout=timeout,
+                poll_conversation=poll_conversation,
+                conversation_id=conversation_id,
+                previous_messages=previous_messages,
+                **kwargs,
+            ):
+                yield delta
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self._release(shard, error)
+
+    def stats(self) -> List[ShardStats]:
+        """Health, load and generation counts of every shard."""
+        with self._lock:
+            return [
+                {
+                    "name": shard.name,
+                    "agent_id": shard.sdk.agent_id,
+                    "health": shard.health,
+                    "active": shard.active,
+                    "window": shard.sdk.concurrency_limiter.window,
+                    "load": shard.load,
+                    "generations": shard.generations,
+                    "errors": shard.errors,
+                }
+                for shard in self.shards
+            ]
+
+    def close(self) -> None:
+        for shard in self.shards:
+            shard.sdk.close()
+
+    def __enter__(self) -> "ShardedInetumSDK":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    async def aclose(self) -> None:
+        for shard in self.shards:
+            await shard.sdk.aclose()
+
+    async def __aenter__(self) -> "ShardedInetumSDK":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
@@ -0,0 +1,225 @@
+import re
+from typing import TYPE_CHECKING, List, Optional
+
+from src.config import DEFAULT_CONFIG
+from src.tokens import CHARS_PER_TOKEN, count_tokens
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
+MAP_PROMPT = """ resume moi les modifications de cette partie du commit en quelques phrases
+voici mon commit autor, mon commit message et une partie des commit files """
+
+REDUCE_PROMPT = """ regroupe ces resumes partiels d'un meme commit en un seul resume,
+sans perdre de modification importante
+voici mon commit autor, mon commit message et les resumes partiels """
+
+FINAL_PROMPT = """ resume moi ce qui a etait modifier lors du commit en un paragraphe
+voici mon commit autor, mon commit message et mon commit files """
+
+FINAL_REDUCE_PROMPT = """ resume moi ce qui a etait modifier lors du commit en un paragraphe
+voici mon commit autor, mon commit message et les resumes des commit files """
+
+# A hunk header starts every changed block of a unified diff
+HUNK_HEADER = re.compile(r"^@@ ", re.MULTILINE)
+
+
+class CommitSummarizer:
+    """Map-reduce summarization of commits too large for a single prompt.
+
+    The patches of a commit are split by file, then by `@@` hunk (then by
+    line for huge hunks), and packed into chunks of at most `chunk_tokens`.
+    Chunks are summarized in parallel, then the partial summaries are merged
+    by groups of `reduce_fan_in` until they fit in one final prompt. A commit
+    that fits in `chunk_tokens` is summarized with a single request.
+
+    Args:
+        chat (BaseChatModel): the model used for every step, e.g. ChatInetum.
+        chunk_tokens (int): token budget of the commit text of one request.
+        max_concurrency (int): maximum number of chunk summaries in flight.
+        reduce_fan_in (int): maximum number of summaries merged at once.
+        map_prompt (str): prompt summarizing a chunk.
+        reduce_prompt (str): prompt merging partial summaries.
+        final_prompt (str): prompt of a commit summarized in one request.
+        final_reduce_prompt (str): prompt writing the final paragraph from
+            the partial summaries.
+    """
+
+    def __init__(
+        self,
+        chat: "BaseChatModel",
+        chunk_tokens: int = DEFAULT_CONFIG["summary_chunk_tokens"],
+        max_concurrency: int = DEFAULT_CONFIG["summary_max_concurrency"],
+        reduce_fan_in: int = DEFAULT_CONFIG["summary_reduce_fan_in"],
+        map_prompt: str = MAP_PROMPT,
+        reduce_prompt: str = REDUCE_PROMPT,
+        final_prompt: str = FINAL_PROMPT,
+        final_reduce_prompt: str = FINAL_REDUCE_PROMPT,
+    ):
+        if reduce_fan_in < 2:
+            raise ValueError("reduce_fan_in must be at least 2")
+
+        self.chat = chat
+        self.chunk_tokens = chunk_tokens
+        self.max_concurrency = max_concurrency
+        self.reduce_fan_in = reduce_fan_in
+        self.map_prompt = map_prompt
+        self.reduce_prompt = reduce_prompt
+        self.final_prompt = final_prompt
+        self.final_reduce_prompt = final_reduce_prompt
+
+    def _tokens(self, text: str) -> int:
+        return count_tokens(text, getattr(self.chat, "model_name", None))
+
+    @staticmethod
+    def _header(commit: dict) -> str:
+        return f"Auteur: {commit.get('author')}\nMessage: {commit.get('message')}\n"
+
+    @staticmethod
+    def _file_header(file: dict) -> str:
+        return f"Fichier: {file['filename']} ({file['status']})\n"
+
+    def _split_text(self, text: str, budget: int) -> List[str]:
+        """Split a text on line boundaries into pieces of at most `budget`.
+
+        Each line is counted once and the size of a piece is the sum of its
+        lines, so splitting stays linear in the size of the text.
+        """
+        pieces: List[str] = []
+        current = ""
+        current_tokens = 0
+        for line in text.splitlines(keepends=True):
+            line_tokens = self._tokens(line)
+            # A single line longer than the budget is cut as is
+            while line_tokens > budget:
+                # Dense text (minified code...) has fewer characters per token
+                cut = max(budget * CHARS_PER_TOKEN // 2, 1)
+                if current:
+                    pieces.append(current)
+                    current, current_tokens = "", 0
+                pieces.append(line[:cut])
+                line = line[cut:]
+                line_tokens = self._tokens(line)
+
+            if current and current_tokens + line_tokens > budget:
+                pieces.append(current)
+                current, current_tokens = "", 0
+            current += line
+            current_tokens += line_tokens
+
+        if current:
+            pieces.append(current)
+        return pieces
+
+    def _file_pieces(self, file: dict, budget: int) -> List[str]:
+        """Split the patch of a file into pieces, each prefixed by the file name."""
+        header = self._file_header(file)
+        patch = file.get("patch") or "(pas de diff disponible)\n"
+        if self._tokens(header + patch) <= budget:
+            return [header + patch]
+
+        starts = [match.start() for match in HUNK_HEADER.finditer(patch)] or [0]
+        if starts[0] != 0:
+            starts.insert(0, 0)
+        hunks = [
+            patch[start:end] for start, end in zip(starts, starts[1:] + [len(patch)])
+        ]
+
+        pieces = []
+        piece_budget = max(budget - self._tokens(header), 1)
+        for hunk in hunks:
+            for part in self._split_text(hunk, piece_budget):
+                pieces.append(header + part)
+        return pieces
+
+    def split(self, commit: dict) -> List[str]:
+        """Split the files of a commit into token-budgeted chunks.
+
+        Args:
+            commit (dict): a commit as returned by `Github.get_commit_content`.
+
+        Returns:
+            List[str]: the chunks, small files and hunks packed together.
+        """
+        budget = max(self.chunk_tokens - self._tokens(self._header(commit)), 1)
+
+        chunks: List[str] = []
+        current = ""
+        current_tokens = 0
+        for file in commit.get("files", []):
+            for piece in self._file_pieces(file, budget):
+                # Pieces are counted once, plus one token for the separator
+                piece_tokens = self._tokens(piece) + 1
+                if current and current_tokens + piece_tokens > budget:
+                    chunks.append(current)
+                    current, current_tokens = "", 0
+                current += piece + "\n"
+                current_tokens += piece_tokens
+
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _batch(self, prompts: List[str]) -> List[str]:
+        responses = self.chat.batch(
+            prompts, config={"max_concurrency": self.max_concurrency}
+        )
+        return [response.content for response in responses]
+
+    def _reduce(self, header: str, summaries: List[str]) -> List[str]:
+        """Merge summaries by groups until they fit in one prompt."""
+        while (
+            len(summaries) > 1
+            and self._tokens(header + "\n".join(summaries)) > self.chunk_tokens
+        ):
+            groups: List[List[str]] = []
+            for summary in summaries:
+                if (
+                    groups
+                    and len(groups[-1]) < self.reduce_fan_in
+                    and self._tokens(header + "\n".join(groups[-1] + [summary]))
+                    <= self.chunk_tokens
+                ):
+                    groups[-1].append(summary)
+                else:
+                    groups.append([summary])
+
+            if len(groups) == len(summaries):
+                # Every summary fills a prompt on its own, merge pairs anyway
+                groups = [
+                    summaries[i : i + 2] for i in range(0, len(summaries), 2)
+                ]
+
+            summaries = self._batch(
+                [
+                    f"{self.reduce_prompt}\n{header}\n" + "\n\n".join(group)
+                    for group in groups
+                ]
+            )
+        return summaries
+
+    def summarize(self, commit: dict, chunks: Optional[List[str]] = None) -> str:
+        """Summarize a commit in one paragraph.
+
+        Args:
+            commit (dict): a commit as returned by `Github.get_commit_content`.
+            chunks (Optional[List[str]]): precomputed `split(commit)`.
+
+        Returns:
+            str: the summary.
+        """
+        header = self._header(commit)
+        chunks = self.split(commit) if chunks is None else chunks
+
+        if len(chunks) <= 1:
+            text = chunks[0] if chunks else ""
+            return self.chat.invoke(f"{self.final_prompt}\n{header}\n{text}").content
+
+        summaries = self._batch(
+            [f"{self.map_prompt}\n{header}\n{chunk}" for chunk in chunks]
+        )
+        summaries = self._reduce(header, summaries)
+
+        return self.chat.invoke(
+            f"{self.final_reduce_prompt}\n{header}\n" + "\n\n".join(summaries)
+        ).content
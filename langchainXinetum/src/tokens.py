@@ -0,0 +1,132 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+# Context window of the Hub models, in tokens
+MODEL_CONTEXT_SIZES: Dict[str, int] = {
+    "inetum-gpt35turbo": 16_385,
+    "inetum-gpt4": 8_192,
+    "inetum-gpt4-turbo": 128_000,
+    "inetum-gpt4o": 128_000,
+}
+
+# tiktoken encoding of the models behind the Hub model names
+MODEL_ENCODINGS: Dict[str, str] = {
+    "inetum-gpt35turbo": "cl100k_base",
+    "inetum-gpt4": "cl100k_base",
+    "inetum-gpt4-turbo": "cl100k_base",
+    "inetum-gpt4o": "o200k_base",
+}
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Average number of characters per token used without tiktoken
+CHARS_PER_TOKEN = 4
+
+# Token counts memoized by `count_tokens`, keyed by a digest of the text so
+# that the texts themselves are not kept alive
+COUNT_CACHE_SIZE = 4096
+
+_counts: "OrderedDict[Tuple[bytes, Optional[str]], int]" = OrderedDict()
+_counts_lock = threading.Lock()
+
+
+class ContextOverflowError(Exception):
+    """Raised before any request when a prompt cannot fit in the model context."""
+
+    def __init__(self, prompt_tokens: int, budget: int, model_name: str):
+        super().__init__(
+            f"Prompt of {prompt_tokens} tokens exceeds the {budget} tokens "
+            f"available for {model_name}"
+        )
+        self.prompt_tokens = prompt_tokens
+        self.budget = budget
+        self.model_name = model_name
+
+
+@lru_cache(maxsize=None)
+def _tiktoken() -> Optional[Any]:
+    # Imported on the first count, it takes a while to load
+    try:
+        import tiktoken
+    except ImportError:  # pragma: no cover - optional dependency
+        return None
+    return tiktoken
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: Optional[str]) -> Optional[Any]:
+    tiktoken = _tiktoken()
+    if tiktoken is None:
+        return None
+    return tiktoken.get_encoding(MODEL_ENCODINGS.get(model_name, DEFAULT_ENCODING))
+
+
+def has_tokenizer() -> bool:
+    """Whether exact counts are available (tiktoken is installed)."""
+    return _tiktoken() is not None
+
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """Number of tokens of a text for a model.
+
+    Uses tiktoken when installed, and a characters-per-token estimate
+    otherwise. Exact counts are memoized by digest of the text, so counting
+    the same prompt again (retries, cache lookups, map-reduce steps) only
+    costs a hash.
+
+    Args:
+        text (str): the text to count.
+        model_name (Optional[str]): the Hub model name.
+
+    Returns:
+        int: the number of tokens.
+    """
+    if not text:
+        return 0
+
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+
+    key = (hashlib.sha1(text.encode()).digest(), model_name)
+    with _counts_lock:
+        count = _counts.get(key)
+        if count is not None:
+            _counts.move_to_end(key)
+            return count
+
+    count = len(encoding.encode(text, disallowed_special=()))
+    with _counts_lock:
+        _counts[key] = count
+        if len(_counts) > COUNT_CACHE_SIZE:
+            _counts.popitem(last=False)
+    return count
+
+
+def context_size(model_name: Optional[str]) -> Optional[int]:
+    """Context window of a model, None when unknown."""
+    return MODEL_CONTEXT_SIZES.get(model_name)
+
+
+def truncate_to_tokens(
+    text: str, max_tokens: int, model_name: Optional[str] = None
+) -> str:
+    """Keep the end of a text so that it fits in `max_tokens`.
+
+    The end is kept because the most recent messages of a conversation
+    come last.
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, model_name) <= max_tokens:
+        return text
+
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return text[len(text) - (max_tokens - 1) * CHARS_PER_TOKEN :]
+
+    tokens = encoding.encode(text, disallowed_special=())
+    return encoding.decode(tokens[-max_tokens:])
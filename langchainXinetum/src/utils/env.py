@@ -1,7 +1,21 @@
 import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def load_env() -> None:
+    """Load the .env file into the environment, once per process.
+
+    Called on first use rather than at import time, so that importing the
+    package stays cheap and variables set before the first use are seen.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
 
 
 def get_env_variable(variable_name: str):
+    load_env()
     try:
         value = os.environ[variable_name]
         return value
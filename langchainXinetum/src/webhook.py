@@ -0,0 +1,284 @@
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple, TypedDict
+
+import requests
+
+from src.utils.env import load_env
+
+logger = logging.getLogger(__name__)
+
+# pull_request actions that bring new code to summarize
+PR_ACTIONS = ("opened", "reopened", "synchronize", "ready_for_review")
+
+# Attempts at turning a delivery into records, and the delay before the
+# first retry (doubled at each attempt)
+HANDLE_ATTEMPTS = 3
+HANDLE_RETRY_DELAY = 2.0
+
+
+class WebhookEvent(TypedDict):
+    event: str
+    delivery: Optional[str]
+    record: dict
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    """Value of the X-Hub-Signature-256 header GitHub sends for `body`."""
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    if not signature:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body), signature)
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    server: "WebhookServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, message: str) -> None:
+        body = json.dumps({"message": message}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        receiver = self.server.receiver
+
+        if not verify_signature(
+            receiver.secret, body, self.headers.get("X-Hub-Signature-256")
+        ):
+            return self._reply(401, "invalid signature")
+
+        event = self.headers.get("X-GitHub-Event", "")
+        if event == "ping":
+            return self._reply(200, "pong")
+        if event not in ("push", "pull_request"):
+            return self._reply(202, f"ignored event: {event}")
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._reply(400, "invalid JSON payload")
+
+        # GitHub gives up after 10 seconds, the records are fetched afterwards
+        # by the receiver's worker
+        receiver.deliveries.put((event, payload, self.headers.get("X-GitHub-Delivery")))
+        self._reply(202, "accepted")
+
+
+class WebhookServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, receiver: "WebhookReceiver"):
+        self.receiver = receiver
+        super().__init__(address, _WebhookHandler)
+
+
+class WebhookReceiver:
+    """
+    HTTP receiver of the GitHub push and pull_request webhooks.
+    Each delivery is verified with its X-Hub-Signature-256 signature, then
+    turned into the records the Github class produces (get_commit_content for
+    the pushed commits, get_pr_content for the pull requests) and put in
+    `events` as WebhookEvent dictionaries.
+    Verified deliveries are acknowledged at once and handled by a worker
+    thread, which retries the ones whose records cannot be fetched and logs
+    the failures. A retried push may queue some of its commits twice.
+    :param github: Github client used to fetch the commit contents
+    :param secret: Webhook secret, defaults to GITHUB_WEBHOOK_SECRET
+    :param host: Listening address, defaults to WEBHOOK_HOST or 0.0.0.0
+    :param port: Listening port, defaults to WEBHOOK_PORT or 8080
+    :param events: Queue receiving the events, one is created if not given
+    """
+
+    def __init__(
+        self,
+        github,
+        secret: Optional[str] = None,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        events: Optional[queue.Queue] = None,
+    ):
+        self.github = github
+        self.secret = secret or os.getenv("GITHUB_WEBHOOK_SECRET")
+        if not self.secret:
+            raise ValueError("Missing required parameter: webhook secret")
+
+        self.host = host or os.getenv("WEBHOOK_HOST", "0.0.0.0")
+        self.port = int(port if port is not None else os.getenv("WEBHOOK_PORT", 8080))
+        self.events: queue.Queue = events if events is not None else queue.Queue()
+        self.deliveries: "queue.Queue[Optional[Tuple[str, dict, Optional[str]]]]" = (
+            queue.Queue()
+        )
+        self._server: Optional[WebhookServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def address(self):
+        """(host, port) actually listened on, useful with port 0."""
+        if self._server is None:
+            return (self.host, self.port)
+        return self._server.server_address[:2]
+
+    def _repository_matches(self, payload: dict) -> bool:
+        full_name = payload.get("repository", {}).get("full_name")
+        expected = f"{self.github.repo_owner}/{self.github.repo_name}"
+        return full_name is None or full_name.lower() == expected.lower()
+
+    def handle(self, event: str, payload: dict, delivery: Optional[str] = None) -> None:
+        """
+        Turn a verified delivery into records and queue them.
+        """
+        if not self._repository_matches(payload):
+            return
+
+        if event == "push":
+            if payload.get("deleted"):
+                return
+            shas = [
+                commit["id"]
+                for commit in payload.get("commits", [])
+                if commit.get("distinct", True)
+            ]
+            # Oldest first, as listed in the payload
+            for content in self.github.get_commits_content(shas):
+                self.events.put({"event": event, "delivery": delivery, "record": content})
+
+        elif event == "pull_request":
+            if payload.get("action") not in PR_ACTIONS:
+                return
+            record = self.github.get_pr_content(payload["pull_request"])
+            self.events.put({"event": event, "delivery": delivery, "record": record})
+
+    def _handle_with_retries(
+        self, event: str, payload: dict, delivery: Optional[str]
+    ) -> None:
+        for attempt in range(1, HANDLE_ATTEMPTS + 1):
+            try:
+                self.handle(event, payload, delivery)
+                return
+            except Exception:
+                if attempt == HANDLE_ATTEMPTS:
+                    logger.exception(
+                        "Dropping %s delivery %s after %d attempts",
+                        event,
+                        delivery,
+                        attempt,
+                    )
+                    return
+                logger.warning(
+                    "Failed to handle %s delivery %s (attempt %d), retrying",
+                    event,
+                    delivery,
+                    attempt,
+                    exc_info=True,
+                )
+                time.sleep(HANDLE_RETRY_DELAY * 2 ** (attempt - 1))
+
+    def _drain(self) -> None:
+        """Handle the verified deliveries until stopped."""
+        while True:
+            delivery = self.deliveries.get()
+            if delivery is None:
+                return
+            self._handle_with_retries(*delivery)
+
+    def start(self) -> "WebhookReceiver":
+        """Start listening and handling the deliveries in background threads."""
+        if self._server is None:
+            self._worker = threading.Thread(
+                target=self._drain, name="github-webhook-worker", daemon=True
+            )
+            self._worker.start()
+            self._server = WebhookServer((self.host, self.port), self)
+            self._thread = threading.Thread(
+                target=self._server.serve_forever, name="github-webhook", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop listening, after handling the deliveries already accepted."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self.deliveries.put(None)
+            self._worker.join()
+            self._server = None
+            self._thread = None
+            self._worker = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def replay(url: str, event: str, payload_file: str, secret: str) -> requests.Response:
+    """
+    Post a recorded webhook payload, signed like GitHub does.
+    :param url: URL of the webhook receiver
+    :param event: Event name sent in X-GitHub-Event
+    :param payload_file: JSON file holding the recorded payload
+    :param secret: Webhook secret
+    :return: The receiver response
+    """
+    with open(payload_file, "rb") as file:
+        body = file.read()
+
+    return requests.post(
+        url,
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            "X-GitHub-Event": event,
+            "X-GitHub-Delivery": f"replay-{hashlib.sha1(body).hexdigest()[:12]}",
+            "X-Hub-Signature-256": sign_payload(secret, body),
+        },
+        timeout=30,
+    )
+
+
+def main():
+    load_env()
+
+    parser = argparse.ArgumentParser(
+        description="Replay recorded GitHub webhook payloads to a receiver."
+    )
+    parser.add_argument("event", choices=["push", "pull_request", "ping"])
+    parser.add_argument("payload_files", nargs="+")
+    parser.add_argument(
+        "--url",
+        default=f"http://127.0.0.1:{os.getenv('WEBHOOK_PORT', 8080)}/",
+    )
+    parser.add_argument("--secret", default=os.getenv("GITHUB_WEBHOOK_SECRET"))
+    args = parser.parse_args()
+
+    if not args.secret:
+        parser.error("--secret or GITHUB_WEBHOOK_SECRET is required")
+
+    for payload_file in args.payload_files:
+        response = replay(args.url, args.event, payload_file, args.secret)
+        print(payload_file, response.status_code, response.text)
+
+
+if __name__ == "__main__":
+    main()
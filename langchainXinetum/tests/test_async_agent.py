@@ -0,0 +1,69 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+from benchmarks.mock_hub import MockHub
+from src.concurrency import AdaptiveConcurrencyLimiter
+from src.inetum_genai_hub.async_agent import AsyncAIAgent
+from src.inetum_genai_hub.auth import TokenManager
+
+
+class AsyncAIAgentTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.hub = MockHub(latency="0", completion="0").start()
+        self.addCleanup(self.hub.stop)
+        patcher = mock.patch.dict(
+            os.environ,
+            HUB_URL=self.hub.url,
+            AUTH_USERNAME="user",
+            AUTH_PASSWORD="password",
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create(self, **kwargs):
+        return AsyncAIAgent.create(
+            "agent-1",
+            "org-1",
+            model="inetum-gpt4o",
+            concurrency_limiter=AdaptiveConcurrencyLimiter(),
+            **kwargs,
+        )
+
+    async def test_chat(self):
+        async with await self.create() as agent:
+            answers = await asyncio.gather(
+                *(
+                    agent.chat(f"question {index}", new_conversation=True)
+                    for index in range(3)
+                )
+            )
+        self.assertEqual(len(answers), 3)
+        self.assertEqual(self.hub.requests["POST /Chat"], 3)
+
+    async def test_agents_sharing_a_manager_log_in_once(self):
+        manager = TokenManager(
+            self.hub.url, {"username": "user", "password": "password"}
+        )
+        self.addCleanup(manager.close)
+
+        agents = await asyncio.gather(
+            *(self.create(token_manager=manager) for _ in range(10))
+        )
+        for agent in agents:
+            await agent.aclose()
+
+        self.assertEqual(self.hub.requests["POST /account"], 1)
+        # The manager is the caller's, it keeps running
+        self.assertFalse(manager._closed)
+
+    async def test_aclose_stops_the_token_refresh_of_its_manager(self):
+        agent = await self.create()
+        await agent.aclose()
+        self.assertTrue(agent.session.closed)
+        self.assertTrue(agent.token_manager._closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import base64
+import json
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.mock_hub import MockHub
+from src.inetum_genai_hub.auth import TokenManager, jwt_expiry
+
+LOGIN = "/account/login"
+REFRESH = "/account/refresh-token"
+
+
+def jwt(claims: dict) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode()
+    return f"e30.{payload.rstrip('=')}.signature"
+
+
+class JwtExpiryTest(unittest.TestCase):
+    def test_expiry_of_a_jwt(self):
+        self.assertEqual(jwt_expiry(jwt({"exp": 1234})), 1234.0)
+
+    def test_tokens_without_expiry(self):
+        self.assertIsNone(jwt_expiry(None))
+        self.assertIsNone(jwt_expiry("opaque-token"))
+        self.assertIsNone(jwt_expiry(jwt({"sub": "user"})))
+        self.assertIsNone(jwt_expiry("a.not-base64!.c"))
+
+
+class TokenManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.hub = MockHub(latency="0.05", completion="0").start()
+        self.addCleanup(self.hub.stop)
+
+    def manager(self, **kwargs) -> TokenManager:
+        manager = TokenManager(self.hub.url, {"username": "user"}, **kwargs)
+        self.addCleanup(manager.close)
+        return manager
+
+    def concurrently(self, function, count: int = 10) -> list:
+        with ThreadPoolExecutor(count) as executor:
+            return list(executor.map(lambda _: function(), range(count)))
+
+    def test_concurrent_first_use_logs_in_once(self):
+        manager = self.manager()
+        tokens = self.concurrently(manager.token)
+
+        self.assertEqual(len(set(tokens)), 1)
+        self.assertEqual(self.hub.tokens_issued, {LOGIN: 1})
+
+    def test_burst_of_rejections_refreshes_once(self):
+        manager = self.manager()
+        rejected = manager.token()
+        tokens = self.concurrently(lambda: manager.refresh(rejected))
+
+        self.assertEqual(len(set(tokens)), 1)
+        self.assertNotEqual(tokens[0], rejected)
+        self.assertEqual(self.hub.tokens_issued, {LOGIN: 1, REFRESH: 1})
+
+    def test_token_is_refreshed_before_its_expiry(self):
+        self.hub.token_ttl = 1.0
+        manager = self.manager(refresh_margin=0.9)
+        first = manager.token()
+        time.sleep(0.5)
+
+        self.assertNotEqual(manager.token(), first)
+        self.assertGreaterEqual(self.hub.tokens_issued[REFRESH], 1)
+
+    def test_close_stops_the_background_refresh(self):
+        self.hub.token_ttl = 1.0
+        manager = self.manager(refresh_margin=0.9)
+        manager.token()
+        manager.close()
+        time.sleep(0.3)
+
+        self.assertEqual(self.hub.tokens_issued, {LOGIN: 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
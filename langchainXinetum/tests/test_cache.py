@@ -0,0 +1,113 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import SecretStr
+
+from benchmarks.mock_hub import MockHub
+from src.cache import InMemoryResponseCache, SQLiteResponseCache, response_cache_key
+from src.model import ChatInetum
+from src.settings_cache import SettingsCache
+
+
+def key(prompt: str, temperature: float = 0.16) -> str:
+    return response_cache_key(prompt, None, "inetum-gpt4o", temperature, None, 100)
+
+
+class ResponseCacheKeyTest(unittest.TestCase):
+    def test_insignificant_differences_share_a_key(self):
+        self.assertEqual(key("hello  \nworld\n"), key("  hello\nworld"))
+        # "é" composed and decomposed
+        self.assertEqual(key("caf\u00e9"), key("cafe\u0301"))
+
+    def test_generation_parameters_are_part_of_the_key(self):
+        self.assertNotEqual(key("hello"), key("hello", temperature=0.5))
+        self.assertNotEqual(key("hello"), key("hello world"))
+
+
+class InMemoryResponseCacheTest(unittest.TestCase):
+    def test_least_recently_used_are_evicted(self):
+        cache = InMemoryResponseCache(max_size=2)
+        cache.set("a", "A")
+        cache.set("b", "B")
+        cache.get("a")
+        cache.set("c", "C")
+
+        self.assertEqual(cache.get("a"), "A")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 1, "size": 2})
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = InMemoryResponseCache(ttl=60)
+        with mock.patch("src.cache.time.time", return_value=1000.0):
+            cache.set("a", "A")
+        with mock.patch("src.cache.time.time", return_value=1061.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+class SQLiteResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "responses.db")
+
+    def cache(self, **kwargs) -> SQLiteResponseCache:
+        cache = SQLiteResponseCache(self.path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_responses_survive_the_process(self):
+        self.cache().set("a", "A")
+        self.assertEqual(self.cache().get("a"), "A")
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = self.cache(ttl=60)
+        with mock.patch("src.cache.time.time", return_value=1000.0):
+            cache.set("a", "A")
+        with mock.patch("src.cache.time.time", return_value=1061.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+class ChatInetumCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.hub = MockHub(latency="0", completion="0").start()
+        self.addCleanup(self.hub.stop)
+        self.cache = InMemoryResponseCache()
+        self.chat = ChatInetum(
+            api_key=SecretStr("test"),
+            api_url=self.hub.url,
+            settings_cache=SettingsCache(),
+            response_cache=self.cache,
+        )
+        self.addCleanup(self.chat.inetum_api.close)
+        self.messages = [SystemMessage("be brief"), HumanMessage("hello")]
+
+    def test_identical_requests_are_served_from_the_cache(self):
+        first = self.chat.invoke(self.messages)
+        second = self.chat.invoke(self.messages)
+
+        self.assertFalse(first.response_metadata["cache_hit"])
+        self.assertTrue(second.response_metadata["cache_hit"])
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(self.hub.requests["POST /Chat"], 1)
+
+    def test_bypass_cache_forces_a_generation(self):
+        self.chat.invoke(self.messages)
+        answer = self.chat.invoke(self.messages, bypass_cache=True)
+
+        self.assertFalse(answer.response_metadata["cache_hit"])
+        self.assertEqual(self.hub.requests["POST /Chat"], 2)
+
+    def test_async_requests_share_the_cache(self):
+        self.chat.invoke(self.messages)
+        answer = asyncio.run(self.chat.ainvoke(self.messages))
+
+        self.assertTrue(answer.response_metadata["cache_hit"])
+        self.assertEqual(self.hub.requests["POST /Chat"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
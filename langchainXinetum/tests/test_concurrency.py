@@ -0,0 +1,128 @@
+import asyncio
+import unittest
+
+from src.concurrency import AdaptiveConcurrencyLimiter, HubHTTPError, parse_retry_after
+
+
+def make_limiter(initial_window: int = 4, **kwargs) -> AdaptiveConcurrencyLimiter:
+    # Latency based decreases make the window depend on timings, tested apart
+    kwargs.setdefault("latency_tolerance", None)
+    return AdaptiveConcurrencyLimiter(
+        initial_window=initial_window, min_window=1, max_window=16, **kwargs
+    )
+
+
+def fail(limiter: AdaptiveConcurrencyLimiter, error: BaseException) -> None:
+    try:
+        with limiter.slot():
+            raise error
+    except type(error):
+        pass
+
+
+class WindowTest(unittest.TestCase):
+    def test_light_traffic_does_not_grow_the_window(self):
+        limiter = make_limiter(initial_window=4)
+        for _ in range(20):
+            with limiter.slot():
+                pass
+        self.assertEqual(limiter.window, 4)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_full_window_grows_by_one_in_slow_start(self):
+        limiter = make_limiter(initial_window=1)
+        with limiter.slot():
+            pass
+        self.assertEqual(limiter.window, 2)
+
+        # A single request in a window of two leaves it unchanged
+        with limiter.slot():
+            pass
+        self.assertEqual(limiter.window, 2)
+
+    def test_full_window_grows_by_one_per_window_after_congestion(self):
+        limiter = make_limiter(initial_window=4)
+        fail(limiter, HubHTTPError("busy", status_code=429))
+        self.assertEqual(limiter.window, 2)
+
+        with limiter.slot(), limiter.slot():
+            pass
+        # Each full-window success adds 1/window
+        self.assertGreater(limiter.window, 2)
+        self.assertLess(limiter.window, 3)
+
+    def test_throttling_halves_the_window(self):
+        limiter = make_limiter(initial_window=8)
+        fail(limiter, HubHTTPError("busy", status_code=503))
+        self.assertEqual(limiter.window, 4)
+        self.assertEqual(limiter.stats()["throttled"], 1)
+
+    def test_window_never_shrinks_below_the_minimum(self):
+        limiter = make_limiter(initial_window=1)
+        fail(limiter, HubHTTPError("busy", status_code=429))
+        self.assertEqual(limiter.window, 1)
+
+    def test_client_errors_leave_the_window_alone(self):
+        limiter = make_limiter(initial_window=4)
+        fail(limiter, HubHTTPError("bad request", status_code=400))
+        fail(limiter, ValueError("task failed"))
+        self.assertEqual(limiter.window, 4)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_retry_after_blocks_new_requests(self):
+        limiter = make_limiter()
+        fail(limiter, HubHTTPError("busy", status_code=429, retry_after=30))
+        self.assertGreater(limiter.blocked_for, 29)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("12"), 12.0)
+        self.assertEqual(parse_retry_after("-3"), 0.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertEqual(parse_retry_after("Mon, 01 Jan 2001 00:00:00 GMT"), 0.0)
+
+
+class AsyncSlotTest(unittest.IsolatedAsyncioTestCase):
+    async def test_waiters_are_served_in_order(self):
+        limiter = make_limiter(initial_window=1)
+        order = []
+
+        async def request(name: str) -> None:
+            async with limiter.slot_async():
+                order.append(name)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*(request(name) for name in "abcd"))
+        self.assertEqual(order, list("abcd"))
+        self.assertEqual(limiter.in_flight, 0)
+
+    async def test_cancelled_waiter_gives_its_place_back(self):
+        limiter = make_limiter(initial_window=1)
+        release = asyncio.Event()
+
+        async def holder() -> None:
+            async with limiter.slot_async():
+                await release.wait()
+
+        holding = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        self.assertEqual(limiter.queue_depth, 1)
+
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(limiter.queue_depth, 0)
+
+        release.set()
+        await holding
+        self.assertEqual(limiter.in_flight, 0)
+
+        # The slot is free again
+        async with limiter.slot_async():
+            self.assertEqual(limiter.in_flight, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
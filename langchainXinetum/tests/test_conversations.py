@@ -0,0 +1,93 @@
+import unittest
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from pydantic import SecretStr
+
+from benchmarks.mock_hub import MockHub
+from src.conversations import ConversationTracker, prefix_hashes
+from src.model import ChatInetum
+from src.settings_cache import SettingsCache
+
+
+class ConversationTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.history = [SystemMessage("be brief"), HumanMessage("hello")]
+        self.answer = AIMessage("hi")
+        self.tracker = ConversationTracker()
+        self.tracker.record(self.history, self.answer, "conversation", 2)
+
+    def test_prefix_hashes_chain(self):
+        messages = [*self.history, self.answer]
+        hashes = prefix_hashes(messages)
+        self.assertEqual(len(hashes), 3)
+        self.assertEqual(prefix_hashes(messages[:2]), hashes[:2])
+        self.assertNotEqual(prefix_hashes([HumanMessage("hello")])[0], hashes[1])
+
+    def test_continuation_is_claimed_once(self):
+        messages = [*self.history, self.answer, HumanMessage("how are you?")]
+        plan = self.tracker.claim(messages)
+        self.assertEqual(
+            plan, {"conversation_id": "conversation", "hub_messages": 2, "start": 3}
+        )
+        self.assertIsNone(self.tracker.claim(messages))
+
+    def test_unknown_history_starts_a_new_conversation(self):
+        self.assertIsNone(self.tracker.claim([HumanMessage("other")]))
+        self.assertEqual(len(self.tracker), 1)
+
+    def test_conversation_beyond_the_context_is_not_continued(self):
+        messages = [*self.history, self.answer, HumanMessage("how are you?")]
+        self.assertIsNone(self.tracker.claim(messages, max_previous_messages=1))
+
+    def test_new_system_prompt_starts_over(self):
+        messages = [*self.history, self.answer, SystemMessage("be verbose")]
+        self.assertIsNone(self.tracker.claim(messages))
+
+    def test_least_recently_used_histories_are_dropped(self):
+        tracker = ConversationTracker(max_size=2)
+        for index in range(3):
+            tracker.record([HumanMessage(str(index))], self.answer, str(index), 2)
+        self.assertEqual(len(tracker), 2)
+        messages = [HumanMessage("0"), self.answer, HumanMessage("next")]
+        self.assertIsNone(tracker.claim(messages))
+
+
+class ConversationReuseTest(unittest.TestCase):
+    def setUp(self):
+        self.hub = MockHub(latency="0", completion="0").start()
+        self.addCleanup(self.hub.stop)
+
+    def chat(self, **kwargs) -> ChatInetum:
+        chat = ChatInetum(
+            api_key=SecretStr("test"),
+            api_url=self.hub.url,
+            settings_cache=SettingsCache(),
+            reuse_conversation=True,
+            **kwargs,
+        )
+        self.addCleanup(chat.inetum_api.close)
+        return chat
+
+    def test_only_the_new_turn_is_sent(self):
+        chat = self.chat()
+        history = [HumanMessage("Explain this commit")]
+        history += [chat.invoke(history), HumanMessage("And the tests?")]
+        answer = chat.invoke(history)
+
+        self.assertEqual(self.hub.requests["POST /Chat"], 2)
+        conversation_id = answer.response_metadata["conversation_id"]
+        inputs = self.hub.messages(conversation_id)[::2]
+        self.assertEqual(len(inputs), 2)
+        self.assertNotIn("Explain this commit", inputs[1]["text"])
+        self.assertIn("And the tests?", inputs[1]["text"])
+
+    def test_conversation_beyond_the_agent_limit_starts_over(self):
+        self.hub.settings["numberPreviousMessages"] = 1
+        chat = self.chat(lazy_init=True)
+        history = [HumanMessage("Explain this commit")]
+        history += [chat.invoke(history), HumanMessage("And the tests?")]
+        first = history[1].response_metadata["conversation_id"]
+        answer = chat.invoke(history)
+
+        # Two messages are already in the conversation, beyond the limit
+        self.assertNotEqual(answer.response_metadata["conversation_id"], first)
@@ -0,0 +1,105 @@
+import os
+import unittest
+from unittest import mock
+
+from benchmarks.mock_github import MockGithub
+from src.Github import Github
+
+
+class GithubTestCase(unittest.TestCase):
+    """Runs a fake GitHub repository for each test."""
+
+    repository = {}
+
+    def setUp(self):
+        self.server = MockGithub(**self.repository).start()
+        self.addCleanup(self.server.stop)
+        patcher = mock.patch.dict(
+            os.environ, GITHUB_API_URL=self.server.url, GITHUB_CACHE_DIR=""
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def github(self, **kwargs) -> Github:
+        github = Github(token="token", repo_owner="owner", repo_name="repo", **kwargs)
+        self.addCleanup(github.session.close)
+        return github
+
+
+class PaginationTest(GithubTestCase):
+    repository = {"commits": 250, "files": 5, "files_per_page": 2}
+
+    def test_list_commits_follows_the_link_headers(self):
+        commits = self.github().list_commits()
+        self.assertEqual(len(commits), 250)
+        self.assertEqual(commits[0]["commit"]["message"], "commit 249")
+        self.assertEqual(self.server.requests["GET /commits"], 3)
+
+    def test_list_commits_stops_at_the_limit(self):
+        commits = self.github().list_commits(limit=5)
+        self.assertEqual([commit["sha"] for commit in commits], [
+            commit["sha"] for commit in self.server.commits[:5]
+        ])
+        self.assertEqual(self.server.requests["GET /commits"], 1)
+
+    def test_commit_files_are_paginated(self):
+        sha = self.server.commits[0]["sha"]
+        content = self.github().get_commit_content(sha)
+        self.assertEqual(len(content["files"]), 5)
+        self.assertEqual(self.server.requests["GET /commits/{id}"], 3)
+
+
+class CommitsContentTest(GithubTestCase):
+    repository = {"commits": 20}
+
+    def test_contents_keep_the_order_of_the_shas(self):
+        shas = [commit["sha"] for commit in self.server.commits]
+        contents = self.github(max_workers=4).get_commits_content(shas)
+        self.assertEqual([content["sha"] for content in contents], shas)
+        self.assertEqual(self.server.requests["GET /commits/{id}"], 20)
+
+    def test_new_commits_content(self):
+        contents = self.github().get_new_commits_content(3)
+        self.assertEqual(
+            [content["message"] for content in contents],
+            ["commit 19", "commit 18", "commit 17"],
+        )
+        self.assertEqual(contents[0]["files"][0]["filename"], "file-19-0.py")
+
+    def test_latest_pull_request(self):
+        content = self.github().get_latest_pr_commit_content()
+        self.assertEqual(content["pr_number"], 1)
+        self.assertEqual(content["pr_commits_count"], 2)
+        self.assertEqual(content["last_commit"]["message"], "commit 1")
+
+
+class GraphqlBackendTest(GithubTestCase):
+    repository = {"commits": 6, "pulls": 3}
+
+    def test_latest_pull_request_in_one_query(self):
+        content = self.github(backend="graphql").get_latest_pr_commit_content()
+        # Only the patches of the last commit still go through REST
+        self.assertEqual(self.server.requests["POST /graphql"], 1)
+        self.assertEqual(self.server.requests["GET /commits/{id}"], 1)
+        self.assertEqual(self.server.requests["GET /pulls"], 0)
+
+        rest = self.github(backend="rest").get_latest_pr_commit_content()
+        self.assertEqual(content, rest)
+        self.assertEqual(content["pr_number"], 3)
+
+    def test_falls_back_to_rest_on_errors(self):
+        self.server.graphql_errors = [{"type": "FORBIDDEN", "message": "scope"}]
+        with self.assertLogs("src.Github", "WARNING"):
+            content = self.github(backend="graphql").get_latest_pr_commit_content()
+        self.assertEqual(content["pr_number"], 3)
+        self.assertEqual(self.server.requests["GET /pulls"], 1)
+
+    def test_falls_back_to_rest_on_a_failed_request(self):
+        self.server.graphql_status = 502
+        with self.assertLogs("src.Github", "WARNING"):
+            content = self.github(backend="graphql").get_latest_pr_commit_content()
+        self.assertEqual(content["last_commit"]["message"], "commit 5")
+
+
+if __name__ == "__main__":
+    unittest.main()
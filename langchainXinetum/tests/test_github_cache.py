@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from src.github_cache import GithubResponseCache
+from tests.test_github import GithubTestCase
+
+
+class ETagCacheTest(GithubTestCase):
+    repository = {"commits": 3}
+
+    def test_lists_are_revalidated(self):
+        github = self.github()
+        first = github.list_commits()
+        second = github.list_commits()
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.server.requests["GET /commits"], 2)
+        self.assertEqual(self.server.not_modified, 1)
+
+    def test_changed_lists_are_fetched_again(self):
+        github = self.github()
+        github.list_commits()
+        self.server.commits.pop()
+
+        self.assertEqual(len(github.list_commits()), 2)
+        self.assertEqual(self.server.not_modified, 0)
+
+    def test_commit_details_are_served_without_a_request(self):
+        github = self.github()
+        sha = self.server.commits[0]["sha"]
+        first = github.get_commit_content(sha)
+
+        self.assertEqual(github.get_commit_content(sha), first)
+        self.assertEqual(self.server.requests["GET /commits/{id}"], 1)
+
+    def test_since_queries_are_not_cached(self):
+        github = self.github()
+        since = self.server.commits[-1]["commit"]["committer"]["date"]
+        github.list_commits(since=since)
+        github.list_commits(since=since)
+
+        self.assertEqual(self.server.requests["GET /commits"], 2)
+        self.assertEqual(self.server.not_modified, 0)
+        self.assertEqual(len(github.cache._entries), 0)
+
+    def test_disk_cache_survives_the_client(self):
+        directory = tempfile.mkdtemp()
+        sha = self.server.commits[0]["sha"]
+        self.github(cache=GithubResponseCache(directory)).get_commit_content(sha)
+        self.github(cache=GithubResponseCache(directory)).get_commit_content(sha)
+
+        self.assertEqual(self.server.requests["GET /commits/{id}"], 1)
+
+
+class EvictionTest(unittest.TestCase):
+    def store(self, cache: GithubResponseCache, url: str) -> None:
+        response = mock.Mock(text="[]", headers={"ETag": '"etag"'})
+        cache.set(url, response)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = GithubResponseCache(max_entries=2)
+        self.store(cache, "https://api/a")
+        self.store(cache, "https://api/b")
+        cache.get("https://api/a")
+        self.store(cache, "https://api/c")
+
+        self.assertIsNotNone(cache.get("https://api/a"))
+        self.assertIsNone(cache.get("https://api/b"))
+
+    def test_expired_entries_are_dropped(self):
+        cache = GithubResponseCache(max_age=60)
+        with mock.patch("src.github_cache.time.time", return_value=1000.0):
+            self.store(cache, "https://api/a")
+        with mock.patch("src.github_cache.time.time", return_value=1061.0):
+            self.assertIsNone(cache.get("https://api/a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.Github import Github
+
+
+def commit(sha: str, date: str) -> dict:
+    return {"sha": sha, "commit": {"committer": {"date": date}}}
+
+
+class WatchNewCommitsTest(unittest.TestCase):
+    def setUp(self):
+        # Most recent first, like the GitHub API
+        self.commits = []
+        self.github = Github.__new__(Github)
+        self.github.repo_owner = "owner"
+        self.github.repo_name = "repo"
+        self.github.list_commits = self.list_commits
+        self.github.get_commits_content = lambda shas: [{"sha": sha} for sha in shas]
+        self.state_file = os.path.join(tempfile.mkdtemp(), "state.json")
+
+    def list_commits(self, limit=None, sha=None, since=None):
+        commits = [
+            commit
+            for commit in self.commits
+            if since is None or commit["commit"]["committer"]["date"] >= since
+        ]
+        return commits[:limit] if limit else commits
+
+    def watch(self, **kwargs):
+        watch = self.github.watch_new_commits(state_file=self.state_file, **kwargs)
+        return [content["sha"] for content in watch]
+
+    def test_yields_the_new_commits_once(self):
+        self.commits = [commit("b", "2026-10-02T10:00:00Z")]
+        self.assertEqual(self.watch(), ["b"])
+        self.assertEqual(self.watch(), [])
+
+        self.commits.insert(0, commit("c", "2026-10-03T10:00:00Z"))
+        self.assertEqual(self.watch(), ["c"])
+
+    def test_merged_older_commits_are_not_skipped(self):
+        self.commits = [commit("b", "2026-10-02T10:00:00Z")]
+        self.watch()
+
+        # A merge brings a commit dated before the last processed one
+        self.commits = [
+            commit("merge", "2026-10-03T10:00:00Z"),
+            commit("older", "2026-10-02T09:00:00Z"),
+            *self.commits,
+        ]
+        self.assertEqual(self.watch(), ["older", "merge"])
+
+        with open(self.state_file, encoding="utf-8") as file:
+            state = json.load(file)["owner/repo@default"]
+        self.assertEqual(state["date"], "2026-10-03T10:00:00Z")
+        self.assertEqual(state["seen"], ["b", "older", "merge"])
+
+    def test_state_without_seen_shas_is_still_read(self):
+        with open(self.state_file, "w", encoding="utf-8") as file:
+            json.dump(
+                {"owner/repo@default": {"sha": "b", "date": "2026-10-02T10:00:00Z"}},
+                file,
+            )
+        self.commits = [
+            commit("c", "2026-10-03T10:00:00Z"),
+            commit("b", "2026-10-02T10:00:00Z"),
+        ]
+        self.assertEqual(self.watch(), ["c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
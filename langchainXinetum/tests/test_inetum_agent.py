@@ -0,0 +1,127 @@
+import asyncio
+import unittest
+
+from pydantic import SecretStr
+
+from benchmarks.mock_hub import MockHub
+from src.concurrency import AdaptiveConcurrencyLimiter
+from src.inetum_agent import InetumSDK
+from src.settings_cache import SettingsCache
+
+
+class StreamingHub(MockHub):
+    """Mock Hub showing the beginning of the answers of the running tasks."""
+
+    def messages(self, conversation_id: str) -> list:
+        messages = super().messages(conversation_id)
+        with self._lock:
+            for task in self._tasks.values():
+                if task["conversation_id"] == conversation_id and not task["answered"]:
+                    messages.append({"text": task["answer"][:4]})
+        return messages
+
+
+class HubTestCase(unittest.TestCase):
+    """Runs a mock Hub answering at once for each test."""
+
+    hub_class = MockHub
+    completion = "0"
+
+    def setUp(self):
+        self.hub = self.hub_class(latency="0", completion=self.completion).start()
+        self.addCleanup(self.hub.stop)
+
+    def sdk(self, **kwargs) -> InetumSDK:
+        kwargs.setdefault("concurrency_limiter", AdaptiveConcurrencyLimiter())
+        kwargs.setdefault("settings_cache", SettingsCache())
+        sdk = InetumSDK(
+            api_key=SecretStr("test"),
+            base_url=self.hub.url,
+            model="inetum-gpt4o",
+            temperature=0.16,
+            top_p=None,
+            max_tokens=16000,
+            **kwargs,
+        )
+        self.addCleanup(sdk.close)
+        return sdk
+
+
+class AsyncSessionTest(HubTestCase):
+    def test_generations_of_a_loop_share_one_session(self):
+        sdk = self.sdk()
+
+        async def main():
+            sessions = set()
+
+            async def generate(index):
+                await sdk.generate_async(f"question {index}")
+                sessions.add(id(sdk._get_async_session()))
+
+            await asyncio.gather(*(generate(index) for index in range(5)))
+            await sdk.aclose()
+            return sessions
+
+        self.assertEqual(len(asyncio.run(main())), 1)
+
+    def test_session_is_closed_with_its_loop(self):
+        sdk = self.sdk()
+
+        async def generate():
+            await sdk.generate_async("question")
+            return sdk._get_async_session()
+
+        first = asyncio.run(generate())
+        self.assertTrue(first.closed)
+
+        second = asyncio.run(generate())
+        self.assertIsNot(second, first)
+        self.assertTrue(second.closed)
+
+
+class StreamTest(HubTestCase):
+    hub_class = StreamingHub
+    completion = "0.2"
+
+    def test_stream_yields_the_answer_as_it_grows(self):
+        sdk = self.sdk()
+        deltas = list(sdk.generate_stream("question", polling_interval=0.01))
+        self.assertGreater(len(deltas), 1)
+        self.assertEqual("".join(deltas), "Réponse à : question")
+
+    def test_final_text_is_yielded_out_of_the_window(self):
+        sdk = self.sdk()
+        stream = sdk.generate_stream("question", polling_interval=0.01)
+        self.assertEqual(next(stream), "Répo")
+        self.assertEqual(sdk.concurrency_limiter.in_flight, 1)
+
+        self.assertEqual(next(stream), "nse à : question")
+        self.assertEqual(sdk.concurrency_limiter.in_flight, 0)
+        self.assertEqual(sdk.scheduler.active, 0)
+
+    def test_closing_a_stream_releases_its_slot(self):
+        sdk = self.sdk()
+        stream = sdk.generate_stream("question", polling_interval=0.01)
+        next(stream)
+        stream.close()
+        self.assertEqual(sdk.concurrency_limiter.in_flight, 0)
+        self.assertEqual(sdk.scheduler.active, 0)
+
+    def test_closing_an_async_stream_releases_its_slot(self):
+        sdk = self.sdk()
+
+        async def main():
+            stream = sdk.generate_stream_async("question", polling_interval=0.01)
+            await anext(stream)
+            in_flight = sdk.concurrency_limiter.in_flight
+            await stream.aclose()
+            await sdk.aclose()
+            return in_flight
+
+        self.assertEqual(asyncio.run(main()), 1)
+        self.assertEqual(sdk.concurrency_limiter.in_flight, 0)
+        self.assertEqual(sdk.scheduler.active, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
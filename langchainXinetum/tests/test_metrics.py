@@ -0,0 +1,53 @@
+import unittest
+
+from benchmarks.run import SampledMetrics
+from src.metrics import PHASES, GenerationTimer, InMemoryMetrics, LabelledMetrics
+
+
+class GenerationTimerTest(unittest.TestCase):
+    def test_phases_add_up_to_the_total(self):
+        timer = GenerationTimer()
+        for phase in PHASES:
+            timer.mark(phase)
+        timer.stop()
+
+        timings = timer.timings()
+        phases = sum(timings[f"{phase}_seconds"] for phase in PHASES)
+        self.assertAlmostEqual(phases, timings["total_seconds"], places=3)
+
+    def test_record_sends_the_generation_to_the_sink(self):
+        metrics = InMemoryMetrics()
+        timer = GenerationTimer()
+        timer.mark("queue")
+        timer.poll()
+        timer.add_bytes(10, 20)
+        timer.record(LabelledMetrics(metrics, {"shard": "a"}), "model")
+
+        labels = {"model": "model", "shard": "a"}
+        success = {**labels, "outcome": "success"}
+        self.assertEqual(metrics.counter("inetum_generations_total", success), 1)
+        self.assertEqual(metrics.counter("inetum_polls_total", labels), 1)
+        self.assertEqual(metrics.counter("inetum_bytes_received_total", labels), 20)
+        self.assertIn('phase="first_poll"', metrics.render())
+
+
+class QuantileTest(unittest.TestCase):
+    def test_histogram_quantile_is_a_bucket_estimate(self):
+        metrics = InMemoryMetrics(buckets=(1.0, 2.0))
+        for value in (1.1, 1.2, 1.3, 1.4):
+            metrics.observe("latency", value)
+        # Interpolated in the (1, 2] bucket, not the largest value seen
+        self.assertEqual(metrics.quantile("latency", 1.0), 2.0)
+
+    def test_sampled_percentile_is_exact(self):
+        metrics = SampledMetrics()
+        for value in (1.1, 1.2, 1.3, 1.4):
+            metrics.observe("latency", value, {"phase": "completion"})
+        self.assertAlmostEqual(
+            metrics.percentile("latency", 99, {"phase": "completion"}), 1.397, 3
+        )
+        self.assertIsNone(metrics.percentile("latency", 99))
+
+
+if __name__ == "__main__":
+    unittest.main()
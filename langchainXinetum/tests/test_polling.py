@@ -0,0 +1,73 @@
+import itertools
+import unittest
+
+from src.polling import AdaptivePolling, ExponentialBackoffPolling, FixedPolling
+from tests.test_inetum_agent import HubTestCase
+
+
+def first(delays, count: int) -> list:
+    return [round(delay, 6) for delay in itertools.islice(delays, count)]
+
+
+class PollingScheduleTest(unittest.TestCase):
+    def test_fixed_polling(self):
+        self.assertEqual(first(FixedPolling(0.5).delays(), 3), [0.5, 0.5, 0.5])
+
+    def test_backoff_after_the_fast_probes(self):
+        strategy = ExponentialBackoffPolling(
+            initial_interval=0.1, fast_probes=2, factor=2, max_interval=0.5, jitter=0
+        )
+        self.assertEqual(
+            first(strategy.delays(), 6), [0.1, 0.1, 0.2, 0.4, 0.5, 0.5]
+        )
+
+    def test_jitter_stays_in_bounds(self):
+        strategy = ExponentialBackoffPolling(
+            initial_interval=1.0, fast_probes=50, jitter=0.1
+        )
+        for delay in first(strategy.delays(), 50):
+            self.assertTrue(0.9 <= delay <= 1.1)
+
+    def test_adaptive_sleeps_most_of_the_expected_time_first(self):
+        strategy = AdaptivePolling(
+            head_start=0.5, initial_interval=0.1, fast_probes=1, jitter=0
+        )
+        self.assertEqual(first(strategy.delays("gpt"), 1), [0.1])
+
+        for completion_time in (2.0, 4.0, 3.0):
+            strategy.record("gpt", completion_time)
+        self.assertEqual(strategy.expected_completion_time("gpt"), 3.0)
+        self.assertEqual(first(strategy.delays("gpt"), 2), [1.5, 0.1])
+        # The history is kept per model
+        self.assertEqual(first(strategy.delays("other"), 1), [0.1])
+
+    def test_adaptive_history_is_bounded(self):
+        strategy = AdaptivePolling(history_size=2)
+        for completion_time in (10.0, 1.0, 1.0):
+            strategy.record(None, completion_time)
+        self.assertEqual(strategy.expected_completion_time(None), 1.0)
+
+
+class PollingStrategyTest(HubTestCase):
+    completion = "0.3"
+
+    def test_adaptive_polling_learns_the_completion_time(self):
+        sdk = self.sdk(polling_strategy=AdaptivePolling(
+            initial_interval=0.01, fast_probes=20, jitter=0
+        ))
+        cold = sdk.generate_with_metadata("question")
+        warm = sdk.generate_with_metadata("question")
+
+        self.assertGreater(cold["polls"], 10)
+        self.assertLess(warm["polls"], cold["polls"] / 2)
+
+    def test_polling_interval_overrides_the_strategy(self):
+        sdk = self.sdk()
+        result = sdk.generate_with_metadata("question", polling_interval=0.05)
+        self.assertAlmostEqual(
+            result["poll_wait_seconds"], 0.05 * (result["polls"] - 1), places=6
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import asyncio
+import socket
+import time
+import unittest
+
+import requests
+from urllib3.exceptions import ProtocolError
+
+from src.concurrency import HubHTTPError
+from src.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+from src.session import create_session
+
+
+def refused_connection_error() -> requests.ConnectionError:
+    """The error of a POST to a port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    try:
+        create_session(connection_retries=0).post(f"http://127.0.0.1:{port}/Chat")
+    except requests.ConnectionError as error:
+        return error
+    raise AssertionError("the connection was not refused")
+
+
+def flaky(*errors: BaseException):
+    """A call raising `errors` in turn, then returning the number of calls."""
+    calls = []
+
+    def call():
+        calls.append(None)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return len(calls)
+
+    return call, calls
+
+
+# No delay between the attempts
+def make_policy(**kwargs) -> RetryPolicy:
+    kwargs.setdefault("max_retries", 3)
+    return RetryPolicy(initial_backoff=0.0, max_backoff=0.0, **kwargs)
+
+
+class RetryableTest(unittest.TestCase):
+    def test_idempotent_calls_retry_transient_errors(self):
+        for status in (408, 429, 500, 502, 503, 504):
+            error = HubHTTPError("error", status_code=status)
+            self.assertTrue(RetryPolicy.is_retryable(error, idempotent=True))
+        self.assertTrue(
+            RetryPolicy.is_retryable(requests.ReadTimeout(), idempotent=True)
+        )
+        self.assertFalse(
+            RetryPolicy.is_retryable(
+                HubHTTPError("error", status_code=400), idempotent=True
+            )
+        )
+
+    def test_non_idempotent_calls_retry_only_unprocessed_requests(self):
+        for status, retryable in ((429, True), (503, True), (500, False)):
+            error = HubHTTPError("error", status_code=status)
+            self.assertIs(RetryPolicy.is_retryable(error, idempotent=False), retryable)
+        self.assertTrue(
+            RetryPolicy.is_retryable(requests.ConnectTimeout(), idempotent=False)
+        )
+        # The request may have been processed before the answer timed out
+        self.assertFalse(
+            RetryPolicy.is_retryable(requests.ReadTimeout(), idempotent=False)
+        )
+
+    def test_refused_connection_is_retried_for_any_call(self):
+        error = refused_connection_error()
+        self.assertTrue(RetryPolicy.is_retryable(error, idempotent=False))
+        self.assertTrue(RetryPolicy.is_retryable(error, idempotent=True))
+
+    def test_connection_lost_after_sending_is_not_retried_for_posts(self):
+        error = requests.ConnectionError(ProtocolError("Connection aborted."))
+        self.assertFalse(RetryPolicy.is_retryable(error, idempotent=False))
+        self.assertTrue(RetryPolicy.is_retryable(error, idempotent=True))
+
+    def test_backoff_is_bounded_and_honours_retry_after(self):
+        policy = RetryPolicy(initial_backoff=1.0, max_backoff=4.0)
+        for attempt in range(1, 10):
+            self.assertLessEqual(policy.backoff(attempt), 4.0)
+        self.assertEqual(policy.backoff(1, retry_after=10.0), 10.0)
+
+
+class RetryCallTest(unittest.TestCase):
+    def test_retries_until_success(self):
+        retried = []
+        call, calls = flaky(
+            HubHTTPError("busy", status_code=503), requests.ConnectionError()
+        )
+        result = make_policy().call(call, on_retry=retried.append)
+        self.assertEqual(result, 3)
+        self.assertEqual(len(retried), 2)
+
+    def test_gives_up_after_max_retries(self):
+        errors = [HubHTTPError("busy", status_code=503)] * 5
+        call, calls = flaky(*errors)
+        with self.assertRaises(HubHTTPError):
+            make_policy(max_retries=2).call(call)
+        self.assertEqual(len(calls), 3)
+
+    def test_non_idempotent_server_error_is_not_retried(self):
+        call, calls = flaky(HubHTTPError("error", status_code=500))
+        with self.assertRaises(HubHTTPError):
+            make_policy().call(call, idempotent=False)
+        self.assertEqual(len(calls), 1)
+
+    def test_gives_up_past_the_deadline(self):
+        call, calls = flaky(HubHTTPError("busy", status_code=429, retry_after=60))
+        with self.assertRaises(HubHTTPError):
+            make_policy(deadline=1.0).call(call)
+        self.assertEqual(len(calls), 1)
+
+    def test_async_retries_until_success(self):
+        call, calls = flaky(HubHTTPError("busy", status_code=429))
+
+        async def acall():
+            return call()
+
+        self.assertEqual(asyncio.run(make_policy().call_async(acall)), 2)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def open_breaker(self, reset_timeout: float = 60.0) -> CircuitBreaker:
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=reset_timeout)
+        for _ in range(2):
+            breaker.record_failure(HubHTTPError("down", status_code=502))
+        return breaker
+
+    def test_opens_after_consecutive_outage_errors(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+        breaker.record_failure(requests.ConnectionError())
+        self.assertEqual(breaker.state, "closed")
+        breaker.record_failure(requests.ConnectionError())
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(CircuitOpenError) as raised:
+            breaker.before_call()
+        self.assertGreater(raised.exception.retry_after, 0)
+
+    def test_an_answer_of_the_hub_resets_the_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+        breaker.record_failure(requests.ConnectionError())
+        breaker.record_failure(HubHTTPError("busy", status_code=429))
+        breaker.record_failure(requests.ConnectionError())
+        self.assertEqual(breaker.state, "closed")
+
+    def test_half_open_lets_a_single_probe_through(self):
+        breaker = self.open_breaker(reset_timeout=0.01)
+        time.sleep(0.02)
+        self.assertEqual(breaker.state, "half-open")
+
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        breaker.before_call()
+
+    def test_failed_probe_opens_the_circuit_again(self):
+        breaker = self.open_breaker(reset_timeout=0.01)
+        time.sleep(0.02)
+        breaker.before_call()
+        breaker.record_failure(requests.ConnectionError())
+        self.assertEqual(breaker.state, "open")
+
+    def test_cancelled_probe_frees_the_half_open_slot(self):
+        breaker = self.open_breaker(reset_timeout=0.01)
+        time.sleep(0.02)
+        breaker.before_call()
+        breaker.release()
+        breaker.before_call()
+
+    def test_open_circuit_fails_without_calling(self):
+        breaker = self.open_breaker()
+        call, calls = flaky()
+        with self.assertRaises(CircuitOpenError):
+            make_policy().call(call, breaker=breaker)
+        self.assertEqual(calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import unittest
+
+from src.scheduler import SettingsScheduler, settings_key
+
+
+class Applier:
+    """Records the settings applied on the agent."""
+
+    def __init__(self, fail: bool = False):
+        self.applied = []
+        self.fail = fail
+
+    def __call__(self, key):
+        def apply():
+            if self.fail:
+                raise RuntimeError("update failed")
+            self.applied.append(key)
+
+        return apply
+
+
+class SettingsSchedulerTest(unittest.TestCase):
+    def test_settings_key_ignores_order(self):
+        self.assertEqual(
+            settings_key({"model": "a", "temperature": 0.2}),
+            settings_key({"temperature": 0.2, "model": "a"}),
+        )
+
+    def test_observed_settings_are_not_applied_again(self):
+        scheduler = SettingsScheduler()
+        apply = Applier()
+        scheduler.observe("a")
+        with scheduler.hold("a", apply("a")):
+            self.assertEqual(scheduler.active, 1)
+        self.assertEqual(apply.applied, [])
+        self.assertEqual(scheduler.active, 0)
+
+    def test_observe_does_not_override_known_settings(self):
+        scheduler = SettingsScheduler(current="a")
+        scheduler.observe("b")
+        self.assertEqual(scheduler.current, "a")
+
+    def test_other_settings_are_applied_once(self):
+        scheduler = SettingsScheduler(current="a")
+        apply = Applier()
+        with scheduler.hold("b", apply("b")):
+            pass
+        with scheduler.hold("b", apply("b")):
+            pass
+        self.assertEqual(apply.applied, ["b"])
+        self.assertEqual(scheduler.current, "b")
+
+    def test_switch_waits_for_the_running_group(self):
+        scheduler = SettingsScheduler(current="a")
+        apply = Applier()
+        running = threading.Event()
+        leave = threading.Event()
+        events = []
+
+        def request(key, wait=None):
+            with scheduler.hold(key, apply(key)):
+                events.append(("start", key, scheduler.current))
+                if wait is not None:
+                    running.set()
+                    wait.wait(5)
+                events.append(("end", key))
+
+        first = threading.Thread(target=request, args=("a", leave))
+        first.start()
+        self.assertTrue(running.wait(5))
+
+        others = [threading.Thread(target=request, args=("b",)) for _ in range(3)]
+        for thread in others:
+            thread.start()
+        while scheduler.queue_depth < 3:
+            threading.Event().wait(0.001)
+        # Nothing of the other group ran with the wrong settings applied
+        self.assertEqual(events, [("start", "a", "a")])
+
+        leave.set()
+        for thread in [first, *others]:
+            thread.join(5)
+
+        self.assertEqual(apply.applied, ["b"])
+        self.assertEqual(events[1], ("end", "a"))
+        starts = [event for event in events if event[0] == "start"]
+        self.assertEqual(starts[1:], [("start", "b", "b")] * 3)
+        self.assertEqual(scheduler.active, 0)
+        self.assertEqual(scheduler.queue_depth, 0)
+
+    def test_failed_switch_forgets_the_applied_settings(self):
+        scheduler = SettingsScheduler(current="a")
+        with self.assertRaises(RuntimeError):
+            with scheduler.hold("b", Applier(fail=True)("b")):
+                pass
+        self.assertIsNone(scheduler.current)
+
+        # The next request applies its settings, whatever they are
+        apply = Applier()
+        with scheduler.hold("a", apply("a")):
+            pass
+        self.assertEqual(apply.applied, ["a"])
+
+
+class AsyncSettingsSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        scheduler = SettingsScheduler(current="a")
+        release = asyncio.Event()
+
+        async def apply():
+            pass
+
+        async def request(key):
+            async with scheduler.hold_async(key, apply):
+                await release.wait()
+
+        holding = asyncio.create_task(request("a"))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(request("b"))
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.queue_depth, 1)
+
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(scheduler.queue_depth, 0)
+
+        release.set()
+        await holding
+        self.assertEqual(scheduler.active, 0)
+        self.assertEqual(scheduler.current, "a")
+
+    async def test_waiters_of_a_switch_share_the_update(self):
+        scheduler = SettingsScheduler(current="a")
+        applied = []
+
+        async def apply():
+            applied.append("b")
+            await asyncio.sleep(0)
+
+        async def request():
+            async with scheduler.hold_async("b", apply):
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*(request() for _ in range(4)))
+        self.assertEqual(applied, ["b"])
+        self.assertEqual(scheduler.active, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.settings_cache import SettingsCache, settings_cache_key
+from tests.test_inetum_agent import HubTestCase
+
+
+class SettingsCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "settings.json")
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = SettingsCache(ttl=60)
+        with mock.patch("src.settings_cache.time.time", return_value=1000.0):
+            cache.set("key", {"id": "settings"}, {"model": "id"})
+        with mock.patch("src.settings_cache.time.time", return_value=1030.0):
+            self.assertEqual(cache.get("key")["model_ids"], {"model": "id"})
+        with mock.patch("src.settings_cache.time.time", return_value=1061.0):
+            self.assertIsNone(cache.get("key"))
+
+    def test_entries_are_copies(self):
+        cache = SettingsCache()
+        cache.set("key", {"id": "settings"}, {})
+        cache.get("key")["settings"]["id"] = "changed"
+        self.assertEqual(cache.get("key")["settings"], {"id": "settings"})
+
+    def test_file_is_shared_between_processes(self):
+        SettingsCache(self.path).set("key", {"id": "settings"}, {})
+        cache = SettingsCache(self.path)
+        self.assertEqual(cache.get("key")["settings"], {"id": "settings"})
+
+        cache.invalidate("key")
+        self.assertIsNone(SettingsCache(self.path).get("key"))
+
+    def test_corrupted_file_is_an_empty_cache(self):
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("{")
+        self.assertIsNone(SettingsCache(self.path).get("key"))
+
+    def test_key_does_not_contain_the_api_key(self):
+        key = settings_cache_key("https://hub", "secret-api-key")
+        self.assertNotIn("secret-api-key", key)
+        self.assertNotEqual(key, settings_cache_key("https://hub", "other-key"))
+
+
+class SDKSettingsCacheTest(HubTestCase):
+    def test_second_sdk_starts_without_round_trip(self):
+        cache = SettingsCache()
+        self.sdk(settings_cache=cache)
+        self.hub.reset_counts()
+
+        self.sdk(settings_cache=cache)
+        self.assertEqual(sum(self.hub.requests.values()), 0)
+
+    def test_lazy_init_fetches_the_settings_on_first_use(self):
+        sdk = self.sdk(lazy_init=True)
+        self.assertEqual(sum(self.hub.requests.values()), 0)
+
+        sdk.generate("question")
+        self.assertEqual(self.hub.requests["GET /settings"], 1)
+        self.assertEqual(self.hub.requests["GET /agent"], 1)
+
+    def test_rejected_settings_are_refetched(self):
+        cache = SettingsCache()
+        sdk = self.sdk(settings_cache=cache)
+        sdk._invalidate_settings()
+        self.assertIsNone(cache.get(sdk._settings_cache_key))
+
+        sdk.generate("question")
+        self.assertEqual(self.hub.requests["GET /settings"], 2)
+        self.assertIsNotNone(cache.get(sdk._settings_cache_key))
+
+
+if __name__ == "__main__":
+    unittest.main()
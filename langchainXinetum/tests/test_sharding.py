@@ -0,0 +1,81 @@
+import unittest
+
+from pydantic import SecretStr
+
+from benchmarks.mock_hub import MockHub
+from src.concurrency import AdaptiveConcurrencyLimiter
+from src.model import ChatInetum
+from src.settings_cache import SettingsCache
+from src.sharding import HashRing, ShardedInetumSDK
+
+
+class HashRingTest(unittest.TestCase):
+    def test_owner_is_stable(self):
+        ring = HashRing(["a", "b", "c"])
+        again = HashRing(["c", "b", "a"])
+        for key in map(str, range(200)):
+            self.assertEqual(ring.owner(key), again.owner(key))
+
+    def test_removing_a_shard_only_moves_its_keys(self):
+        keys = [f"conversation-{index}" for index in range(1000)]
+        before = HashRing(["a", "b", "c"])
+        after = HashRing(["a", "b"])
+        for key in keys:
+            if before.owner(key) != "c":
+                self.assertEqual(after.owner(key), before.owner(key))
+
+    def test_keys_spread_over_the_shards(self):
+        ring = HashRing(["a", "b", "c"])
+        owners = [ring.owner(f"conversation-{index}") for index in range(3000)]
+        for name in "abc":
+            self.assertGreater(owners.count(name), 600)
+
+
+class ShardedInetumSDKTest(unittest.TestCase):
+    def setUp(self):
+        self.hub = MockHub(latency="0", completion="0").start()
+        self.addCleanup(self.hub.stop)
+        self.keys = [SecretStr(f"key-{index}") for index in range(3)]
+
+    def sharded(self) -> ShardedInetumSDK:
+        sdk = ShardedInetumSDK.from_api_keys(
+            self.keys,
+            base_url=self.hub.url,
+            model="inetum-gpt4o",
+            temperature=0.16,
+            top_p=None,
+            max_tokens=16000,
+            settings_cache=SettingsCache(),
+            lazy_init=True,
+        )
+        self.addCleanup(sdk.close)
+        return sdk
+
+    def test_turns_of_a_conversation_stay_on_its_shard(self):
+        sdk = self.sharded()
+        first = sdk.generate_with_metadata("hello")
+        owner = sdk.shard_for(first["conversation_id"])
+
+        sdk.generate_with_metadata("again", conversation_id=first["conversation_id"])
+        generations = {shard.sdk: shard.generations for shard in sdk.shards}
+        self.assertEqual(generations[owner], 2)
+        self.assertEqual(sum(generations.values()), 2)
+
+    def test_new_conversations_spread_over_the_shards(self):
+        sdk = self.sharded()
+        for index in range(6):
+            sdk.generate(f"question {index}")
+        self.assertTrue(all(stats["generations"] for stats in sdk.stats()))
+
+    def test_shards_have_their_own_window(self):
+        sdk = self.sharded()
+        limiters = {id(shard.sdk.concurrency_limiter) for shard in sdk.shards}
+        self.assertEqual(len(limiters), 3)
+
+        with self.assertRaises(ValueError):
+            ChatInetum(
+                api_key=self.keys,
+                api_url=self.hub.url,
+                lazy_init=True,
+                concurrency_limiter=AdaptiveConcurrencyLimiter(),
+            )
@@ -0,0 +1,96 @@
+import threading
+import unittest
+from types import SimpleNamespace
+
+from src.summarize import CommitSummarizer
+from src.tokens import count_tokens
+
+
+class FakeChat:
+    """Chat model answering a short summary per prompt, and recording them."""
+
+    model_name = "inetum-gpt4o"
+
+    def __init__(self, padding: int = 0):
+        self.padding = padding
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt: str):
+        with self._lock:
+            self.prompts.append(prompt)
+            summary = f"summary {len(self.prompts)}" + "." * self.padding
+            return SimpleNamespace(content=summary)
+
+    def batch(self, prompts, config=None):
+        return [self.invoke(prompt) for prompt in prompts]
+
+
+def commit(files: int, lines: int = 1) -> dict:
+    patch = "".join(f"@@ -{i} +{i} @@\n+line {i}\n" for i in range(lines))
+    return {
+        "author": "author",
+        "message": "message",
+        "files": [
+            {"filename": f"file{index}.py", "status": "modified", "patch": patch}
+            for index in range(files)
+        ],
+    }
+
+
+class CommitSummarizerTest(unittest.TestCase):
+    def setUp(self):
+        self.chat = FakeChat()
+
+    def test_small_commit_is_summarized_in_one_request(self):
+        summarizer = CommitSummarizer(self.chat, chunk_tokens=1000)
+        self.assertEqual(summarizer.summarize(commit(files=2)), "summary 1")
+        self.assertEqual(len(self.chat.prompts), 1)
+        self.assertIn("file1.py", self.chat.prompts[0])
+
+    def test_chunks_fit_in_the_budget(self):
+        summarizer = CommitSummarizer(self.chat, chunk_tokens=100)
+        large = commit(files=5, lines=40)
+        chunks = summarizer.split(large)
+
+        self.assertGreater(len(chunks), 5)
+        header = summarizer._header(large)
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(header + chunk), 100 + 1)
+            # Every piece says which file it comes from
+            self.assertTrue(chunk.startswith("Fichier: "))
+
+    def test_huge_line_is_cut(self):
+        summarizer = CommitSummarizer(self.chat, chunk_tokens=50)
+        minified = {"filename": "min.js", "status": "added", "patch": "x" * 2000}
+        chunks = summarizer.split({"files": [minified]})
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(sum(chunk.count("x") for chunk in chunks), 2000)
+
+    def test_large_commit_is_mapped_then_reduced(self):
+        # Summaries of about 25 tokens, two of them fill a prompt
+        chat = FakeChat(padding=90)
+        summarizer = CommitSummarizer(chat, chunk_tokens=60, reduce_fan_in=2)
+        large = commit(files=8, lines=10)
+        chunks = summarizer.split(large)
+        summarizer.summarize(large, chunks=chunks)
+
+        def prompts(prefix: str) -> list:
+            return [prompt for prompt in chat.prompts if prompt.startswith(prefix)]
+
+        self.assertEqual(len(prompts(summarizer.map_prompt)), len(chunks))
+        reduces = prompts(summarizer.reduce_prompt)
+        self.assertGreaterEqual(len(reduces), len(chunks) - 2)
+        for prompt in reduces:
+            self.assertLessEqual(prompt.count("summary "), 2)
+        final = chat.prompts[-1]
+        self.assertTrue(final.startswith(summarizer.final_reduce_prompt))
+        self.assertEqual(final.count("summary "), 2)
+
+    def test_reduce_fan_in_must_merge(self):
+        with self.assertRaises(ValueError):
+            CommitSummarizer(self.chat, reduce_fan_in=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
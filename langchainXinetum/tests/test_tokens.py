@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import SecretStr
+
+from benchmarks.mock_hub import MockHub
+from src.model import ChatInetum
+from src.settings_cache import SettingsCache
+from src.tokens import (
+    CHARS_PER_TOKEN,
+    ContextOverflowError,
+    count_tokens,
+    has_tokenizer,
+    truncate_to_tokens,
+)
+
+
+def without_tokenizer():
+    return mock.patch("src.tokens._get_encoding", return_value=None)
+
+
+class EstimateTest(unittest.TestCase):
+    def setUp(self):
+        patcher = without_tokenizer()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_count_is_estimated_from_the_characters(self):
+        self.assertEqual(count_tokens(""), 0)
+        estimate = 40 // CHARS_PER_TOKEN + 1
+        self.assertEqual(count_tokens("x" * 40, "inetum-gpt4o"), estimate)
+
+    def test_truncation_keeps_the_end(self):
+        text = "old " * 100 + "recent"
+        truncated = truncate_to_tokens(text, 10)
+        self.assertTrue(truncated.endswith("recent"))
+        self.assertLessEqual(count_tokens(truncated), 10)
+        self.assertEqual(truncate_to_tokens("short", 10), "short")
+        self.assertEqual(truncate_to_tokens(text, 0), "")
+
+
+@unittest.skipUnless(has_tokenizer(), "tiktoken is not installed")
+class TiktokenTest(unittest.TestCase):
+    def test_count_is_exact(self):
+        self.assertEqual(count_tokens("hello world", "inetum-gpt4"), 2)
+
+    def test_truncation_fills_the_budget(self):
+        text = "word " * 1000
+        truncated = truncate_to_tokens(text, 100, "inetum-gpt4o")
+        self.assertLessEqual(count_tokens(truncated, "inetum-gpt4o"), 100)
+        self.assertGreater(count_tokens(truncated, "inetum-gpt4o"), 95)
+
+
+class ContextOverflowTest(unittest.TestCase):
+    def setUp(self):
+        self.hub = MockHub(latency="0", completion="0").start()
+        self.addCleanup(self.hub.stop)
+        # 8192 tokens of context, 8092 for the prompt
+        self.messages = [SystemMessage("be brief"), HumanMessage("word " * 10_000)]
+
+    def chat(self, context_overflow: str) -> ChatInetum:
+        chat = ChatInetum(
+            api_key=SecretStr("test"),
+            api_url=self.hub.url,
+            model_name="inetum-gpt4",
+            max_tokens=100,
+            settings_cache=SettingsCache(),
+            context_overflow=context_overflow,
+        )
+        self.addCleanup(chat.inetum_api.close)
+        return chat
+
+    def test_raise_sends_nothing(self):
+        with self.assertRaises(ContextOverflowError) as context:
+            self.chat("raise").invoke(self.messages)
+        self.assertEqual(context.exception.budget, 8092)
+        self.assertEqual(self.hub.requests["POST /Chat"], 0)
+
+    def test_truncate_sends_the_end_of_the_prompt(self):
+        answer = self.chat("truncate").invoke(self.messages)
+        self.assertEqual(self.hub.requests["POST /Chat"], 1)
+        self.assertLessEqual(answer.usage_metadata["input_tokens"], 8092)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import unittest
+from unittest import mock
+
+from src.webhook import WebhookReceiver, replay, sign_payload, verify_signature
+
+PAYLOADS = os.path.join(os.path.dirname(__file__), "..", "webhook_payloads")
+
+
+class FakeGithub:
+    """Github client returning the SHAs it is asked for, failing at first."""
+
+    repo_owner = "ImraneBounour"
+    repo_name = "HubXgit"
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = 0
+
+    def get_commits_content(self, shas):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("GitHub is down")
+        return [{"sha": sha} for sha in shas]
+
+    def get_pr_content(self, pull_request):
+        return {"number": pull_request["number"]}
+
+
+class WebhookSignatureTest(unittest.TestCase):
+    def test_verify_signature(self):
+        body = b'{"action": "opened"}'
+        signature = sign_payload("secret", body)
+        self.assertTrue(verify_signature("secret", body, signature))
+        self.assertFalse(verify_signature("other", body, signature))
+        self.assertFalse(verify_signature("secret", body + b" ", signature))
+        self.assertFalse(verify_signature("secret", body, None))
+
+
+class WebhookReceiverTest(unittest.TestCase):
+    def receive(self, github, event="push", secret="secret"):
+        receiver = WebhookReceiver(github, secret="secret", host="127.0.0.1", port=0)
+        with receiver:
+            host, port = receiver.address
+            response = replay(
+                f"http://{host}:{port}/",
+                event,
+                os.path.join(PAYLOADS, f"{event}.json"),
+                secret,
+            )
+        events = []
+        while not receiver.events.empty():
+            events.append(receiver.events.get_nowait())
+        return response, events
+
+    def test_push_commits_are_queued_in_order(self):
+        response, events = self.receive(FakeGithub())
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(
+            [event["record"]["sha"][:4] for event in events], ["356a", "b658"]
+        )
+        self.assertTrue(all(event["event"] == "push" for event in events))
+
+    def test_pull_request_is_queued(self):
+        response, events = self.receive(FakeGithub(), event="pull_request")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(events), 1)
+
+    def test_bad_signature_is_rejected(self):
+        github = FakeGithub()
+        response, events = self.receive(github, secret="other")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual((events, github.calls), ([], 0))
+
+    @mock.patch("src.webhook.HANDLE_RETRY_DELAY", 0.0)
+    def test_failed_delivery_is_retried(self):
+        github = FakeGithub(failures=1)
+        response, events = self.receive(github)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(github.calls, 2)
+        self.assertEqual(len(events), 2)
+
+    @mock.patch("src.webhook.HANDLE_RETRY_DELAY", 0.0)
+    def test_delivery_is_dropped_and_logged_after_the_last_attempt(self):
+        github = FakeGithub(failures=10)
+        with self.assertLogs("src.webhook", level="ERROR"):
+            response, events = self.receive(github)
+        self.assertEqual(github.calls, 3)
+        self.assertEqual(events, [])
+
+
+if __name__ == "__main__":
+    unittest.main()